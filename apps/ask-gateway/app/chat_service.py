@@ -4,22 +4,34 @@ import asyncio
 import json
 import logging
 import re
+import time
 import uuid
 from typing import Any, AsyncIterator, Callable
 
+import httpx
+
 logger = logging.getLogger("ask-gateway.chat")
 
 from .config import Settings
+from .history_summary import SUMMARY_SYSTEM_PROMPT, HistorySummaryCache, summary_prompt
+from .http_pool import HttpPool
+from .json_codec import dumps as json_dumps, dumps_object
 from .llm_client import LlmClientError, OpenAiLlmClient
 from .mcp_client import McpClientError, McpHttpClient
+from .mcp_session_pool import McpSessionPool
+from .metrics import GatewayMetrics, RequestTimings
 from .models import AskStreamRequest, ToolCall
+from .persistence import PersistenceQueue, TurnRecord
+from .sse import TextDelta, sse_event, thinking_delta, token_delta
+from .tool_cache import ToolResultCache
+from .tool_compaction import ToolResultCompactor
 from .response_synthesizer import synthesize_final_response
 from .usage_tracker import (
+    _build_status,
     resolve_model_for_user_async,
     record_usage_async,
     get_user_usage_async,
 )
-from . import supabase_store
 
 MAX_TOOL_ITERATIONS = 20
 
@@ -59,10 +71,6 @@ You also have access to the user's TigerPath (path.tigerapps.org) 4-year degree
 """
 
 
-def sse_event(event: str, data: dict) -> str:
-    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
-
-
 def _plan_tools(prompt: str, term: int | None) -> list[ToolCall]:
     lowered = prompt.lower()
     detected_codes = _extract_course_codes(prompt)
@@ -138,45 +146,85 @@ def _extract_course_codes(prompt: str) -> list[str]:
 
 
 class ChatService:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        http_pool: HttpPool | None = None,
+        mcp_sessions: McpSessionPool | None = None,
+        tool_cache: ToolResultCache | None = None,
+        persistence: PersistenceQueue | None = None,
+        metrics: GatewayMetrics | None = None,
+        history_summaries: HistorySummaryCache | None = None,
+    ) -> None:
         self._settings = settings
+        self._http_pool = http_pool
+        self._mcp_sessions = mcp_sessions
+        self._tool_cache = tool_cache
+        self._metrics = metrics
+        # Compaction needs the app's shared cache: a per-request one would
+        # never hit, so every long request would pay for a fresh summary.
+        self._history_summaries = history_summaries
+        # Without the app's started queue, turns are written inline.
+        self._persistence = persistence or PersistenceQueue(
+            max_size=1,
+            max_retries=settings.persist_max_retries,
+            retry_backoff_seconds=settings.persist_retry_backoff_seconds,
+        )
 
     async def stream_chat(
         self,
         payload: AskStreamRequest,
         is_disconnected: Callable[[], bool],
         request_id: str | None = None,
-    ) -> AsyncIterator[str]:
+        text_deltas: bool = False,
+    ) -> AsyncIterator[str | TextDelta]:
+        """Yield SSE frames for one chat turn.
+
+        With ``text_deltas``, token and thinking deltas are yielded as
+        ``TextDelta`` items for an output stage to coalesce (see ``sse.py``);
+        otherwise each is rendered as its own frame.
+        """
         if not self._settings.ask_llm_planner_enabled:
-            async for event in self._stream_deterministic(
-                payload, is_disconnected, request_id
-            ):
-                yield event
-            return
-
-        async for event in self._stream_agentic(payload, is_disconnected, request_id):
-            yield event
+            events = self._stream_deterministic(payload, is_disconnected, request_id)
+        else:
+            events = self._stream_agentic(payload, is_disconnected, request_id)
+        async for event in events:
+            yield event if text_deltas or isinstance(event, str) else event.render()
 
     async def _stream_agentic(
         self,
         payload: AskStreamRequest,
         is_disconnected: Callable[[], bool],
         request_id: str | None,
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[str | TextDelta]:
         request_id = request_id or str(uuid.uuid4())
         conversation_id = payload.conversationId or str(uuid.uuid4())
         prompt = payload.messages[-1].content
         mcp_url = self._settings.junction_mcp_url if payload.netid else None
-        mcp_client = McpHttpClient(self._settings, netid=payload.netid, mcp_url=mcp_url)
-        llm_client = OpenAiLlmClient(self._settings)
+        mcp_client = McpHttpClient(
+            self._settings,
+            netid=payload.netid,
+            mcp_url=mcp_url,
+            http_client=self._http_pool.mcp if self._http_pool else None,
+            session_pool=self._mcp_sessions,
+            tool_cache=self._tool_cache,
+        )
+        llm_client = OpenAiLlmClient(
+            self._settings,
+            http_client=self._http_pool.llm if self._http_pool else None,
+        )
         session_id: str | None = None
+        timings = RequestTimings(self._metrics, request_id)
+        outcome = "error"
 
         # Quota enforcement
         quota_before: dict | None = None
         effective_model: str | None = payload.model
         if payload.netid:
-            quota_before = await resolve_model_for_user_async(payload.netid)
+            with timings.span("quota"):
+                quota_before = await resolve_model_for_user_async(payload.netid)
             if quota_before["blocked"]:
+                timings.finish("quota_exhausted")
                 yield sse_event(
                     "quota_exhausted",
                     {
@@ -195,24 +243,47 @@ class ChatService:
             if payload.netid:
                 system_prompt += _SCHEDULE_PROMPT_ADDENDUM
 
+            history = [m.model_dump() for m in payload.messages]
+            # Summarizing evicted turns is billed to this turn.
+            summary_costs: list[float] = []
+            if self._history_summaries is not None and payload.conversationId:
+                with timings.span("history"):
+                    history = await self._history_summaries.compact(
+                        payload.conversationId,
+                        history,
+                        lambda previous, evicted: self._summarize_history(
+                            llm_client, previous, evicted, summary_costs
+                        ),
+                    )
             messages: list[dict[str, Any]] = [
                 {"role": "system", "content": system_prompt},
-                *[m.model_dump() for m in payload.messages],
+                *history,
             ]
 
             # Fetch tools dynamically from MCP server (cached with 60s TTL)
-            llm_tools = await asyncio.wait_for(
-                mcp_client.list_tools(), timeout=self._settings.tool_timeout_seconds
-            )
+            with timings.span("list_tools"):
+                llm_tools = await asyncio.wait_for(
+                    mcp_client.list_tools(), timeout=self._settings.tool_timeout_seconds
+                )
             # list_tools initializes the session, so capture it
             session_id = mcp_client._session_id
             collected_usage: dict[str, Any] | None = None
             # Accumulate usage across all LLM iterations (tool-calling loop)
-            total_cost = 0.0
+            total_cost = sum(summary_costs)
             total_input_tokens = 0
             total_output_tokens = 0
-            # Track tool calls for persistence
-            persisted_tool_events: list[dict[str, Any]] = []
+            # Tool events for the turn record, serialized as they happen
+            persisted_tool_rows: list[dict[str, Any]] = []
+            # The model gets compacted tool results; the client and the turn
+            # record get them in full.
+            compactor = (
+                ToolResultCompactor(
+                    max_tokens=self._settings.tool_result_max_tokens,
+                    round_max_tokens=self._settings.tool_round_max_tokens,
+                )
+                if self._settings.tool_compaction_enabled
+                else None
+            )
 
             for iteration in range(MAX_TOOL_ITERATIONS):
                 if is_disconnected():
@@ -223,10 +294,13 @@ class ChatService:
                 if iteration > 0:
                     messages[0] = {"role": "system", "content": _TOOL_CONTINUATION_PROMPT}
 
-                collected_content = ""
-                collected_reasoning = ""
-                collected_tool_calls: list[dict[str, Any]] = []
+                # Deltas are collected as fragments and joined once the
+                # stream ends; growing strings in place is quadratic.
+                content_parts: list[str] = []
+                tool_call_buffers: list[_ToolCallBuffer] = []
                 finish_reason: str | None = None
+                llm_started = time.perf_counter()
+                first_delta_at: float | None = None
 
                 async for chunk in llm_client.stream_chat(
                     messages=messages, tools=llm_tools, model=effective_model
@@ -247,38 +321,37 @@ class ChatService:
                         continue
 
                     delta = choices[0].get("delta", {})
+                    if first_delta_at is None and delta:
+                        first_delta_at = time.perf_counter()
                     if choices[0].get("finish_reason") is not None:
                         finish_reason = choices[0]["finish_reason"]
 
                     reasoning_text = _extract_reasoning(delta)
                     if reasoning_text:
-                        collected_reasoning += reasoning_text
-                        yield sse_event("thinking", {"content": reasoning_text})
+                        yield thinking_delta(reasoning_text)
 
                     token_content = delta.get("content")
                     if isinstance(token_content, str) and token_content:
-                        collected_content += token_content
-                        yield sse_event("token", {"text": token_content})
+                        content_parts.append(token_content)
+                        yield token_delta(token_content)
 
                     if delta.get("tool_calls"):
                         for tc_delta in delta["tool_calls"]:
                             idx = tc_delta.get("index", 0)
-                            while len(collected_tool_calls) <= idx:
-                                collected_tool_calls.append(
-                                    {
-                                        "id": "",
-                                        "function": {"name": "", "arguments": ""},
-                                    }
-                                )
-                            tc = collected_tool_calls[idx]
-                            if "id" in tc_delta:
-                                tc["id"] = tc_delta["id"]
-                            if "function" in tc_delta:
-                                fn = tc_delta["function"]
-                                if "name" in fn:
-                                    tc["function"]["name"] += fn["name"]
-                                if "arguments" in fn:
-                                    tc["function"]["arguments"] += fn["arguments"]
+                            while len(tool_call_buffers) <= idx:
+                                tool_call_buffers.append(_ToolCallBuffer())
+                            tool_call_buffers[idx].add(tc_delta)
+
+                collected_content = "".join(content_parts)
+                collected_tool_calls = [buffer.finish() for buffer in tool_call_buffers]
+                del content_parts, tool_call_buffers
+                llm_ended = time.perf_counter()
+                timings.llm_call(
+                    first_delta_at - llm_started if first_delta_at is not None else None,
+                    llm_ended - llm_started,
+                    llm_ended - first_delta_at if first_delta_at is not None else 0.0,
+                )
+                timings.completion_tokens = total_output_tokens
 
                 # If no tool calls were made, we're done (regardless of finish_reason,
                 # since some models like Gemini use "stop" even with tool calls).
@@ -288,42 +361,39 @@ class ChatService:
                         "outputTokens": total_output_tokens,
                     }
 
-                    # Record cost and get updated quota
                     quota_after: dict | None = None
                     if payload.netid:
-                        if total_cost > 0:
-                            await record_usage_async(payload.netid, total_cost)
-                        quota_after = await get_user_usage_async(payload.netid)
-
-                        # Save conversation to Supabase
                         conv_title = (
                             payload.messages[0].content[:80]
                             if payload.messages
                             else "New chat"
                         )
-                        await supabase_store.save_message(
-                            conversation_id, payload.netid, conv_title, "user", prompt
-                        )
-                        # Save tool calls/results
-                        for te in persisted_tool_events:
-                            await supabase_store.save_message(
-                                conversation_id,
-                                payload.netid,
-                                conv_title,
-                                te["type"],
-                                json.dumps(te, default=str),
+                        turn_messages: list[dict[str, Any]] = [
+                            {"role": "user", "content": prompt},
+                            *persisted_tool_rows,
+                            {
+                                "role": "assistant",
+                                "content": collected_content,
+                                "cost": round(total_cost, 6) if total_cost > 0 else None,
+                                "input_tokens": total_input_tokens or None,
+                                "output_tokens": total_output_tokens or None,
+                                "model": effective_model,
+                            },
+                        ]
+                        turn = TurnRecord(conversation_id, payload.netid, conv_title, turn_messages)
+                        if self._settings.early_done_enabled:
+                            # Report the projected quota now and let the
+                            # durable writes finish after `done` is sent.
+                            quota_after = _build_status(quota_before["spent"] + total_cost)
+                            self._persistence.defer(
+                                self._record_turn(
+                                    payload.netid, total_cost, turn, quota_before["spent"], timings
+                                )
                             )
-                        await supabase_store.save_message(
-                            conversation_id,
-                            payload.netid,
-                            conv_title,
-                            "assistant",
-                            collected_content,
-                            cost=total_cost if total_cost > 0 else None,
-                            input_tokens=total_input_tokens or None,
-                            output_tokens=total_output_tokens or None,
-                            model=effective_model,
-                        )
+                        else:
+                            quota_after = await self._record_turn(
+                                payload.netid, total_cost, turn, quota_before["spent"], timings
+                            ) or _build_status(quota_before["spent"])
 
                     yield sse_event(
                         "status",
@@ -348,6 +418,9 @@ class ChatService:
                             and quota_before["tier"] != quota_after["tier"],
                             "resetSeconds": quota_after["resetSeconds"],
                         }
+                    if self._settings.done_timings_enabled:
+                        done_data["timings"] = timings.summary()
+                    timings.finish("done")
                     yield sse_event("done", done_data)
                     return
 
@@ -375,63 +448,103 @@ class ChatService:
                     }
                 )
 
-                # Execute tools and append results
+                # Execute tools concurrently; events stream out as each call
+                # starts/finishes, but results are appended in call order.
+                planned_calls: list[tuple[str, str, dict[str, Any]]] = []
                 for tc in collected_tool_calls:
-                    tool_name = tc["function"]["name"]
                     try:
                         tool_args = json.loads(tc["function"]["arguments"] or "{}")
                     except json.JSONDecodeError:
                         tool_args = {}
-                    tool_args = _sanitize_tool_args(tool_args)
+                    planned_calls.append(
+                        (tc["id"], tc["function"]["name"], _sanitize_tool_args(tool_args))
+                    )
 
+                # Each result is encoded once and shared by the SSE event and
+                # the turn record (and the tool message, without compaction).
+                encoded_results: list[str] = ["{}" for _ in planned_calls]
+                results: list[dict[str, Any]] = [{} for _ in planned_calls]
+                tools_started = time.perf_counter()
+                async for kind, index, result in self._run_tool_calls(
+                    mcp_client, [(name, args) for _, name, args in planned_calls], timings
+                ):
+                    call_id, tool_name, tool_args = planned_calls[index]
+                    if kind == "started":
+                        yield sse_event(
+                            "tool_call",
+                            {
+                                "name": tool_name,
+                                "arguments": tool_args,
+                                "call_id": call_id,
+                                "requestId": request_id,
+                                "sessionId": session_id,
+                            },
+                        )
+                        continue
+                    results[index] = result
+                    encoded_results[index] = json_dumps(result)
                     yield sse_event(
-                        "tool_call",
+                        "tool_result",
                         {
                             "name": tool_name,
-                            "arguments": tool_args,
-                            "call_id": tc["id"],
+                            "call_id": call_id,
+                            "ok": True,
                             "requestId": request_id,
                             "sessionId": session_id,
                         },
+                        encoded={"result": encoded_results[index]},
                     )
-                    persisted_tool_events.append(
-                        {
-                            "type": "tool_call",
-                            "name": tool_name,
-                            "arguments": tool_args,
-                        }
-                    )
-                    result = await asyncio.wait_for(
-                        mcp_client.call_tool(tool_name, tool_args),
-                        timeout=self._settings.tool_timeout_seconds,
+
+                tool_contents = encoded_results
+                if compactor is not None:
+                    compacted = compactor.compact_round(
+                        [
+                            (tool_name, result, encoded)
+                            for (_, tool_name, _), result, encoded in zip(
+                                planned_calls, results, encoded_results
+                            )
+                        ]
                     )
-                    persisted_tool_events.append(
-                        {
-                            "type": "tool_result",
-                            "name": tool_name,
-                            "ok": True,
-                            "result": result,
-                        }
+                    for item in compacted:
+                        timings.tool_result(item.raw_tokens, item.tokens)
+                    tool_contents = [item.content for item in compacted]
+                del results
+                timings.add("tools", time.perf_counter() - tools_started)
+
+                max_persisted = self._settings.persist_tool_result_max_bytes
+                for (call_id, tool_name, tool_args), encoded, tool_content in zip(
+                    planned_calls, encoded_results, tool_contents
+                ):
+                    persisted_tool_rows.append(
+                        _persisted_tool_row(
+                            {
+                                "type": "tool_call",
+                                "name": tool_name,
+                                "arguments": tool_args,
+                            },
+                            max_persisted,
+                        )
                     )
-                    yield sse_event(
-                        "tool_result",
-                        {
-                            "name": tool_name,
-                            "call_id": tc["id"],
-                            "ok": True,
-                            "result": result,
-                            "requestId": request_id,
-                            "sessionId": session_id,
-                        },
+                    persisted_tool_rows.append(
+                        _persisted_tool_row(
+                            {
+                                "type": "tool_result",
+                                "name": tool_name,
+                                "ok": True,
+                            },
+                            max_persisted,
+                            encoded_result=encoded,
+                        )
                     )
                     messages.append(
                         {
                             "role": "tool",
-                            "tool_call_id": tc["id"],
-                            "content": json.dumps(result),
+                            "tool_call_id": call_id,
+                            "content": tool_content,
                         }
                     )
 
+            outcome = "max_iterations"
             yield sse_event(
                 "error",
                 {
@@ -441,6 +554,9 @@ class ChatService:
                 },
             )
         except asyncio.CancelledError:
+            outcome = "cancelled"
+            if _cancelled_by_caller():
+                raise
             yield sse_event(
                 "error",
                 {
@@ -450,6 +566,7 @@ class ChatService:
                 },
             )
         except asyncio.TimeoutError:
+            outcome = "timeout"
             yield sse_event(
                 "error",
                 {
@@ -459,6 +576,7 @@ class ChatService:
                 },
             )
         except McpClientError as exc:
+            outcome = "upstream_error"
             yield sse_event(
                 "error",
                 {
@@ -468,6 +586,7 @@ class ChatService:
                 },
             )
         except LlmClientError as exc:
+            outcome = "upstream_error"
             logger.exception("LLM client error for request %s: %s", request_id, exc)
             yield sse_event(
                 "error",
@@ -484,26 +603,130 @@ class ChatService:
                 {"code": "unknown_error", "message": str(exc), "requestId": request_id},
             )
         finally:
+            timings.finish(outcome)
             await mcp_client.close()
             await llm_client.close()
 
+    async def _summarize_history(
+        self,
+        llm_client: OpenAiLlmClient,
+        previous: str | None,
+        messages: list[dict[str, Any]],
+        costs: list[float],
+    ) -> str:
+        text, usage = await llm_client.complete_text_with_usage(
+            system_prompt=SUMMARY_SYSTEM_PROMPT,
+            user_prompt=summary_prompt(previous, messages),
+            model=self._settings.history_summary_model,
+        )
+        costs.append(usage.get("cost") or 0)
+        return text
+
+    async def _record_turn(
+        self,
+        netid: str,
+        cost: float,
+        turn: TurnRecord,
+        spent_before: float,
+        timings: RequestTimings | None = None,
+    ) -> dict[str, Any] | None:
+        """Record spend and queue the turn; returns the post-record quota.
+
+        The answer has already streamed, so a failed quota write (or a
+        malformed RPC reply) is logged and the quota is projected from
+        ``spent_before`` instead.
+        """
+        started = time.perf_counter()
+        try:
+            quota_after = await record_usage_async(netid, cost)
+        except (httpx.HTTPError, ValueError, TypeError) as exc:
+            logger.error("Failed to record usage for %s: %s", netid, exc)
+            self._persistence.record_quota_failure()
+            quota_after = _build_status(spent_before + cost) if cost > 0 else None
+        await self._persistence.submit(turn)
+        if timings is not None:
+            timings.add("persist", time.perf_counter() - started)
+        return quota_after
+
+    async def _run_tool_calls(
+        self,
+        mcp_client: McpHttpClient,
+        calls: list[tuple[str, dict[str, Any]]],
+        timings: RequestTimings | None = None,
+    ) -> AsyncIterator[tuple[str, int, dict[str, Any]]]:
+        """Run tool calls concurrently, bounded by ``tool_concurrency``.
+
+        Yields ``("started", index, {})`` when a call acquires a slot and
+        ``("finished", index, result)`` as each completes. The first failure
+        is re-raised and cancels the calls still in flight.
+        """
+        semaphore = asyncio.Semaphore(max(1, self._settings.tool_concurrency))
+        progress: asyncio.Queue[tuple[str, int, Any]] = asyncio.Queue()
+
+        async def run(index: int, name: str, arguments: dict[str, Any]) -> None:
+            try:
+                async with semaphore:
+                    progress.put_nowait(("started", index, {}))
+                    started = time.perf_counter()
+                    try:
+                        result = await asyncio.wait_for(
+                            mcp_client.call_tool(name, arguments),
+                            timeout=self._settings.tool_timeout_seconds,
+                        )
+                    finally:
+                        # Calls cancelled because a sibling failed are not timed.
+                        if timings is not None and not _cancelled_by_caller():
+                            timings.tool(name, time.perf_counter() - started)
+                progress.put_nowait(("finished", index, result))
+            except Exception as exc:
+                progress.put_nowait(("failed", index, exc))
+
+        tasks = [
+            asyncio.create_task(run(index, name, arguments))
+            for index, (name, arguments) in enumerate(calls)
+        ]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                kind, index, value = await progress.get()
+                if kind == "failed":
+                    raise value
+                if kind == "finished":
+                    remaining -= 1
+                yield kind, index, value
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def _stream_deterministic(
         self,
         payload: AskStreamRequest,
         is_disconnected: Callable[[], bool],
         request_id: str | None,
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[str | TextDelta]:
         request_id = request_id or str(uuid.uuid4())
         conversation_id = payload.conversationId or str(uuid.uuid4())
         prompt = payload.messages[-1].content
         mcp_url = self._settings.junction_mcp_url if payload.netid else None
-        mcp_client = McpHttpClient(self._settings, netid=payload.netid, mcp_url=mcp_url)
+        mcp_client = McpHttpClient(
+            self._settings,
+            netid=payload.netid,
+            mcp_url=mcp_url,
+            http_client=self._http_pool.mcp if self._http_pool else None,
+            session_pool=self._mcp_sessions,
+            tool_cache=self._tool_cache,
+        )
         session_id: str | None = None
+        timings = RequestTimings(self._metrics, request_id)
+        outcome = "error"
 
         # Quota enforcement (deterministic doesn't call LLM, but still check)
         if payload.netid:
-            det_quota = await resolve_model_for_user_async(payload.netid)
+            with timings.span("quota"):
+                det_quota = await resolve_model_for_user_async(payload.netid)
             if det_quota["blocked"]:
+                timings.finish("quota_exhausted")
                 yield sse_event(
                     "quota_exhausted",
                     {
@@ -518,9 +741,10 @@ class ChatService:
             yield sse_event("status", {"phase": "starting", "requestId": request_id})
             tool_calls = _plan_tools(prompt, payload.term)
             if tool_calls:
-                session_id = await asyncio.wait_for(
-                    mcp_client.initialize(), timeout=self._settings.tool_timeout_seconds
-                )
+                with timings.span("mcp_init"):
+                    session_id = await asyncio.wait_for(
+                        mcp_client.initialize(), timeout=self._settings.tool_timeout_seconds
+                    )
             executed_tool_runs: list[dict] = []
             for tool_call in tool_calls:
                 if is_disconnected():
@@ -542,10 +766,17 @@ class ChatService:
                         "sessionId": session_id,
                     },
                 )
-                result = await asyncio.wait_for(
-                    mcp_client.call_tool(tool_call.name, tool_call.arguments),
-                    timeout=self._settings.tool_timeout_seconds,
-                )
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        mcp_client.call_tool(tool_call.name, tool_call.arguments),
+                        timeout=self._settings.tool_timeout_seconds,
+                    )
+                finally:
+                    if not _cancelled_by_caller():
+                        elapsed = time.perf_counter() - started
+                        timings.tool(tool_call.name, elapsed)
+                        timings.add("tools", elapsed)
                 yield sse_event(
                     "tool_result",
                     {
@@ -572,16 +803,17 @@ class ChatService:
                     **({"sessionId": session_id} if session_id else {}),
                 },
             )
-            response_text = await synthesize_final_response(
-                prompt=prompt,
-                tool_runs=executed_tool_runs,
-                llm_client=None,
-                llm_enabled=False,
-            )
+            with timings.span("synthesis"):
+                response_text = await synthesize_final_response(
+                    prompt=prompt,
+                    tool_runs=executed_tool_runs,
+                    llm_client=None,
+                    llm_enabled=False,
+                )
             for token in response_text.split(" "):
                 if is_disconnected():
                     raise asyncio.CancelledError()
-                yield sse_event("token", {"text": f"{token} "})
+                yield token_delta(f"{token} ")
             yield sse_event(
                 "status",
                 {
@@ -600,15 +832,22 @@ class ChatService:
                 },
             }
             if payload.netid:
-                det_q = await get_user_usage_async(payload.netid)
+                with timings.span("quota"):
+                    det_q = await get_user_usage_async(payload.netid)
                 det_done_data["quota"] = {
                     "percentUsed": det_q["percentUsed"],
                     "tier": det_q["tier"],
                     "tierChanged": False,
                     "resetSeconds": det_q["resetSeconds"],
                 }
+            if self._settings.done_timings_enabled:
+                det_done_data["timings"] = timings.summary()
+            timings.finish("done")
             yield sse_event("done", det_done_data)
         except asyncio.CancelledError:
+            outcome = "cancelled"
+            if _cancelled_by_caller():
+                raise
             yield sse_event(
                 "error",
                 {
@@ -618,6 +857,7 @@ class ChatService:
                 },
             )
         except asyncio.TimeoutError:
+            outcome = "timeout"
             yield sse_event(
                 "error",
                 {
@@ -627,6 +867,7 @@ class ChatService:
                 },
             )
         except McpClientError as exc:
+            outcome = "upstream_error"
             yield sse_event(
                 "error",
                 {
@@ -636,9 +877,72 @@ class ChatService:
                 },
             )
         finally:
+            timings.finish(outcome)
             await mcp_client.close()
 
 
+def _cancelled_by_caller() -> bool:
+    """True when the running task itself was cancelled (client went away).
+
+    A ``CancelledError`` raised by the stream for a disconnect flag still gets
+    an ``error`` event; a real task cancellation must propagate so in-flight
+    upstream requests are torn down.
+    """
+    task = asyncio.current_task()
+    return task is not None and task.cancelling() > 0
+
+
+class _ToolCallBuffer:
+    """Fragments of one streamed tool call, joined when the stream ends."""
+
+    __slots__ = ("id", "name_parts", "argument_parts")
+
+    def __init__(self) -> None:
+        self.id = ""
+        self.name_parts: list[str] = []
+        self.argument_parts: list[str] = []
+
+    def add(self, delta: dict[str, Any]) -> None:
+        if "id" in delta:
+            self.id = delta["id"]
+        fn = delta.get("function")
+        if fn:
+            if "name" in fn:
+                self.name_parts.append(fn["name"])
+            if "arguments" in fn:
+                self.argument_parts.append(fn["arguments"])
+
+    def finish(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "function": {
+                "name": "".join(self.name_parts),
+                "arguments": "".join(self.argument_parts),
+            },
+        }
+
+
+def _persisted_tool_row(
+    event: dict[str, Any], max_bytes: int, encoded_result: str | None = None
+) -> dict[str, Any]:
+    """Serialize a tool event for the turn record as soon as it happens.
+
+    ``encoded_result`` is the already-encoded result, if any. Results are not
+    kept alive until the turn is saved, and ones larger than ``max_bytes`` are
+    replaced by a marker with their size.
+    """
+    if encoded_result is None:
+        content = json_dumps(event, default=str)
+    elif len(encoded_result) > max_bytes:
+        content = json_dumps(
+            {**event, "result": {"truncated": True, "originalBytes": len(encoded_result)}},
+            default=str,
+        )
+    else:
+        content = dumps_object(event, {"result": encoded_result}, default=str)
+    return {"role": event["type"], "content": content}
+
+
 def _sanitize_tool_args(args: dict[str, Any]) -> dict[str, Any]:
     """Strip leading/trailing punctuation from string arguments.
 
@@ -23,7 +23,17 @@ class Settings:
     junction_mcp_url: str = os.getenv("JUNCTION_MCP_URL_SCHEDULE", "http://localhost:3000/junction/mcp")
     mcp_token: str = os.getenv("JUNCTION_MCP_TOKEN", "")
     mcp_protocol_version: str = os.getenv("MCP_PROTOCOL_VERSION", "2025-03-26")
+    mcp_max_payload_bytes: int = int(os.getenv("ASK_MCP_MAX_PAYLOAD_BYTES", str(8 * 1024 * 1024)))
+    mcp_session_pool_enabled: bool = _env_bool("ASK_MCP_SESSION_POOL_ENABLED", True)
+    mcp_session_idle_ttl_seconds: float = float(os.getenv("ASK_MCP_SESSION_IDLE_TTL_SECONDS", "300"))
+    mcp_session_pool_max_size: int = int(os.getenv("ASK_MCP_SESSION_POOL_MAX_SIZE", "64"))
     tool_timeout_seconds: float = float(os.getenv("ASK_TOOL_TIMEOUT_SECONDS", "10"))
+    tool_cache_enabled: bool = _env_bool("ASK_TOOL_CACHE_ENABLED", True)
+    tool_cache_max_entries: int = int(os.getenv("ASK_TOOL_CACHE_MAX_ENTRIES", "2048"))
+    tool_concurrency: int = int(os.getenv("ASK_TOOL_CONCURRENCY", "4"))
+    tool_compaction_enabled: bool = _env_bool("ASK_TOOL_COMPACTION_ENABLED", True)
+    tool_result_max_tokens: int = int(os.getenv("ASK_TOOL_RESULT_MAX_TOKENS", "4000"))
+    tool_round_max_tokens: int = int(os.getenv("ASK_TOOL_ROUND_MAX_TOKENS", "12000"))
     connect_timeout_seconds: float = float(os.getenv("ASK_CONNECT_TIMEOUT_SECONDS", "5"))
     openrouter_api_key: str = os.getenv("OPENROUTER_API_KEY", os.getenv("OPENAI_API_KEY", ""))
     openrouter_base_url: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
@@ -34,5 +44,31 @@ class Settings:
     ask_llm_timeout_seconds: float = float(os.getenv("ASK_LLM_TIMEOUT_SECONDS", "12"))
     ask_llm_planner_enabled: bool = _env_bool("ASK_LLM_PLANNER_ENABLED", False)
     ask_llm_synthesis_enabled: bool = _env_bool("ASK_LLM_SYNTHESIS_ENABLED", False)
+    early_done_enabled: bool = _env_bool("ASK_EARLY_DONE_ENABLED", False)
+    history_compaction_enabled: bool = _env_bool("ASK_HISTORY_COMPACTION_ENABLED", False)
+    history_keep_turns: int = int(os.getenv("ASK_HISTORY_KEEP_TURNS", "6"))
+    history_slide_turns: int = int(os.getenv("ASK_HISTORY_SLIDE_TURNS", "4"))
+    history_summary_model: str = os.getenv(
+        "ASK_HISTORY_SUMMARY_MODEL", os.getenv("ASK_LLM_TEST_MODEL", "google/gemini-3.1-flash-lite")
+    )
+    history_summary_cache_max_entries: int = int(os.getenv("ASK_HISTORY_SUMMARY_CACHE_MAX_ENTRIES", "10000"))
+    metrics_enabled: bool = _env_bool("ASK_METRICS_ENABLED", True)
+    done_timings_enabled: bool = _env_bool("ASK_DONE_TIMINGS_ENABLED", False)
+    sse_coalesce_enabled: bool = _env_bool("ASK_SSE_COALESCE_ENABLED", True)
+    sse_flush_interval_ms: float = float(os.getenv("ASK_SSE_FLUSH_INTERVAL_MS", "25"))
+    sse_flush_max_bytes: int = int(os.getenv("ASK_SSE_FLUSH_MAX_BYTES", "4096"))
+    sse_queue_max_chunks: int = int(os.getenv("ASK_SSE_QUEUE_MAX_CHUNKS", "256"))
+    quota_cache_enabled: bool = _env_bool("ASK_QUOTA_CACHE_ENABLED", True)
+    quota_cache_max_entries: int = int(os.getenv("ASK_QUOTA_CACHE_MAX_ENTRIES", "10000"))
+    quota_cache_max_age_seconds: float = float(os.getenv("ASK_QUOTA_CACHE_MAX_AGE_SECONDS", "60"))
+    persist_queue_size: int = int(os.getenv("ASK_PERSIST_QUEUE_SIZE", "1000"))
+    persist_max_retries: int = int(os.getenv("ASK_PERSIST_MAX_RETRIES", "3"))
+    persist_retry_backoff_seconds: float = float(os.getenv("ASK_PERSIST_RETRY_BACKOFF_SECONDS", "0.5"))
+    persist_flush_timeout_seconds: float = float(os.getenv("ASK_PERSIST_FLUSH_TIMEOUT_SECONDS", "10"))
+    persist_tool_result_max_bytes: int = int(os.getenv("ASK_PERSIST_TOOL_RESULT_MAX_BYTES", "65536"))
     supabase_url: str = os.getenv("SUPABASE_URL", "")
     supabase_service_role_key: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    http_max_connections: int = int(os.getenv("ASK_HTTP_MAX_CONNECTIONS", "100"))
+    http_max_keepalive_connections: int = int(os.getenv("ASK_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    http_keepalive_expiry_seconds: float = float(os.getenv("ASK_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    http2_enabled: bool = _env_bool("ASK_HTTP2_ENABLED", True)
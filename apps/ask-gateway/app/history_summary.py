@@ -0,0 +1,152 @@
+"""Rolling summaries of long conversation histories.
+
+The web client sends the whole history on every ``/ask/stream`` request. With
+history compaction on, only the latest turns are forwarded verbatim and the
+older ones are replaced by a single summary message, so a long conversation
+costs about the same per request as a short one.
+
+A turn is a user message plus the replies that follow it. Between
+``keep_turns`` and ``keep_turns + slide_turns - 1`` turns are kept verbatim:
+the window slides ``slide_turns`` turns at a time, and the summary is only
+recomputed when it does. A recompute folds the newly evicted turns into the
+previous summary when that summary still matches the start of the history,
+so its cost does not grow with the conversation.
+
+Summaries are kept in-process per ``conversationId`` along with a fingerprint
+of the turns they cover; an edited or forked history is summarized afresh.
+If summarizing fails, the full history is sent.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("ask-gateway.history")
+
+SUMMARY_SYSTEM_PROMPT = """\
+You maintain a running summary of a conversation between a Princeton student and \
+an AI course assistant. Merge the earlier summary (if any) and the new messages \
+into one summary of at most 200 words. Keep course codes, terms, the student's \
+goals, constraints and preferences, recommendations made, decisions and open \
+questions. Write plain prose with no preamble.
+"""
+
+SUMMARY_MESSAGE_PREFIX = "Summary of the earlier conversation:\n"
+# Long answers are clipped in the summarizer's input to bound its cost.
+MAX_MESSAGE_CHARS = 4000
+
+Summarizer = Callable[[str | None, list[dict[str, Any]]], Awaitable[str]]
+
+
+@dataclass(frozen=True, slots=True)
+class HistorySummary:
+    turns: int
+    fingerprint: str
+    text: str
+
+
+def split_turns(messages: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    turns: list[list[dict[str, Any]]] = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def summary_prompt(previous: str | None, messages: list[dict[str, Any]]) -> str:
+    lines = [f"Earlier summary:\n{previous}\n" if previous else "Earlier summary: (none)\n", "New messages:"]
+    for message in messages:
+        content = message["content"]
+        if len(content) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS] + " …"
+        lines.append(f"{message['role']}: {content}")
+    return "\n".join(lines)
+
+
+class HistorySummaryCache:
+    def __init__(self, *, max_entries: int, keep_turns: int, slide_turns: int) -> None:
+        self._max_entries = max_entries
+        self._keep_turns = max(1, keep_turns)
+        self._slide_turns = max(1, slide_turns)
+        self._entries: OrderedDict[str, HistorySummary] = OrderedDict()
+        self.hits = 0
+        self.extensions = 0
+        self.rebuilds = 0
+        self.failures = 0
+
+    def evicted_turns(self, total: int) -> int:
+        """How many leading turns of a ``total``-turn history are summarized."""
+        if total <= self._keep_turns:
+            return 0
+        return (total - self._keep_turns) // self._slide_turns * self._slide_turns
+
+    async def compact(
+        self,
+        conversation_id: str,
+        messages: list[dict[str, Any]],
+        summarize: Summarizer,
+    ) -> list[dict[str, Any]]:
+        """``messages`` with the evicted turns replaced by their summary."""
+        turns = split_turns(messages)
+        evicted = self.evicted_turns(len(turns))
+        if not evicted:
+            return messages
+
+        fingerprints = _fingerprints(turns[:evicted])
+        entry = self._entries.get(conversation_id)
+        if entry is not None and entry.turns == evicted and entry.fingerprint == fingerprints[-1]:
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+        else:
+            # Extend the cached summary if it covers a prefix of this history.
+            if entry is not None and not (
+                entry.turns < evicted and entry.fingerprint == fingerprints[entry.turns - 1]
+            ):
+                entry = None
+            start = entry.turns if entry is not None else 0
+            new_messages = [message for turn in turns[start:evicted] for message in turn]
+            try:
+                text = await summarize(entry.text if entry is not None else None, new_messages)
+            except Exception as exc:
+                self.failures += 1
+                logger.warning("history: summarizing %s failed, sending full history: %s", conversation_id, exc)
+                return messages
+            if entry is not None:
+                self.extensions += 1
+            else:
+                self.rebuilds += 1
+            entry = HistorySummary(evicted, fingerprints[-1], text.strip())
+            self._entries[conversation_id] = entry
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+        return [
+            {"role": "system", "content": SUMMARY_MESSAGE_PREFIX + entry.text},
+            *(message for turn in turns[evicted:] for message in turn),
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "extensions": self.extensions,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures,
+        }
+
+
+def _fingerprints(turns: list[list[dict[str, Any]]]) -> list[str]:
+    """Digest of the history up to and including each turn."""
+    digest = hashlib.sha256()
+    fingerprints: list[str] = []
+    for turn in turns:
+        for message in turn:
+            digest.update(f"{message['role']}\0{message['content']}\0".encode())
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
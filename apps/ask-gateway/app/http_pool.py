@@ -0,0 +1,83 @@
+"""Shared HTTP connection pools for the gateway process lifetime.
+
+One ``httpx.AsyncClient`` per upstream (OpenRouter, Junction MCP, Supabase) is
+created on startup and closed on shutdown, so steady-state requests reuse warm
+keep-alive connections instead of paying a TCP+TLS handshake per hop.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+from typing import Any
+
+import httpx
+
+from .config import Settings
+
+logger = logging.getLogger("ask-gateway.http")
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpPool:
+    def __init__(self, settings: Settings) -> None:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        )
+        http2 = settings.http2_enabled and _http2_available()
+        if settings.http2_enabled and not http2:
+            logger.info("http_pool: h2 is not installed, falling back to HTTP/1.1")
+
+        self.llm = httpx.AsyncClient(
+            base_url=settings.openrouter_base_url,
+            timeout=httpx.Timeout(settings.ask_llm_timeout_seconds, connect=settings.connect_timeout_seconds),
+            limits=limits,
+            http2=http2,
+        )
+        self.mcp = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.tool_timeout_seconds, connect=settings.connect_timeout_seconds),
+            limits=limits,
+            http2=http2,
+        )
+        self.supabase = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.tool_timeout_seconds, connect=settings.connect_timeout_seconds),
+            limits=limits,
+            http2=http2,
+        )
+        self.http2 = http2
+
+    def stats(self) -> dict[str, Any]:
+        """Connection pool utilization per upstream."""
+        return {
+            "http2": self.http2,
+            "llm": _client_stats(self.llm),
+            "mcp": _client_stats(self.mcp),
+            "supabase": _client_stats(self.supabase),
+        }
+
+    async def close(self) -> None:
+        for client in (self.llm, self.mcp, self.supabase):
+            try:
+                await client.aclose()
+            except Exception as exc:  # pragma: no cover - shutdown must never raise
+                logger.warning("http_pool: close failed: %s", exc)
+
+
+def _client_stats(client: httpx.AsyncClient) -> dict[str, int]:
+    # httpx does not expose pool state publicly; read it from the httpcore
+    # pool behind the default transport and degrade to zeros otherwise.
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "inFlightRequests": len(getattr(pool, "_requests", []) or []),
+        "maxConnections": getattr(pool, "_max_connections", None) or 0,
+    }
@@ -0,0 +1,46 @@
+"""JSON encoding for the streaming hot path.
+
+Uses ``orjson`` when it is installed and the standard library otherwise; both
+produce compact UTF-8 JSON. Values orjson rejects (e.g. integers beyond 64
+bits) fall back to the standard library.
+
+``dumps_object`` splices members that are already encoded into an object, so
+a large value such as a tool result is encoded once and reused as is.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps_bytes(value: Any, default: Callable[[Any], Any] | None = None) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default)
+        except TypeError:
+            pass
+    return json.dumps(value, default=default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(value: Any, default: Callable[[Any], Any] | None = None) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default).decode()
+        except TypeError:
+            pass
+    return json.dumps(value, default=default, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps_object(fields: dict[str, Any], encoded: dict[str, str], default: Callable[[Any], Any] | None = None) -> str:
+    """Encode ``fields`` as an object, then append the already-encoded members of ``encoded``."""
+    head = dumps(fields, default=default)
+    if not encoded:
+        return head
+    members = ",".join(f"{dumps(key)}:{value}" for key, value in encoded.items())
+    return f"{head[:-1]}{',' if fields else ''}{members}}}"
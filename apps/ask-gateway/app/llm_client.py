@@ -6,6 +6,7 @@ from typing import Any, AsyncIterator
 import httpx
 
 from .config import Settings
+from .json_codec import dumps_bytes
 
 
 class LlmClientError(Exception):
@@ -13,12 +14,16 @@ class LlmClientError(Exception):
 
 
 class OpenAiLlmClient:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(self, settings: Settings, *, http_client: httpx.AsyncClient | None = None) -> None:
         self._settings = settings
-        self._client = httpx.AsyncClient(
+        # A shared pooled client must be created with the OpenRouter base_url.
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.AsyncClient(
             base_url=settings.openrouter_base_url,
             timeout=httpx.Timeout(settings.ask_llm_timeout_seconds, connect=settings.connect_timeout_seconds),
         )
+        # id(value) -> (value, encoded); the value is kept so its id stays unique
+        self._encoded: dict[int, tuple[Any, bytes]] = {}
 
     async def complete_json(self, *, system_prompt: str, user_prompt: str) -> dict[str, Any]:
         raw_text = await self.complete_text(
@@ -46,12 +51,10 @@ class OpenAiLlmClient:
 
         request: dict[str, Any] = {
             "model": model or self._settings.ask_llm_model,
-            "messages": messages,
             "stream": True,
             "stream_options": {"include_usage": True},
         }
         if tools:
-            request["tools"] = tools
             request["tool_choice"] = "auto"
 
         async with self._client.stream(
@@ -71,7 +74,7 @@ class OpenAiLlmClient:
                     else {}
                 ),
             },
-            json=request,
+            content=self._encode_chat_request(request, messages, tools),
         ) as response:
             if response.status_code >= 400:
                 error_body = await response.aread()
@@ -93,6 +96,35 @@ class OpenAiLlmClient:
                 if isinstance(parsed, dict):
                     yield parsed
 
+    def _encode_chat_request(
+        self,
+        request: dict[str, Any],
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+    ) -> bytes:
+        """Encode a chat request, reusing the encoding of messages and tools sent before.
+
+        The tool loop resends the whole conversation every iteration; only the
+        messages appended since the last call are encoded. Messages and tools
+        must not be mutated after they have been sent.
+        """
+        parts = [
+            dumps_bytes(request)[:-1],
+            b',"messages":[',
+            b",".join(self._encode_once(message) for message in messages),
+            b"]",
+        ]
+        if tools:
+            parts += [b',"tools":', self._encode_once(tools)]
+        parts.append(b"}")
+        return b"".join(parts)
+
+    def _encode_once(self, value: Any) -> bytes:
+        cached = self._encoded.get(id(value))
+        if cached is None or cached[0] is not value:
+            cached = self._encoded[id(value)] = (value, dumps_bytes(value))
+        return cached[1]
+
     async def complete_text(
         self,
         *,
@@ -101,6 +133,20 @@ class OpenAiLlmClient:
         model: str | None = None,
         json_mode: bool = False,
     ) -> str:
+        text, _ = await self.complete_text_with_usage(
+            system_prompt=system_prompt, user_prompt=user_prompt, model=model, json_mode=json_mode
+        )
+        return text
+
+    async def complete_text_with_usage(
+        self,
+        *,
+        system_prompt: str,
+        user_prompt: str,
+        model: str | None = None,
+        json_mode: bool = False,
+    ) -> tuple[str, dict[str, Any]]:
+        """The completion text and OpenRouter's ``usage`` block (``{}`` if absent)."""
         if not self._settings.openrouter_api_key:
             raise LlmClientError("OPENROUTER_API_KEY is missing.")
 
@@ -142,7 +188,9 @@ class OpenAiLlmClient:
 
         if not isinstance(text, str) or not text.strip():
             raise LlmClientError("OpenRouter returned empty text.")
-        return text
+        usage = payload.get("usage")
+        return text, usage if isinstance(usage, dict) else {}
 
     async def close(self) -> None:
-        await self._client.aclose()
+        if self._owns_client:
+            await self._client.aclose()
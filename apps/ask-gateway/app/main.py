@@ -2,27 +2,105 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from .chat_service import ChatService
 from .config import Settings
+from .history_summary import HistorySummaryCache
+from .http_pool import HttpPool
+from .mcp_client import close_pooled_sessions
+from .mcp_session_pool import McpSessionPool
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, GatewayMetrics
+from .tool_cache import ToolResultCache
 from .models import AskStreamRequest
-from .usage_tracker import get_user_usage_async
+from .persistence import PersistenceQueue
+from .quota_cache import QuotaCache
+from .sse import SseCoalescer, TextDelta
+from .usage_tracker import get_user_usage_async, set_quota_cache
 from . import supabase_store
 
-app = FastAPI(title="Ask Gateway", version="1.0.0")
 logger = logging.getLogger("ask-gateway")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = Settings()
+    http_pool = HttpPool(settings)
+    app.state.http_pool = http_pool
+    app.state.mcp_sessions = (
+        McpSessionPool(
+            idle_ttl=settings.mcp_session_idle_ttl_seconds,
+            max_size=settings.mcp_session_pool_max_size,
+        )
+        if settings.mcp_session_pool_enabled
+        else None
+    )
+    app.state.tool_cache = (
+        ToolResultCache(max_entries=settings.tool_cache_max_entries)
+        if settings.tool_cache_enabled
+        else None
+    )
+    app.state.persistence = PersistenceQueue(
+        max_size=settings.persist_queue_size,
+        max_retries=settings.persist_max_retries,
+        retry_backoff_seconds=settings.persist_retry_backoff_seconds,
+    )
+    app.state.quota_cache = (
+        QuotaCache(
+            max_entries=settings.quota_cache_max_entries,
+            max_age=settings.quota_cache_max_age_seconds,
+        )
+        if settings.quota_cache_enabled
+        else None
+    )
+    app.state.history_summaries = (
+        HistorySummaryCache(
+            max_entries=settings.history_summary_cache_max_entries,
+            keep_turns=settings.history_keep_turns,
+            slide_turns=settings.history_slide_turns,
+        )
+        if settings.history_compaction_enabled
+        else None
+    )
+    app.state.metrics = GatewayMetrics() if settings.metrics_enabled else None
+    supabase_store.set_http_client(http_pool.supabase)
+    set_quota_cache(app.state.quota_cache)
+    app.state.persistence.start()
+    try:
+        yield
+    finally:
+        # Flush queued turns while the Supabase client is still open.
+        await app.state.persistence.close(timeout=settings.persist_flush_timeout_seconds)
+        if app.state.mcp_sessions is not None:
+            await close_pooled_sessions(settings, app.state.mcp_sessions, http_pool.mcp)
+        set_quota_cache(None)
+        supabase_store.set_http_client(None)
+        await http_pool.close()
+
+
+app = FastAPI(title="Ask Gateway", version="1.0.0", lifespan=lifespan)
+
+
 def get_settings() -> Settings:
     return Settings()
 
 
-def get_chat_service(settings: Settings = Depends(get_settings)) -> ChatService:
-    return ChatService(settings)
+def get_chat_service(request: Request, settings: Settings = Depends(get_settings)) -> ChatService:
+    return ChatService(
+        settings,
+        http_pool=getattr(request.app.state, "http_pool", None),
+        mcp_sessions=getattr(request.app.state, "mcp_sessions", None),
+        tool_cache=getattr(request.app.state, "tool_cache", None),
+        persistence=getattr(request.app.state, "persistence", None),
+        metrics=getattr(request.app.state, "metrics", None),
+        history_summaries=getattr(request.app.state, "history_summaries", None),
+    )
 
 
 def _validate_gateway_auth(settings: Settings, authorization: str | None) -> None:
@@ -38,6 +116,32 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/health/stats")
+async def health_stats(request: Request) -> dict:
+    http_pool: HttpPool | None = getattr(request.app.state, "http_pool", None)
+    mcp_sessions: McpSessionPool | None = getattr(request.app.state, "mcp_sessions", None)
+    tool_cache: ToolResultCache | None = getattr(request.app.state, "tool_cache", None)
+    persistence: PersistenceQueue | None = getattr(request.app.state, "persistence", None)
+    quota_cache: QuotaCache | None = getattr(request.app.state, "quota_cache", None)
+    history_summaries: HistorySummaryCache | None = getattr(request.app.state, "history_summaries", None)
+    return {
+        "http": http_pool.stats() if http_pool else None,
+        "mcpSessions": mcp_sessions.stats() if mcp_sessions else None,
+        "toolCache": tool_cache.stats() if tool_cache else None,
+        "persistence": persistence.stats() if persistence else None,
+        "quotaCache": quota_cache.stats() if quota_cache else None,
+        "historySummaries": history_summaries.stats() if history_summaries else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics(request: Request) -> PlainTextResponse:
+    gateway_metrics: GatewayMetrics | None = getattr(request.app.state, "metrics", None)
+    if gateway_metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(gateway_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/ask/quota")
 async def get_quota(
     netid: str,
@@ -87,7 +191,6 @@ async def ask_stream(
     settings: Settings = Depends(get_settings),
 ) -> StreamingResponse:
     _validate_gateway_auth(settings, authorization)
-    disconnect_state = {"value": False}
     request_id = str(uuid.uuid4())
     logger.info(
         "ask_stream.start request_id=%s conversation_id=%s message_count=%s",
@@ -97,24 +200,59 @@ async def ask_stream(
     )
 
     async def event_stream():
-        async def monitor_disconnect() -> None:
-            while not disconnect_state["value"]:
-                if await request.is_disconnected():
-                    disconnect_state["value"] = True
-                    logger.info("ask_stream.client_disconnected request_id=%s", request_id)
-                    return
-                await asyncio.sleep(0.05)
-
-        monitor_task = asyncio.create_task(monitor_disconnect())
+        # The chat stream runs in its own task so a disconnect can cancel it
+        # mid-await, which aborts in-flight LLM streams and tool calls.
+        disconnected = asyncio.Event()
+        # Bounded so a slow client holds back the producer instead of the
+        # whole answer piling up in memory.
+        chunks: asyncio.Queue[str | TextDelta | None] = asyncio.Queue(
+            maxsize=max(1, settings.sse_queue_max_chunks)
+        )
+
+        async def produce() -> None:
+            finished = False
+            try:
+                async for chunk in chat_service.stream_chat(
+                    payload,
+                    is_disconnected=disconnected.is_set,
+                    request_id=request_id,
+                    text_deltas=settings.sse_coalesce_enabled,
+                ):
+                    await chunks.put(chunk)
+                await chunks.put(None)
+                finished = True
+            finally:
+                if not finished:
+                    # Cancelled or failed: the reader may be gone, so make
+                    # room for the end marker rather than wait for it.
+                    if chunks.full():
+                        chunks.get_nowait()
+                    chunks.put_nowait(None)
+
+        async def watch_disconnect() -> None:
+            # The body has already been read, so the next ASGI message is
+            # the disconnect; no polling needed.
+            while (await request.receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+            logger.info("ask_stream.client_disconnected request_id=%s", request_id)
+            producer.cancel()
+
+        producer = asyncio.create_task(produce())
+        watcher = asyncio.create_task(watch_disconnect())
         try:
-            async for chunk in chat_service.stream_chat(
-                payload,
-                is_disconnected=lambda: disconnect_state["value"],
-                request_id=request_id,
-            ):
-                yield chunk
+            if settings.sse_coalesce_enabled:
+                async for frames in _coalesced(chunks, settings):
+                    yield frames
+            else:
+                while (chunk := await chunks.get()) is not None:
+                    yield chunk
+            if not disconnected.is_set():
+                await producer
         finally:
-            monitor_task.cancel()
+            watcher.cancel()
+            producer.cancel()
+            await asyncio.gather(producer, watcher, return_exceptions=True)
             logger.info("ask_stream.finish request_id=%s", request_id)
 
     return StreamingResponse(
@@ -122,3 +260,38 @@ async def ask_stream(
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+async def _coalesced(
+    chunks: asyncio.Queue[str | TextDelta | None], settings: Settings
+) -> AsyncIterator[str]:
+    """Merge queued deltas into frames; each yield is one write to the client."""
+    coalescer = SseCoalescer(
+        flush_interval=settings.sse_flush_interval_ms / 1000,
+        max_bytes=settings.sse_flush_max_bytes,
+    )
+    while True:
+        deadline = coalescer.deadline()
+        try:
+            if deadline is None:
+                chunk = await chunks.get()
+            else:
+                async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                    chunk = await chunks.get()
+        except TimeoutError:
+            # Buffered text is due and nothing new has arrived.
+            if frames := coalescer.drain():
+                yield frames
+            continue
+        # Take everything already queued too, so a slow client gets fewer,
+        # larger writes instead of falling further behind.
+        while chunk is not None and not chunks.empty():
+            coalescer.push(chunk)
+            chunk = chunks.get_nowait()
+        if chunk is None:
+            if frames := coalescer.close():
+                yield frames
+            return
+        coalescer.push(chunk)
+        if frames := coalescer.drain():
+            yield frames
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import time
@@ -8,10 +9,13 @@ from typing import Any
 import httpx
 
 from .config import Settings
+from .mcp_session_pool import McpSessionPool
+from .tool_cache import ToolResultCache
 
 logger = logging.getLogger("ask-gateway.mcp")
 
 _TOOLS_CACHE_TTL = 60.0  # seconds
+_ERROR_BODY_LIMIT = 64 * 1024
 
 # Module-level cache: mcp_url -> (openai_tools, mcp_tools, timestamp)
 _tools_cache: dict[str, tuple[list[dict[str, Any]], list[dict[str, Any]], float]] = {}
@@ -28,17 +32,37 @@ class McpHttpClient:
         *,
         netid: str | None = None,
         mcp_url: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        session_pool: McpSessionPool | None = None,
+        tool_cache: ToolResultCache | None = None,
     ) -> None:
         self._settings = settings
         self._netid = netid
         self._mcp_url = mcp_url or settings.mcp_url
         self._session_id: str | None = None
-        self._client = httpx.AsyncClient(
+        # A shared pooled client outlives this instance and is closed by the app.
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.AsyncClient(
             timeout=httpx.Timeout(settings.tool_timeout_seconds, connect=settings.connect_timeout_seconds)
         )
         self._next_id = 1
+        self._session_pool = session_pool
+        self._session_lock = asyncio.Lock()
+        self._tool_cache = tool_cache
+        # Coalesced tool calls still running on this session.
+        self._borrowed: set[asyncio.Task[Any]] = set()
 
     async def initialize(self) -> str:
+        if self._session_pool is not None:
+            pooled = self._session_pool.acquire((self._mcp_url, self._netid))
+            if pooled is not None:
+                self._session_id = pooled.session_id
+                self._next_id = pooled.next_id
+                return self._session_id
+        return await self._handshake()
+
+    async def _handshake(self) -> str:
+        self._session_id = None
         payload = {
             "jsonrpc": "2.0",
             "id": self._next(),
@@ -49,8 +73,8 @@ class McpHttpClient:
                 "clientInfo": {"name": "ask-gateway", "version": "1.0.0"},
             },
         }
-        response = await self._post(payload)
-        self._session_id = response.headers.get("mcp-session-id")
+        headers, _ = await self._post(payload)
+        self._session_id = headers.get("mcp-session-id")
         if not self._session_id:
             raise McpClientError("MCP initialize succeeded but no mcp-session-id header was returned.")
         await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
@@ -62,7 +86,7 @@ class McpHttpClient:
         Results are cached for 60 seconds to avoid redundant calls.
         Initializes a session if one doesn't exist yet.
         """
-        # Always ensure session exists (each client instance needs its own)
+        # Always ensure a session exists (reused from the pool when available)
         if self._session_id is None:
             await self.initialize()
 
@@ -79,8 +103,7 @@ class McpHttpClient:
             "method": "tools/list",
             "params": {},
         }
-        response = await self._post(payload)
-        message = _extract_jsonrpc(response.text, expected_id=payload["id"])
+        _, message = await self._post(payload)
         if "error" in message:
             raise McpClientError(f"MCP tools/list failed: {message['error']}")
 
@@ -92,14 +115,31 @@ class McpHttpClient:
         return openai_tools
 
     async def call_tool(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        if self._tool_cache is None:
+            return await self._call_tool(name, arguments)
+        return await self._tool_cache.call(
+            self._mcp_url, self._netid, name, arguments, self._call_tool, self._shared_call_tool
+        )
+
+    def _shared_call_tool(self, name: str, arguments: dict[str, Any]) -> asyncio.Task[dict[str, Any]]:
+        """Start a call other requests may wait on, on this client's session.
+
+        The coalesced call can outlive this request, so ``close`` waits for it
+        before the session goes back to the pool or is deleted.
+        """
+        task = asyncio.ensure_future(self._call_tool(name, arguments))
+        self._borrowed.add(task)
+        task.add_done_callback(self._borrowed.discard)
+        return task
+
+    async def _call_tool(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
         payload = {
             "jsonrpc": "2.0",
             "id": self._next(),
             "method": "tools/call",
             "params": {"name": name, "arguments": arguments},
         }
-        response = await self._post(payload)
-        message = _extract_jsonrpc(response.text, expected_id=payload["id"])
+        _, message = await self._post(payload)
         if "error" in message:
             raise McpClientError(f"MCP tool call failed: {message['error']}")
         result = message.get("result", {})
@@ -109,52 +149,117 @@ class McpHttpClient:
 
     async def close(self) -> None:
         try:
+            if self._borrowed:
+                await asyncio.wait(self._borrowed, timeout=self._settings.tool_timeout_seconds)
             if self._session_id:
-                # DELETE carries no body, so omit `content-type: application/json`
-                # to avoid a 400 from strict JSON parsers on the server.
-                headers = self._headers(include_session=True)
-                headers.pop("content-type", None)
-                response = await self._client.delete(self._mcp_url, headers=headers)
-                if response.status_code >= 400:
-                    logger.warning(
-                        "MCP session close failed: status=%s session=%s body=%s",
-                        response.status_code,
-                        self._session_id,
-                        response.text[:200],
-                    )
-        except Exception as exc:  # pragma: no cover - close must never raise
-            logger.warning("MCP session close errored for %s: %s", self._session_id, exc)
+                if self._session_pool is not None:
+                    self._session_pool.release((self._mcp_url, self._netid), self._session_id, self._next_id)
+                else:
+                    await self._delete_session(self._mcp_url, self._netid, self._session_id)
+            if self._session_pool is not None:
+                for (mcp_url, netid), session_id in self._session_pool.take_retired():
+                    await self._delete_session(mcp_url, netid, session_id)
         finally:
-            await self._client.aclose()
+            if self._owns_client:
+                await self._client.aclose()
+
+    async def _delete_session(self, mcp_url: str, netid: str | None, session_id: str) -> None:
+        try:
+            # DELETE carries no body, so omit `content-type: application/json`
+            # to avoid a 400 from strict JSON parsers on the server.
+            headers = _session_headers(self._settings, netid, session_id)
+            headers.pop("content-type", None)
+            response = await self._client.delete(mcp_url, headers=headers)
+            if response.status_code >= 400:
+                logger.warning(
+                    "MCP session close failed: status=%s session=%s body=%s",
+                    response.status_code,
+                    session_id,
+                    response.text[:200],
+                )
+        except Exception as exc:  # pragma: no cover - close must never raise
+            logger.warning("MCP session close errored for %s: %s", session_id, exc)
 
     def _next(self) -> int:
         current = self._next_id
         self._next_id += 1
         return current
 
-    async def _post(self, payload: dict[str, Any]) -> httpx.Response:
-        response = await self._client.post(
-            self._mcp_url,
-            headers=self._headers(include_session=True),
-            json=payload,
-        )
-        if response.status_code >= 400:
-            raise McpClientError(f"MCP HTTP error {response.status_code}: {response.text}")
-        return response
+    async def _post(self, payload: dict[str, Any]) -> tuple[httpx.Headers, dict[str, Any]]:
+        """POST a JSON-RPC message and return the response headers plus, for
+        requests (payloads with an ``id``), the matching JSON-RPC response."""
+        session_id = self._session_id
+        for attempt in range(2):
+            async with self._client.stream(
+                "POST",
+                self._mcp_url,
+                headers=self._headers(include_session=True),
+                json=payload,
+            ) as response:
+                if response.status_code < 400:
+                    message: dict[str, Any] = {}
+                    if "id" in payload:
+                        message = await _read_jsonrpc(
+                            response, payload["id"], self._settings.mcp_max_payload_bytes
+                        )
+                    return response.headers, message
+                body = (await _read_capped(response, _ERROR_BODY_LIMIT)).decode(errors="replace")
+                if attempt > 0 or not session_id or not _is_session_gone(response.status_code, body):
+                    raise McpClientError(f"MCP HTTP error {response.status_code}: {body}")
+            # The server dropped our (possibly pooled) session: start a new
+            # one and replay the request once.
+            await self._reinitialize(session_id)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def _reinitialize(self, stale_session_id: str) -> None:
+        async with self._session_lock:
+            # A concurrent call on this client may already have replaced it.
+            if self._session_id != stale_session_id:
+                return
+            logger.info("MCP session %s is gone on the server; re-initializing", stale_session_id)
+            if self._session_pool is not None:
+                self._session_pool.reinitializations += 1
+            await self._handshake()
 
     def _headers(self, include_session: bool) -> dict[str, str]:
-        headers = {
-            "content-type": "application/json",
-            "accept": "application/json, text/event-stream",
-        }
-        if self._settings.mcp_token:
-            headers["authorization"] = f"Bearer {self._settings.mcp_token}"
-        if self._netid:
-            headers["x-user-netid"] = self._netid
-        if include_session and self._session_id:
-            headers["mcp-session-id"] = self._session_id
-            headers["mcp-protocol-version"] = self._settings.mcp_protocol_version
-        return headers
+        return _session_headers(
+            self._settings, self._netid, self._session_id if include_session else None
+        )
+
+
+async def close_pooled_sessions(
+    settings: Settings, session_pool: McpSessionPool, http_client: httpx.AsyncClient
+) -> None:
+    """DELETE every idle pooled session on the server (used on shutdown)."""
+    client = McpHttpClient(settings, http_client=http_client)
+    for (mcp_url, netid), session_id in session_pool.drain():
+        await client._delete_session(mcp_url, netid, session_id)
+
+
+def _session_headers(settings: Settings, netid: str | None, session_id: str | None) -> dict[str, str]:
+    headers = {
+        "content-type": "application/json",
+        "accept": "application/json, text/event-stream",
+    }
+    if settings.mcp_token:
+        headers["authorization"] = f"Bearer {settings.mcp_token}"
+    if netid:
+        headers["x-user-netid"] = netid
+    if session_id:
+        headers["mcp-session-id"] = session_id
+        headers["mcp-protocol-version"] = settings.mcp_protocol_version
+    return headers
+
+
+def _is_session_gone(status_code: int, body: str) -> bool:
+    # Spec-compliant servers answer 404 for unknown sessions; the engine
+    # instead spins up an uninitialized transport that rejects with a 400.
+    if status_code == 404:
+        return True
+    if status_code != 400:
+        return False
+    body = body.lower()
+    return "not initialized" in body or "no valid session" in body
 
 
 def _mcp_tools_to_openai(mcp_tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -175,11 +280,78 @@ def _mcp_tools_to_openai(mcp_tools: list[dict[str, Any]]) -> list[dict[str, Any]
     return openai_tools
 
 
-def _extract_jsonrpc(raw: str, expected_id: int) -> dict[str, Any]:
-    for line in raw.splitlines():
-        if not line.startswith("data: "):
-            continue
-        payload = json.loads(line[6:])
-        if payload.get("id") == expected_id:
-            return payload
-    raise McpClientError(f"MCP response did not include JSON-RPC message for id {expected_id}.")
+async def _read_capped(response: httpx.Response, max_bytes: int) -> bytes:
+    chunks: list[bytes] = []
+    received = 0
+    async for chunk in response.aiter_bytes():
+        received += len(chunk)
+        if received > max_bytes:
+            raise McpClientError(f"MCP response exceeded {max_bytes} bytes.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _read_jsonrpc(response: httpx.Response, expected_id: int, max_bytes: int) -> dict[str, Any]:
+    """Read the JSON-RPC message for ``expected_id`` from a plain JSON or an
+    SSE response body without buffering the whole body as text."""
+    content_type = response.headers.get("content-type", "")
+    if "text/event-stream" not in content_type:
+        try:
+            payload = json.loads(await _read_capped(response, max_bytes) or b"null")
+        except ValueError as exc:
+            raise McpClientError(f"MCP response was not valid JSON: {exc}") from exc
+        for message in payload if isinstance(payload, list) else [payload]:
+            if isinstance(message, dict) and message.get("id") == expected_id:
+                return message
+        raise McpClientError(f"MCP response did not include JSON-RPC message for id {expected_id}.")
+
+    buffer = bytearray()
+    scanned = 0  # leading bytes of `buffer` already known to hold no newline
+    data_lines: list[bytes] = []
+    received = 0
+    async for chunk in response.aiter_bytes():
+        received += len(chunk)
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", max(start, scanned))
+            if newline < 0:
+                break
+            line = bytes(buffer[start:newline]).rstrip(b"\r")
+            start = newline + 1
+            if line.startswith(b"data:"):
+                data_lines.append(_sse_data(line))
+            elif not line and data_lines:
+                found = _match_event(data_lines, expected_id)
+                if found is not None:
+                    # Stop at the match; the rest of the stream is not needed.
+                    return found
+                data_lines = []
+        del buffer[:start]
+        scanned = len(buffer)
+        # Checked after parsing so a result already received is still returned.
+        if received > max_bytes:
+            raise McpClientError(f"MCP response exceeded {max_bytes} bytes.")
+    # The stream may end without a blank line after the last event.
+    line = bytes(buffer).rstrip(b"\r")
+    if line.startswith(b"data:"):
+        data_lines.append(_sse_data(line))
+    found = _match_event(data_lines, expected_id) if data_lines else None
+    if found is None:
+        raise McpClientError(f"MCP response did not include JSON-RPC message for id {expected_id}.")
+    return found
+
+
+def _sse_data(line: bytes) -> bytes:
+    return line[6:] if line.startswith(b"data: ") else line[5:]
+
+
+def _match_event(data_lines: list[bytes], expected_id: int) -> dict[str, Any] | None:
+    try:
+        payload = json.loads(b"\n".join(data_lines))
+    except ValueError:
+        # Not a JSON-RPC message (e.g. a non-JSON keep-alive); skip it.
+        return None
+    if isinstance(payload, dict) and payload.get("id") == expected_id:
+        return payload
+    return None
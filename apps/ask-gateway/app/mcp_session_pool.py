@@ -0,0 +1,108 @@
+"""Warm MCP sessions reused across chat requests.
+
+Sessions are keyed by ``(mcp_url, netid)`` because the engine binds every
+session to the caller identity it was created with. Idle sessions expire
+after ``idle_ttl`` seconds and the pool never holds more than ``max_size``;
+sessions dropped for either reason are queued as *retired* so the next
+client to close can DELETE them on the server.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any
+
+SessionKey = tuple[str, str | None]
+
+
+@dataclass
+class PooledSession:
+    session_id: str
+    next_id: int
+    released_at: float
+
+
+class McpSessionPool:
+    def __init__(self, *, idle_ttl: float, max_size: int) -> None:
+        self._idle_ttl = idle_ttl
+        self._max_size = max_size
+        self._idle: dict[SessionKey, list[PooledSession]] = {}
+        self._size = 0
+        self._retired: list[tuple[SessionKey, str]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.reinitializations = 0
+
+    def acquire(self, key: SessionKey) -> PooledSession | None:
+        """Check out the most recently released live session for ``key``."""
+        self._expire(time.monotonic())
+        sessions = self._idle.get(key)
+        if not sessions:
+            self.misses += 1
+            return None
+        session = sessions.pop()
+        self._size -= 1
+        if not sessions:
+            del self._idle[key]
+        self.hits += 1
+        return session
+
+    def release(self, key: SessionKey, session_id: str, next_id: int) -> None:
+        now = time.monotonic()
+        self._idle.setdefault(key, []).append(PooledSession(session_id, next_id, now))
+        self._size += 1
+        self._expire(now)
+        while self._size > self._max_size:
+            self._evict_oldest()
+
+    def take_retired(self) -> list[tuple[SessionKey, str]]:
+        retired, self._retired = self._retired, []
+        return retired
+
+    def drain(self) -> list[tuple[SessionKey, str]]:
+        """Retire every idle session (used on shutdown)."""
+        for key, sessions in self._idle.items():
+            self._retired.extend((key, session.session_id) for session in sessions)
+        self._idle.clear()
+        self._size = 0
+        return self.take_retired()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "idle": self._size,
+            "keys": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "reinitializations": self.reinitializations,
+        }
+
+    def _expire(self, now: float) -> None:
+        for key in list(self._idle):
+            sessions = self._idle[key]
+            live = [s for s in sessions if now - s.released_at < self._idle_ttl]
+            if len(live) == len(sessions):
+                continue
+            for session in sessions:
+                if session not in live:
+                    self._retired.append((key, session.session_id))
+            self.expirations += len(sessions) - len(live)
+            self._size -= len(sessions) - len(live)
+            if live:
+                self._idle[key] = live
+            else:
+                del self._idle[key]
+
+    def _evict_oldest(self) -> None:
+        key = min(self._idle, key=lambda k: self._idle[k][0].released_at)
+        sessions = self._idle[key]
+        session = sessions.pop(0)
+        if not sessions:
+            del self._idle[key]
+        self._size -= 1
+        self.evictions += 1
+        self._retired.append((key, session.session_id))
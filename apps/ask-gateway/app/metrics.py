@@ -0,0 +1,236 @@
+"""Latency metrics for ``/ask/stream``.
+
+Each request gets a ``RequestTimings`` that records how long every phase took
+(quota lookup, tool listing, LLM calls, tool calls, persistence), LLM
+time-to-first-token, generation speed and the estimated tokens of tool results
+fed back to the LLM. Spans are observed into
+``GatewayMetrics`` as they finish, and per-request totals when the request
+ends. ``GatewayMetrics.render`` produces the Prometheus text format served on
+``GET /metrics``.
+
+Histograms are kept in-process, so each worker exports its own series.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+logger = logging.getLogger("ask-gateway.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (5.0, 10.0, 20.0, 40.0, 60.0, 80.0, 100.0, 150.0, 200.0, 300.0)
+ITERATION_BUCKETS = (1.0, 2.0, 3.0, 4.0, 5.0, 8.0, 12.0, 20.0)
+TOKEN_BUCKETS = (100.0, 250.0, 500.0, 1000.0, 2000.0, 4000.0, 8000.0, 16000.0, 32000.0, 64000.0)
+
+# Label values come partly from the model (tool names), so cap the number of
+# series a histogram can grow to.
+MAX_SERIES = 200
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            if len(self._series) >= MAX_SERIES:
+                label_values = ("other",) * len(self.labels)
+            series = self._series.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = "".join(
+                f'{name}="{_escape(value)}",' for name, value in zip(self.labels, label_values)
+            )
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class GatewayMetrics:
+    def __init__(self) -> None:
+        self.phase_seconds = Histogram(
+            "ask_phase_seconds",
+            "Duration of each phase of an /ask/stream request.",
+            LATENCY_BUCKETS,
+            ("phase",),
+        )
+        self.ttft_seconds = Histogram(
+            "ask_llm_ttft_seconds",
+            "Time from sending an LLM request to its first streamed delta.",
+            LATENCY_BUCKETS,
+        )
+        self.tokens_per_second = Histogram(
+            "ask_llm_tokens_per_second",
+            "Completion tokens per second of LLM generation, per request.",
+            RATE_BUCKETS,
+        )
+        self.tool_seconds = Histogram(
+            "ask_tool_seconds",
+            "MCP tool call latency by tool.",
+            LATENCY_BUCKETS,
+            ("tool",),
+        )
+        self.iterations = Histogram(
+            "ask_llm_iterations",
+            "LLM iterations (tool-calling rounds) per /ask/stream request.",
+            ITERATION_BUCKETS,
+        )
+        self.request_seconds = Histogram(
+            "ask_request_seconds",
+            "Total /ask/stream handling time by outcome.",
+            LATENCY_BUCKETS,
+            ("outcome",),
+        )
+        self.tool_result_tokens = Histogram(
+            "ask_tool_result_tokens",
+            "Estimated tokens per tool result, as returned (raw) and as sent to the LLM.",
+            TOKEN_BUCKETS,
+            ("stage",),
+        )
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for histogram in (
+            self.request_seconds,
+            self.phase_seconds,
+            self.ttft_seconds,
+            self.tokens_per_second,
+            self.tool_seconds,
+            self.iterations,
+            self.tool_result_tokens,
+        ):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Span timings for one request; observed into ``metrics`` when given."""
+
+    def __init__(self, metrics: GatewayMetrics | None = None, request_id: str | None = None) -> None:
+        self._metrics = metrics
+        self._request_id = request_id
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.tools: list[tuple[str, float]] = []
+        self.tool_result_tokens = {"raw": 0, "sent": 0}
+        self.ttft: float | None = None
+        self.iterations = 0
+        self.completion_tokens = 0
+        self.generation_seconds = 0.0
+        self.outcome: str | None = None
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        if self._metrics is not None:
+            self._metrics.phase_seconds.observe(seconds, phase)
+
+    def tool(self, name: str, seconds: float) -> None:
+        self.tools.append((name, seconds))
+        if self._metrics is not None:
+            self._metrics.tool_seconds.observe(seconds, name)
+
+    def tool_result(self, raw_tokens: int, sent_tokens: int) -> None:
+        self.tool_result_tokens["raw"] += raw_tokens
+        self.tool_result_tokens["sent"] += sent_tokens
+        if self._metrics is not None:
+            self._metrics.tool_result_tokens.observe(raw_tokens, "raw")
+            self._metrics.tool_result_tokens.observe(sent_tokens, "sent")
+
+    def llm_call(self, ttft: float | None, seconds: float, generation_seconds: float) -> None:
+        """Record one streamed LLM call; ``ttft`` is None if nothing streamed."""
+        self.iterations += 1
+        self.generation_seconds += generation_seconds
+        if ttft is not None:
+            if self.ttft is None:
+                self.ttft = ttft
+            if self._metrics is not None:
+                self._metrics.ttft_seconds.observe(ttft)
+        self.add("llm", seconds)
+
+    def tokens_per_second(self) -> float | None:
+        if not self.completion_tokens or self.generation_seconds <= 0:
+            return None
+        return self.completion_tokens / self.generation_seconds
+
+    def finish(self, outcome: str) -> None:
+        """Record request-level totals; later calls are ignored."""
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        total = time.perf_counter() - self.started
+        if self._metrics is not None:
+            self._metrics.request_seconds.observe(total, outcome)
+            if self.iterations:
+                self._metrics.iterations.observe(self.iterations)
+            rate = self.tokens_per_second()
+            if rate is not None:
+                self._metrics.tokens_per_second.observe(rate)
+        logger.info(
+            "ask_stream.timings request_id=%s outcome=%s total_ms=%.0f %s",
+            self._request_id,
+            outcome,
+            total * 1000,
+            " ".join(f"{phase}_ms={seconds * 1000:.0f}" for phase, seconds in self.phases.items()),
+        )
+
+    def summary(self) -> dict[str, Any]:
+        """Timings so far, in milliseconds, for the ``done`` event."""
+        rate = self.tokens_per_second()
+        return {
+            "totalMs": _ms(time.perf_counter() - self.started),
+            "phasesMs": {phase: _ms(seconds) for phase, seconds in self.phases.items()},
+            "ttftMs": _ms(self.ttft) if self.ttft is not None else None,
+            "tokensPerSecond": round(rate, 1) if rate is not None else None,
+            "iterations": self.iterations,
+            "tools": [{"name": name, "ms": _ms(seconds)} for name, seconds in self.tools],
+            "toolResultTokens": dict(self.tool_result_tokens),
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
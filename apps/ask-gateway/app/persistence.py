@@ -0,0 +1,147 @@
+"""Write-behind persistence of finished chat turns.
+
+Turns are queued on a bounded in-process queue and written by one background
+worker with retry and exponential backoff, so Supabase round trips stay off
+the response critical path. ``close()`` flushes what is queued on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Coroutine
+
+from . import supabase_store
+
+logger = logging.getLogger("ask-gateway.persistence")
+
+
+@dataclass
+class TurnRecord:
+    conversation_id: str
+    netid: str
+    title: str
+    messages: list[dict[str, Any]]
+    # Fixed when the turn is created, so every retry writes the same rows at
+    # the time of the request rather than of the flush.
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    message_ids: list[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.message_ids:
+            self.message_ids = [str(uuid.uuid4()) for _ in self.messages]
+
+
+class PersistenceQueue:
+    def __init__(self, *, max_size: int, max_retries: int, retry_backoff_seconds: float) -> None:
+        self._queue: asyncio.Queue[TurnRecord] = asyncio.Queue(maxsize=max_size)
+        self._max_retries = max_retries
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._worker: asyncio.Task[None] | None = None
+        self._deferred: set[asyncio.Task[Any]] = set()
+        self.persisted = 0
+        self.failed = 0
+        self.retries = 0
+        self.deferred_failed = 0
+        self.quota_failed = 0
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, turn: TurnRecord) -> None:
+        """Queue a turn; only waits when the queue is full (backpressure)."""
+        if self._worker is None:
+            await self._persist(turn)
+            return
+        await self._queue.put(turn)
+
+    def defer(self, work: Coroutine[Any, Any, Any]) -> None:
+        """Run durable work (quota recording, turn submission) in the
+        background; failures are logged and counted, never raised."""
+        task = asyncio.create_task(work)
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred_done)
+
+    def record_quota_failure(self) -> None:
+        """Count a quota write that failed after its answer was sent."""
+        self.quota_failed += 1
+
+    async def close(self, timeout: float) -> None:
+        try:
+            # Deferred work may still submit turns, so let it finish first.
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "persistence.flush_timeout pending=%s deferred=%s",
+                self._queue.qsize(),
+                len(self._deferred),
+            )
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self._queue.qsize(),
+            "persisted": self.persisted,
+            "failed": self.failed,
+            "retries": self.retries,
+            "deferred": len(self._deferred),
+            "deferredFailed": self.deferred_failed,
+            "quotaFailed": self.quota_failed,
+        }
+
+    async def _drain(self) -> None:
+        if self._deferred:
+            await asyncio.gather(*self._deferred, return_exceptions=True)
+        if self._worker is not None:
+            await self._queue.join()
+
+    def _deferred_done(self, task: asyncio.Task[Any]) -> None:
+        self._deferred.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.deferred_failed += 1
+            logger.error("persistence.deferred_failed error=%s", exc)
+
+    async def _run(self) -> None:
+        while True:
+            turn = await self._queue.get()
+            try:
+                await self._persist(turn)
+            finally:
+                self._queue.task_done()
+
+    async def _persist(self, turn: TurnRecord) -> None:
+        for attempt in range(self._max_retries + 1):
+            try:
+                await supabase_store.save_turn(
+                    turn.conversation_id,
+                    turn.netid,
+                    turn.title,
+                    turn.messages,
+                    created_at=turn.created_at,
+                    message_ids=turn.message_ids,
+                )
+                self.persisted += 1
+                return
+            except Exception as exc:
+                if attempt == self._max_retries:
+                    self.failed += 1
+                    logger.error(
+                        "persistence.failed conversation_id=%s messages=%s error=%s",
+                        turn.conversation_id,
+                        len(turn.messages),
+                        exc,
+                    )
+                    return
+                self.retries += 1
+                await asyncio.sleep(self._retry_backoff_seconds * 2**attempt)
@@ -0,0 +1,90 @@
+"""In-process cache of per-user quota spend.
+
+Entries are keyed by ``(netid, window)`` and expire when their 8-hour quota
+window rolls over, or after ``max_age`` seconds so spend recorded by other
+gateway workers is picked up eventually. ``record_usage_async`` writes the
+post-increment total through, so a single worker never serves stale spend.
+
+Multi-worker deployments can pass ``on_write`` to broadcast writes (e.g. over
+Redis pub/sub) and call ``invalidate`` when a peer's message arrives.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+logger = logging.getLogger("ask-gateway.quota_cache")
+
+QuotaKey = tuple[str, str]
+
+
+class QuotaCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        max_age: float,
+        on_write: Callable[[str, str, float], None] | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._on_write = on_write
+        self._entries: OrderedDict[QuotaKey, tuple[float, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, netid: str, window: str) -> float | None:
+        key = (netid, window)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, spent = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return spent
+
+    def put(self, netid: str, window: str, spent: float, window_seconds_left: float) -> None:
+        """Store a spend value read from Supabase."""
+        current = self._entries.get((netid, window))
+        # Spend only grows within a window. A read that started before a
+        # concurrent write-through (or increments that finish out of order)
+        # must not roll the cached total back.
+        if current is not None and current[1] > spent:
+            spent = current[1]
+        expires_at = time.monotonic() + min(self._max_age, window_seconds_left)
+        self._entries[(netid, window)] = (expires_at, spent)
+        self._entries.move_to_end((netid, window))
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def write_through(self, netid: str, window: str, spent: float, window_seconds_left: float) -> None:
+        """Store a post-increment total returned by a quota write."""
+        self.put(netid, window, spent, window_seconds_left)
+        if self._on_write is not None:
+            try:
+                self._on_write(netid, window, self._entries[(netid, window)][1])
+            except Exception as exc:
+                logger.warning("quota_cache: on_write hook failed: %s", exc)
+
+    def invalidate(self, netid: str, window: str | None = None) -> None:
+        stale = [key for key in self._entries if key[0] == netid and (window is None or key[1] == window)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,99 @@
+"""SSE frame formatting and the coalescing output stage for ``/ask/stream``.
+
+Chat streams yield token and thinking deltas as ``TextDelta`` items and every
+other event as a pre-formatted frame. ``SseCoalescer`` merges consecutive
+deltas of the same kind into one frame, which goes out when the flush interval
+since its first delta elapses, when it reaches ``max_bytes``, or as soon as any
+other event arrives. Ready frames are joined so one write carries all of them.
+
+Clients see the same events as before, with longer ``text``/``content``
+strings.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from .json_codec import dumps_object
+
+
+def sse_event(event: str, data: dict, encoded: dict[str, str] | None = None) -> str:
+    """Format one SSE frame; ``encoded`` members are JSON text spliced in as is."""
+    return f"event: {event}\ndata: {dumps_object(data, encoded or {})}\n\n"
+
+
+@dataclass(frozen=True, slots=True)
+class TextDelta:
+    """A streamed text fragment sent as ``event: <event>`` with ``{field: text}``."""
+
+    event: str
+    field: str
+    text: str
+
+    def render(self) -> str:
+        return sse_event(self.event, {self.field: self.text})
+
+
+def token_delta(text: str) -> TextDelta:
+    return TextDelta("token", "text", text)
+
+
+def thinking_delta(text: str) -> TextDelta:
+    return TextDelta("thinking", "content", text)
+
+
+class SseCoalescer:
+    def __init__(self, *, flush_interval: float, max_bytes: int) -> None:
+        self._flush_interval = flush_interval
+        self._max_bytes = max_bytes
+        self._ready: list[str] = []
+        self._kind: tuple[str, str] | None = None
+        self._parts: list[str] = []
+        self._size = 0
+        self._started = 0.0
+        self.deltas = 0
+        self.frames = 0
+
+    def push(self, item: str | TextDelta) -> None:
+        if isinstance(item, str):
+            self._flush_text()
+            self._ready.append(item)
+            self.frames += 1
+            return
+        self.deltas += 1
+        kind = (item.event, item.field)
+        if kind != self._kind:
+            self._flush_text()
+            self._kind = kind
+            self._started = time.monotonic()
+        self._parts.append(item.text)
+        self._size += len(item.text)
+        if self._size >= self._max_bytes:
+            self._flush_text()
+
+    def deadline(self) -> float | None:
+        """Monotonic time by which buffered text must be sent, if any is buffered."""
+        return self._started + self._flush_interval if self._parts else None
+
+    def drain(self) -> str:
+        """Ready frames, joined; buffered text is included once its deadline passes."""
+        if self._parts and time.monotonic() >= self._started + self._flush_interval:
+            self._flush_text()
+        ready = "".join(self._ready)
+        self._ready.clear()
+        return ready
+
+    def close(self) -> str:
+        self._flush_text()
+        return self.drain()
+
+    def _flush_text(self) -> None:
+        if not self._parts:
+            return
+        event, field = self._kind
+        self._ready.append(sse_event(event, {field: "".join(self._parts)}))
+        self.frames += 1
+        self._kind = None
+        self._parts.clear()
+        self._size = 0
@@ -7,7 +7,9 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator
 
 import httpx
 
@@ -16,6 +18,23 @@ logger = logging.getLogger("ask-gateway.store")
 _SUPABASE_URL = os.getenv("SUPABASE_URL", "").rstrip("/")
 _SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
+# Pooled client installed by the app lifespan; None outside of a running app.
+_shared_client: httpx.AsyncClient | None = None
+
+
+def set_http_client(client: httpx.AsyncClient | None) -> None:
+    global _shared_client
+    _shared_client = client
+
+
+@asynccontextmanager
+async def _client() -> AsyncIterator[httpx.AsyncClient]:
+    if _shared_client is not None:
+        yield _shared_client
+        return
+    async with httpx.AsyncClient() as client:
+        yield client
+
 
 def _headers() -> dict[str, str]:
     return {
@@ -39,7 +58,7 @@ def _enabled() -> bool:
 async def get_quota_spent(netid: str, time_window: str) -> float:
     if not _enabled():
         return 0.0
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         r = await client.get(
             _rest_url("ask_quotas"),
             headers={**_headers(), "Accept": "application/json"},
@@ -55,7 +74,7 @@ async def get_quota_spent(netid: str, time_window: str) -> float:
 async def upsert_quota(netid: str, time_window: str, spent: float) -> None:
     if not _enabled():
         return
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         await client.post(
             _rest_url("ask_quotas"),
             headers={**_headers(), "Prefer": "resolution=merge-duplicates"},
@@ -63,12 +82,44 @@ async def upsert_quota(netid: str, time_window: str, spent: float) -> None:
         )
 
 
+# Flipped off the first time PostgREST reports the RPC is not installed
+# (e.g. a local stand-in without db/askQuota.sql applied).
+_increment_rpc_available = True
+
+
+async def increment_quota(netid: str, time_window: str, amount: float) -> float:
+    """Atomically add ``amount`` to the window's spend and return the new total.
+
+    Uses the ``increment_ask_quota`` RPC (one round trip, no lost updates);
+    falls back to read-then-upsert when the RPC is not installed.
+    """
+    global _increment_rpc_available
+    if not _enabled():
+        return 0.0
+    if _increment_rpc_available:
+        async with _client() as client:
+            r = await client.post(
+                _rest_url("rpc/increment_ask_quota"),
+                headers={**_headers(), "Accept": "application/json"},
+                json={"p_netid": netid, "p_time_window": time_window, "p_amount": round(amount, 6)},
+            )
+        if r.status_code == 200:
+            return float(r.json())
+        if r.status_code != 404:
+            r.raise_for_status()
+        logger.warning("increment_ask_quota RPC is missing; falling back to read-then-upsert")
+        _increment_rpc_available = False
+    new_spent = await get_quota_spent(netid, time_window) + amount
+    await upsert_quota(netid, time_window, new_spent)
+    return new_spent
+
+
 # ── Conversations ──────────────────────────────────────────────────────
 
 async def upsert_conversation(conv_id: str, netid: str, title: str) -> None:
     if not _enabled():
         return
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         await client.post(
             _rest_url("ask_conversations"),
             headers={**_headers(), "Prefer": "resolution=merge-duplicates"},
@@ -79,7 +130,7 @@ async def upsert_conversation(conv_id: str, netid: str, title: str) -> None:
 async def update_conversation_timestamp(conv_id: str) -> None:
     if not _enabled():
         return
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         await client.patch(
             _rest_url("ask_conversations"),
             headers=_headers(),
@@ -121,7 +172,7 @@ async def save_message(
         if model is not None:
             msg["model"] = model
 
-        async with httpx.AsyncClient() as client:
+        async with _client() as client:
             await client.post(
                 _rest_url("ask_messages"),
                 headers=_headers(),
@@ -134,10 +185,64 @@ async def save_message(
         logger.error("Failed to save message: %s", e)
 
 
+_MESSAGE_COLUMNS = ("role", "content", "cost", "input_tokens", "output_tokens", "model")
+
+
+async def save_turn(
+    conv_id: str,
+    netid: str,
+    title: str,
+    messages: list[dict[str, Any]],
+    *,
+    created_at: datetime | None = None,
+    message_ids: list[str] | None = None,
+) -> None:
+    """Persist a whole turn: one conversation upsert plus one bulk insert.
+
+    ``messages`` are ``ask_messages`` rows (``_MESSAGE_COLUMNS``). Rows
+    get strictly increasing ``created_at`` values from ``created_at`` so a
+    single-statement insert keeps its order. With ``message_ids`` the insert
+    is idempotent: a retry after a lost response skips rows that were
+    already written. Raises on HTTP errors so callers can retry.
+    """
+    if not _enabled() or not messages:
+        return
+    base = created_at or datetime.now(timezone.utc)
+    # PostgREST bulk inserts need every row to carry the same keys.
+    rows = [
+        {
+            **{column: message.get(column) for column in _MESSAGE_COLUMNS},
+            **({"id": message_ids[offset]} if message_ids else {}),
+            "conversation_id": conv_id,
+            "created_at": (base + timedelta(microseconds=offset)).isoformat(),
+        }
+        for offset, message in enumerate(messages)
+    ]
+    async with _client() as client:
+        r = await client.post(
+            _rest_url("ask_conversations"),
+            headers={**_headers(), "Prefer": "resolution=merge-duplicates"},
+            json={"id": conv_id, "netid": netid, "title": title[:100], "updated_at": base.isoformat()},
+        )
+        r.raise_for_status()
+        r = await client.post(
+            _rest_url("ask_messages"),
+            headers={
+                **_headers(),
+                "Prefer": "return=minimal,resolution=ignore-duplicates"
+                if message_ids
+                else "return=minimal",
+            },
+            params={"on_conflict": "id"} if message_ids else None,
+            json=rows,
+        )
+        r.raise_for_status()
+
+
 async def list_conversations(netid: str, limit: int = 20) -> list[dict[str, Any]]:
     if not _enabled():
         return []
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         r = await client.get(
             _rest_url("ask_conversations"),
             headers={**_headers(), "Accept": "application/json"},
@@ -160,7 +265,7 @@ async def get_conversation_messages(
     if not _enabled():
         return None
 
-    async with httpx.AsyncClient() as client:
+    async with _client() as client:
         # Verify ownership
         r = await client.get(
             _rest_url("ask_conversations"),
@@ -0,0 +1,166 @@
+"""In-process cache for MCP tool results.
+
+Only tools listed in ``TOOL_CACHE_POLICIES`` are cached. Keys combine the MCP
+URL, tool name and canonicalized arguments, plus the netid for user-scoped
+tools. Concurrent identical lookups share one in-flight call, made with
+``shared_fetch`` when given, so the first caller can keep its session open
+until the call ends even if that caller goes away. Tools in
+``USER_MUTATING_TOOLS`` are never cached and drop the caller's user-scoped
+entries once they succeed.
+
+Cached results are shared between requests and must be treated as read-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("ask-gateway.tool_cache")
+
+CacheKey = tuple[str, str, str, str | None]
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    ttl: float
+    user_scoped: bool = False
+
+
+TOOL_CACHE_POLICIES: dict[str, ToolCachePolicy] = {
+    # Catalog reads: change at most a few times a day.
+    "get_course_details": ToolCachePolicy(ttl=300),
+    "get_course_evaluations": ToolCachePolicy(ttl=3600),
+    "list_departments": ToolCachePolicy(ttl=3600),
+    "get_requirement_tree": ToolCachePolicy(ttl=3600),
+    "course_popularity": ToolCachePolicy(ttl=900),
+    "major_schedule_overview": ToolCachePolicy(ttl=900),
+    # Per-user reads: short-lived since the web apps also edit them.
+    "get_user_schedule": ToolCachePolicy(ttl=30, user_scoped=True),
+    "get_user_schedules": ToolCachePolicy(ttl=30, user_scoped=True),
+}
+
+USER_MUTATING_TOOLS = frozenset(
+    {
+        "update_user_schedule",
+        "create_schedule",
+        "add_course_to_schedule",
+        "remove_course_from_schedule",
+        "rename_schedule",
+        "delete_schedule",
+        "subscribe_to_snatch",
+        "unsubscribe_from_snatch",
+    }
+)
+
+
+class ToolResultCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        policies: dict[str, ToolCachePolicy] | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._policies = TOOL_CACHE_POLICIES if policies is None else policies
+        self._entries: OrderedDict[CacheKey, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._in_flight: dict[CacheKey, asyncio.Task[dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def call(
+        self,
+        mcp_url: str,
+        netid: str | None,
+        name: str,
+        arguments: dict[str, Any],
+        fetch: Callable[[str, dict[str, Any]], Awaitable[dict[str, Any]]],
+        shared_fetch: Callable[[str, dict[str, Any]], Awaitable[dict[str, Any]]] | None = None,
+    ) -> dict[str, Any]:
+        if name in USER_MUTATING_TOOLS:
+            result = await fetch(name, arguments)
+            if netid and not result.get("isError"):
+                self.invalidate_user(netid)
+            return result
+
+        policy = self._policies.get(name)
+        if policy is None or (policy.user_scoped and not netid):
+            return await fetch(name, arguments)
+
+        key: CacheKey = (
+            mcp_url,
+            name,
+            json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str),
+            netid if policy.user_scoped else None,
+        )
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # Call ``shared_fetch`` here rather than in the task so it can
+            # register the call before this caller can be cancelled.
+            task = asyncio.ensure_future(
+                self._fetch_and_store(key, policy, (shared_fetch or fetch)(name, arguments))
+            )
+            task.add_done_callback(_retrieve_exception)
+            self._in_flight[key] = task
+        # Shield so one waiter's timeout/cancel does not fail the others.
+        return await asyncio.shield(task)
+
+    def invalidate_user(self, netid: str) -> None:
+        stale = [key for key in self._entries if key[3] == netid]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "inFlight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+        }
+
+    async def _fetch_and_store(
+        self,
+        key: CacheKey,
+        policy: ToolCachePolicy,
+        pending: Awaitable[dict[str, Any]],
+    ) -> dict[str, Any]:
+        try:
+            result = await pending
+        finally:
+            self._in_flight.pop(key, None)
+        # Structured tool errors (bad ids, ambiguous lookups) are not cached.
+        if not result.get("isError"):
+            self._entries[key] = (time.monotonic() + policy.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+def _retrieve_exception(task: asyncio.Task[dict[str, Any]]) -> None:
+    # Waiters that were cancelled never see the error; retrieve it here so
+    # asyncio does not log "Task exception was never retrieved".
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("tool_cache: shared call failed: %s", task.exception())
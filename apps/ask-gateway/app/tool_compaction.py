@@ -0,0 +1,214 @@
+"""Compaction of MCP tool results before they are fed back to the model.
+
+The agentic loop resends the whole message list on every tool-calling round,
+so each tool result is paid for again on every later round. Instead of the raw
+result, the tool message gets a compacted copy:
+
+- the MCP text payload is decoded and re-encoded compactly, so the model sees
+  plain JSON rather than pretty-printed JSON escaped inside an envelope;
+- rows of top-level lists are projected to the policy's ``fields``, and
+  sorted newest first by ``newest_first`` when the tool returns them in no
+  particular order;
+- lists are cut to ``max_items`` with an ``{"omitted": n}`` marker, and long
+  strings are clipped to ``max_chars``;
+- description-like fields already shown earlier in the request are replaced
+  with ``SHOWN_EARLIER``.
+
+If a result is still over its token budget, the limits are halved until it
+fits. Only the model's copy is compacted; SSE events and the turn record keep
+the full result. Tokens are estimated at ``CHARS_PER_TOKEN`` characters each.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from .json_codec import dumps
+
+CHARS_PER_TOKEN = 4
+SHOWN_EARLIER = "(shown earlier)"
+# Shorter blob values are cheaper to repeat than to refer back to.
+MIN_BLOB_CHARS = 120
+MIN_CHARS = 80
+MAX_PASSES = 4
+
+
+@dataclass(frozen=True)
+class ToolCompactionPolicy:
+    max_items: int = 50
+    max_chars: int = 2000
+    fields: frozenset[str] | None = None
+    blob_fields: frozenset[str] = frozenset({"description", "summary"})
+    newest_first: str | None = None
+
+
+DEFAULT_POLICY = ToolCompactionPolicy()
+
+TOOL_COMPACTION_POLICIES: dict[str, ToolCompactionPolicy] = {
+    # Course lists: enough rows to choose from, short descriptions.
+    "search_courses": ToolCompactionPolicy(
+        max_items=25,
+        max_chars=400,
+        fields=frozenset({"id", "code", "title", "description", "status", "dists", "hasFinal"}),
+    ),
+    "discover_courses": ToolCompactionPolicy(max_items=25),
+    "find_top_rated_courses": ToolCompactionPolicy(max_items=20),
+    "find_courses_that_fit": ToolCompactionPolicy(max_items=25, max_chars=400),
+    "compare_courses": ToolCompactionPolicy(max_chars=600),
+    "get_course_sections": ToolCompactionPolicy(max_items=40),
+    "get_course_evaluations": ToolCompactionPolicy(
+        max_items=8,
+        max_chars=600,
+        fields=frozenset({"evalTerm", "termName", "rating", "numComments", "summary"}),
+        # The engine returns evaluations unordered; keep the latest terms.
+        newest_first="evalTerm",
+    ),
+    "summarize_course_reviews": ToolCompactionPolicy(max_items=30, max_chars=500),
+    "list_departments": ToolCompactionPolicy(max_items=250),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True, slots=True)
+class CompactedResult:
+    content: str
+    raw_tokens: int
+    tokens: int
+
+
+class ToolResultCompactor:
+    """Compacts the tool results of one request; remembers what was shown."""
+
+    def __init__(
+        self,
+        *,
+        max_tokens: int,
+        round_max_tokens: int,
+        policies: dict[str, ToolCompactionPolicy] | None = None,
+    ) -> None:
+        self._max_tokens = max_tokens
+        self._round_max_tokens = round_max_tokens
+        self._policies = TOOL_COMPACTION_POLICIES if policies is None else policies
+        self._shown: set[int] = set()
+        self.calls = 0
+        self.raw_tokens = 0
+        self.tokens = 0
+
+    def compact_round(self, results: list[tuple[str, dict[str, Any], str]]) -> list[CompactedResult]:
+        """Compact one round of ``(name, result, encoded)`` in call order.
+
+        The round shares ``round_max_tokens``, so the input added per round is
+        bounded however many tools the model calls.
+        """
+        budget = min(self._max_tokens, self._round_max_tokens // max(len(results), 1))
+        return [self.compact(name, result, encoded, budget) for name, result, encoded in results]
+
+    def compact(
+        self, name: str, result: dict[str, Any], encoded: str, max_tokens: int | None = None
+    ) -> CompactedResult:
+        max_tokens = max(max_tokens or self._max_tokens, MIN_CHARS // CHARS_PER_TOKEN)
+        policy = self._policies.get(name, DEFAULT_POLICY)
+        payload = _payload(result)
+        max_items, max_chars = policy.max_items, policy.max_chars
+        for _ in range(MAX_PASSES):
+            shown: set[int] = set()
+            value = self._compact(payload, policy, max_items, max_chars, shown, top=True)
+            content = value if isinstance(value, str) else dumps(value, default=str)
+            if estimate_tokens(content) <= max_tokens:
+                # Blobs count as shown only if the model gets this value.
+                self._shown |= shown
+                break
+            max_items = max(1, max_items // 2)
+            max_chars = max(MIN_CHARS, max_chars // 2)
+        else:
+            content = dumps(
+                {
+                    "truncated": True,
+                    "originalTokens": estimate_tokens(encoded),
+                    "preview": content[: max_tokens * CHARS_PER_TOKEN // 2],
+                }
+            )
+
+        compacted = CompactedResult(content, estimate_tokens(encoded), estimate_tokens(content))
+        self.calls += 1
+        self.raw_tokens += compacted.raw_tokens
+        self.tokens += compacted.tokens
+        return compacted
+
+    def stats(self) -> dict[str, Any]:
+        return {"calls": self.calls, "rawTokens": self.raw_tokens, "tokens": self.tokens}
+
+    def _compact(
+        self,
+        value: Any,
+        policy: ToolCompactionPolicy,
+        max_items: int,
+        max_chars: int,
+        shown: set[int],
+        *,
+        top: bool = False,
+        row: bool = False,
+    ) -> Any:
+        if isinstance(value, str):
+            return _clip(value, max_chars)
+        if isinstance(value, list):
+            # Items of the payload's top-level lists are rows.
+            if top and policy.newest_first is not None:
+                value = sorted(
+                    value,
+                    key=lambda item: str(item.get(policy.newest_first, "")) if isinstance(item, dict) else "",
+                    reverse=True,
+                )
+            kept = [
+                self._compact(item, policy, max_items, max_chars, shown, row=top)
+                for item in value[:max_items]
+            ]
+            if len(value) > max_items:
+                kept.append({"omitted": len(value) - max_items})
+            return kept
+        if not isinstance(value, dict):
+            return value
+
+        compacted: dict[str, Any] = {}
+        for key, item in value.items():
+            if row and policy.fields is not None and key not in policy.fields:
+                continue
+            if key in policy.blob_fields and isinstance(item, str) and len(item) >= MIN_BLOB_CHARS:
+                blob = hash(item)
+                if blob in self._shown or blob in shown:
+                    compacted[key] = SHOWN_EARLIER
+                    continue
+                shown.add(blob)
+            compacted[key] = self._compact(
+                item, policy, max_items, max_chars, shown, top=top and isinstance(item, list)
+            )
+        return compacted
+
+
+def _payload(result: dict[str, Any]) -> Any:
+    """The decoded text payload of an MCP result, or the result itself."""
+    content = result.get("content")
+    if not isinstance(content, list) or not content or not all(
+        isinstance(block, dict) and block.get("type") == "text" and isinstance(block.get("text"), str)
+        for block in content
+    ):
+        return result
+    texts: list[Any] = []
+    for block in content:
+        try:
+            texts.append(json.loads(block["text"]))
+        except ValueError:
+            texts.append(block["text"])
+    payload = texts[0] if len(texts) == 1 else texts
+    return {"isError": True, "content": payload} if result.get("isError") else payload
+
+
+def _clip(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}… (+{len(text) - max_chars} chars)"
@@ -15,9 +15,13 @@ from datetime import datetime, timezone, timedelta
 from typing import Any
 
 from . import supabase_store
+from .quota_cache import QuotaCache
 
 logger = logging.getLogger("ask-gateway.usage")
 
+# Set on startup by the app lifespan; None disables caching.
+_quota_cache: QuotaCache | None = None
+
 TIER1_MODEL = "anthropic/claude-sonnet-4.6"
 TIER2_MODEL = "anthropic/claude-haiku-4.5"
 TIER1_BUDGET = 3.00
@@ -49,6 +53,22 @@ def _seconds_until_next_window() -> int:
     return max(1, int((next_boundary - now).total_seconds()))
 
 
+def set_quota_cache(cache: QuotaCache | None) -> None:
+    global _quota_cache
+    _quota_cache = cache
+
+
+async def _get_spent(netid: str, window: str) -> float:
+    if _quota_cache is not None:
+        spent = _quota_cache.get(netid, window)
+        if spent is not None:
+            return spent
+    spent = await supabase_store.get_quota_spent(netid, window)
+    if _quota_cache is not None:
+        _quota_cache.put(netid, window, spent, _seconds_until_next_window())
+    return spent
+
+
 def _build_status(spent: float) -> dict[str, Any]:
     if spent < TIER1_BUDGET:
         tier = 1
@@ -93,7 +113,7 @@ def get_user_usage(netid: str) -> dict[str, Any]:
 async def get_user_usage_async(netid: str) -> dict[str, Any]:
     """Async version for use in async handlers."""
     window = _get_window_id()
-    spent = await supabase_store.get_quota_spent(netid, window)
+    spent = await _get_spent(netid, window)
     return _build_status(spent)
 
 
@@ -105,14 +125,16 @@ async def resolve_model_for_user_async(netid: str) -> dict[str, Any]:
     return await get_user_usage_async(netid)
 
 
-async def record_usage_async(netid: str, cost: float) -> None:
+async def record_usage_async(netid: str, cost: float) -> dict[str, Any] | None:
+    """Record spend and return the post-record quota status (None if cost <= 0)."""
     if cost <= 0:
-        return
+        return None
     window = _get_window_id()
-    current = await supabase_store.get_quota_spent(netid, window)
-    new_spent = current + cost
-    await supabase_store.upsert_quota(netid, window, new_spent)
+    new_spent = await supabase_store.increment_quota(netid, window, cost)
+    if _quota_cache is not None:
+        _quota_cache.write_through(netid, window, new_spent, _seconds_until_next_window())
     logger.info("usage.record netid=%s cost=%.4f total=%.4f window=%s", netid, cost, new_spent, window)
+    return _build_status(new_spent)
 
 
 def record_usage(netid: str, cost: float) -> None:
@@ -0,0 +1,145 @@
+"""Measure time and memory of one long agentic /ask/stream turn.
+
+Replays a scripted answer through ChatService with in-process fakes for the
+LLM and MCP clients: two rounds of tool calls with large streamed JSON
+arguments and large results, then a 4k-token answer with reasoning. Reports
+wall time, the tracemalloc peak, the growth in peak RSS and the estimated
+input tokens sent to the LLM.
+
+Usage (from apps/ask-gateway):
+    python scripts/bench_stream_memory.py [--tokens 4000] [--result-kb 256] [--no-compaction]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import chat_service  # noqa: E402
+from app.chat_service import ChatService  # noqa: E402
+from app.config import Settings  # noqa: E402
+from app.models import AskStreamRequest, ChatMessage  # noqa: E402
+from app.tool_compaction import estimate_tokens  # noqa: E402
+
+ARGUMENT_FRAGMENT = 4
+LLM_INPUT_TOKENS: list[int] = []
+
+
+def _tool_call_chunks(round_index: int, calls: int, argument_bytes: int):
+    for index in range(calls):
+        arguments = json.dumps({"query": "x" * argument_bytes, "round": round_index})
+        yield {"choices": [{"delta": {"tool_calls": [
+            {"index": index, "id": f"call_{round_index}_{index}", "function": {"name": "search_courses"}}
+        ]}}]}
+        for start in range(0, len(arguments), ARGUMENT_FRAGMENT):
+            fragment = arguments[start:start + ARGUMENT_FRAGMENT]
+            yield {"choices": [{"delta": {"tool_calls": [
+                {"index": index, "function": {"arguments": fragment}}
+            ]}}]}
+    yield {"choices": [{"delta": {}, "finish_reason": "tool_calls"}]}
+
+
+class FakeLlmClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._round = 0
+
+    async def stream_chat(self, *, messages, tools, model=None):
+        LLM_INPUT_TOKENS.append(estimate_tokens(json.dumps(messages)))
+        self._round = sum(1 for message in messages if message.get("role") == "assistant")
+        if self._round < 2:
+            for chunk in _tool_call_chunks(self._round, calls=3, argument_bytes=ARGS.argument_kb * 1024):
+                yield chunk
+            return
+        for index in range(ARGS.tokens // 4):
+            yield {"choices": [{"delta": {"reasoning": f"step {index} "}}]}
+        for index in range(ARGS.tokens):
+            yield {"choices": [{"delta": {"content": f"w{index % 1000} "}}]}
+        yield {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+        yield {"usage": {"prompt_tokens": 1000, "completion_tokens": ARGS.tokens}}
+
+    async def close(self) -> None:
+        return None
+
+
+class FakeMcpClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._session_id = "sid"
+
+    async def list_tools(self):
+        return [{"type": "function", "function": {"name": "search_courses", "parameters": {}}}]
+
+    async def call_tool(self, name, arguments):
+        courses = [{"code": f"COS {i:03d}", "title": "t" * 200} for i in range(ARGS.result_kb * 4)]
+        return {"content": [{"type": "text", "text": json.dumps({"courses": courses})}]}
+
+    async def close(self) -> None:
+        return None
+
+
+async def _fake_resolve(netid):
+    return {"blocked": False, "model": None, "spent": 0.0, "tier": "standard", "resetSeconds": 0}
+
+
+async def _fake_record(netid, cost):
+    return None
+
+
+async def run_turn() -> int:
+    service = ChatService(
+        Settings(
+            ask_llm_planner_enabled=True,
+            tool_timeout_seconds=10,
+            tool_compaction_enabled=not ARGS.no_compaction,
+        )
+    )
+    payload = AskStreamRequest(
+        messages=[ChatMessage(role="user", content="plan my semester")], netid="bench"
+    )
+    events = 0
+    async for _ in service.stream_chat(payload, is_disconnected=lambda: False, text_deltas=True):
+        events += 1
+    return events
+
+
+def main() -> None:
+    chat_service.McpHttpClient = FakeMcpClient
+    chat_service.OpenAiLlmClient = FakeLlmClient
+    chat_service.resolve_model_for_user_async = _fake_resolve
+    chat_service.record_usage_async = _fake_record
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    events = asyncio.run(run_turn())
+    elapsed = time.perf_counter() - started
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    tracemalloc.start()
+    asyncio.run(run_turn())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{events} events, {ARGS.tokens} tokens, 6 tool calls "
+          f"({ARGS.argument_kb} KB arguments, {ARGS.result_kb} KB results each)")
+    print(f"wall time        {elapsed * 1000:8.1f} ms")
+    print(f"tracemalloc peak {peak / 1024 / 1024:8.2f} MB")
+    print(f"peak RSS growth  {rss_growth / 1024:8.2f} MB")
+    rounds = LLM_INPUT_TOKENS[: len(LLM_INPUT_TOKENS) // 2]
+    print(f"LLM input tokens {sum(rounds):8d} ({' + '.join(map(str, rounds))})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--argument-kb", type=int, default=16)
+    parser.add_argument("--result-kb", type=int, default=256)
+    parser.add_argument("--no-compaction", action="store_true", help="send tool results to the LLM in full")
+    ARGS = parser.parse_args()
+    main()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import pytest
+
+from app.chat_service import ChatService
+from app.config import Settings
+from app.history_summary import SUMMARY_MESSAGE_PREFIX, HistorySummaryCache
+from app.models import AskStreamRequest, ChatMessage
+
+
+def _history(turns: int) -> list[dict]:
+    messages: list[dict] = []
+    for index in range(turns):
+        messages.append({"role": "user", "content": f"question {index}"})
+        messages.append({"role": "assistant", "content": f"answer {index}"})
+    return messages[:-1]
+
+
+class _Summarizer:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str | None, list[str]]] = []
+
+    async def __call__(self, previous: str | None, messages: list[dict]) -> str:
+        self.calls.append((previous, [message["content"] for message in messages]))
+        return f"summary {len(self.calls)}"
+
+
+@pytest.mark.asyncio
+async def test_window_slides_in_steps_and_extends_the_summary() -> None:
+    cache = HistorySummaryCache(max_entries=10, keep_turns=2, slide_turns=2)
+    summarize = _Summarizer()
+
+    assert await cache.compact("conv", _history(3), summarize) == _history(3)
+
+    compacted = await cache.compact("conv", _history(4), summarize)
+    assert compacted[0] == {"role": "system", "content": SUMMARY_MESSAGE_PREFIX + "summary 1"}
+    assert compacted[1:] == _history(4)[4:]
+
+    # The window has not slid again, so the cached summary is reused.
+    await cache.compact("conv", _history(5), summarize)
+    # Sliding folds only the newly evicted turns into the previous summary.
+    compacted = await cache.compact("conv", _history(6), summarize)
+    assert compacted[1]["content"] == "question 4"
+
+    assert summarize.calls == [
+        (None, ["question 0", "answer 0", "question 1", "answer 1"]),
+        ("summary 1", ["question 2", "answer 2", "question 3", "answer 3"]),
+    ]
+    assert cache.stats() == {"entries": 1, "hits": 1, "extensions": 1, "rebuilds": 1, "failures": 0}
+
+
+@pytest.mark.asyncio
+async def test_edited_history_is_summarized_afresh() -> None:
+    cache = HistorySummaryCache(max_entries=10, keep_turns=2, slide_turns=2)
+    summarize = _Summarizer()
+    await cache.compact("conv", _history(4), summarize)
+
+    edited = _history(6)
+    edited[0] = {"role": "user", "content": "a different first question"}
+    await cache.compact("conv", edited, summarize)
+
+    assert summarize.calls[-1][0] is None
+    assert cache.rebuilds == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_falls_back_to_full_history() -> None:
+    cache = HistorySummaryCache(max_entries=10, keep_turns=2, slide_turns=2)
+
+    async def failing(previous: str | None, messages: list[dict]) -> str:
+        raise RuntimeError("LLM unavailable")
+
+    assert await cache.compact("conv", _history(4), failing) == _history(4)
+    assert cache.failures == 1
+
+
+class _FakeMcpClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._session_id = "sid"
+
+    async def list_tools(self) -> list[dict]:
+        return []
+
+    async def close(self) -> None:
+        return None
+
+
+class _FakeLlmClient:
+    sent: list[list[dict]] = []
+    summaries = 0
+
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        pass
+
+    async def complete_text_with_usage(
+        self, *, system_prompt: str, user_prompt: str, model: str | None = None
+    ) -> tuple[str, dict]:
+        _FakeLlmClient.summaries += 1
+        assert "question 0" in user_prompt
+        return "The student is planning their COS schedule.", {"cost": 0.002}
+
+    async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+        _FakeLlmClient.sent.append(messages)
+        yield {"choices": [{"delta": {"content": "Done."}, "finish_reason": "stop"}]}
+
+    async def close(self) -> None:
+        return None
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_summary_and_recent_turns(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.usage_tracker import _build_status
+
+    recorded: list[float] = []
+
+    async def fake_resolve(netid: str) -> dict:
+        return _build_status(0.0)
+
+    async def fake_record(netid: str, cost: float) -> dict:
+        recorded.append(cost)
+        return _build_status(cost)
+
+    monkeypatch.setattr("app.chat_service.resolve_model_for_user_async", fake_resolve)
+    monkeypatch.setattr("app.chat_service.record_usage_async", fake_record)
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", _FakeLlmClient)
+    settings = Settings(
+        tool_timeout_seconds=1,
+        ask_llm_planner_enabled=True,
+        history_compaction_enabled=True,
+        history_keep_turns=2,
+        history_slide_turns=2,
+    )
+    cache = HistorySummaryCache(max_entries=10, keep_turns=2, slide_turns=2)
+
+    for turns in (4, 5):
+        service = ChatService(settings, history_summaries=cache)
+        payload = AskStreamRequest(
+            conversationId="conv-1", netid="abc", messages=[ChatMessage(**message) for message in _history(turns)]
+        )
+        chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+        assert chunks[-1].startswith("event: done")
+
+    sent = _FakeLlmClient.sent[-1]
+    assert [message["role"] for message in sent] == [
+        "system", "system", "user", "assistant", "user", "assistant", "user"
+    ]
+    assert sent[1]["content"] == SUMMARY_MESSAGE_PREFIX + "The student is planning their COS schedule."
+    assert sent[2]["content"] == "question 2"
+    assert _FakeLlmClient.summaries == 1
+    # Only the turn that summarized is charged for it.
+    assert recorded == [0.002, 0]
+
+
+@pytest.mark.asyncio
+async def test_stream_without_shared_cache_sends_full_history(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", _FakeLlmClient)
+    summaries = _FakeLlmClient.summaries
+    settings = Settings(
+        tool_timeout_seconds=1,
+        ask_llm_planner_enabled=True,
+        history_compaction_enabled=True,
+        history_keep_turns=2,
+        history_slide_turns=2,
+    )
+    service = ChatService(settings)
+    payload = AskStreamRequest(
+        conversationId="conv-2", messages=[ChatMessage(**message) for message in _history(4)]
+    )
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+
+    assert chunks[-1].startswith("event: done")
+    assert _FakeLlmClient.sent[-1][1:] == _history(4)
+    assert _FakeLlmClient.summaries == summaries
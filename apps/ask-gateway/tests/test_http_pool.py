@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pytest
+
+from app.config import Settings
+from app.http_pool import HttpPool
+from app.llm_client import OpenAiLlmClient
+from app.mcp_client import McpHttpClient
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_per_upstream_stats() -> None:
+    pool = HttpPool(Settings(http_max_connections=7, http2_enabled=False))
+    try:
+        stats = pool.stats()
+        assert stats["http2"] is False
+        for upstream in ("llm", "mcp", "supabase"):
+            assert stats[upstream]["connections"] == 0
+            assert stats[upstream]["maxConnections"] == 7
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_clients_do_not_close_shared_pool() -> None:
+    pool = HttpPool(Settings(http2_enabled=False))
+    try:
+        await McpHttpClient(Settings(), http_client=pool.mcp).close()
+        await OpenAiLlmClient(Settings(), http_client=pool.llm).close()
+        assert not pool.mcp.is_closed
+        assert not pool.llm.is_closed
+    finally:
+        await pool.close()
+    assert pool.mcp.is_closed
+    assert pool.llm.is_closed
+    assert pool.supabase.is_closed
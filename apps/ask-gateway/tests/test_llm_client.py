@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from app import json_codec
+from app.config import Settings
+from app.llm_client import OpenAiLlmClient
+
+
+def test_dumps_object_splices_encoded_members(monkeypatch: pytest.MonkeyPatch) -> None:
+    result = {"courses": [{"code": "COS 126", "title": "Café"}], "big": 2**70}
+    for encoder in (json_codec.orjson, None):
+        monkeypatch.setattr(json_codec, "orjson", encoder)
+        encoded = json_codec.dumps(result)
+        document = json_codec.dumps_object({"name": "search", "ok": True}, {"result": encoded})
+
+        assert json.loads(document) == {"name": "search", "ok": True, "result": result}
+        assert json_codec.dumps_object({}, {"result": encoded}) == '{"result":' + encoded + "}"
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_reuses_encoded_messages() -> None:
+    bodies: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, text="data: [DONE]\n\n")
+
+    client = OpenAiLlmClient(
+        Settings(openrouter_api_key="key", ask_llm_model="test-model"),
+        http_client=httpx.AsyncClient(base_url="https://llm.test", transport=httpx.MockTransport(handler)),
+    )
+    tools = [{"type": "function", "function": {"name": "search_courses", "parameters": {}}}]
+    messages = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "hi"}]
+
+    [chunk async for chunk in client.stream_chat(messages=messages, tools=tools)]
+    messages.append({"role": "tool", "tool_call_id": "call_1", "content": '{"count":1}'})
+    [chunk async for chunk in client.stream_chat(messages=messages, tools=tools)]
+
+    assert bodies[1] == {
+        "model": "test-model",
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "tool_choice": "auto",
+        "messages": messages,
+        "tools": tools,
+    }
+    # Three messages and the tool list, each encoded once across both calls
+    assert len(client._encoded) == 4
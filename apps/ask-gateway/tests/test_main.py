@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.main import app, get_chat_service, get_settings
+from app.chat_service import sse_event
+from app.config import Settings
+
+
+class _StalledChatService:
+    """Emits one event, then blocks as if waiting on a slow upstream."""
+
+    def __init__(self) -> None:
+        self.cancelled = asyncio.Event()
+
+    async def stream_chat(self, payload, is_disconnected, request_id=None, text_deltas=False):
+        yield sse_event("status", {"phase": "starting", "requestId": request_id})
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+def _scope() -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/ask/stream",
+        "raw_path": b"/ask/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_in_flight_stream() -> None:
+    service = _StalledChatService()
+    app.dependency_overrides[get_chat_service] = lambda: service
+    body = json.dumps({"messages": [{"role": "user", "content": "hi"}]}).encode()
+    first_chunk = asyncio.Event()
+    body_sent = False
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await first_chunk.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+        if message["type"] == "http.response.body" and message.get("body"):
+            first_chunk.set()
+
+    scope = _scope()
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=2)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert service.cancelled.is_set()
+    assert sent[0]["status"] == 200
+    assert b"event: status" in sent[1]["body"]
+
+
+class _ChattyChatService:
+    def __init__(self) -> None:
+        self.produced = 0
+
+    async def stream_chat(self, payload, is_disconnected, request_id=None, text_deltas=False):
+        for index in range(100):
+            self.produced += 1
+            yield sse_event("status", {"index": index})
+
+
+@pytest.mark.asyncio
+async def test_slow_client_holds_back_the_producer() -> None:
+    service = _ChattyChatService()
+    app.dependency_overrides[get_chat_service] = lambda: service
+    app.dependency_overrides[get_settings] = lambda: Settings(
+        sse_coalesce_enabled=False, sse_queue_max_chunks=4
+    )
+    body = json.dumps({"messages": [{"role": "user", "content": "hi"}]}).encode()
+    body_sent = False
+    writes_allowed = asyncio.Event()
+    done = asyncio.Event()
+    events: list[bytes] = []
+
+    async def receive() -> dict:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            await writes_allowed.wait()
+            if message.get("body"):
+                events.append(message["body"])
+            if not message.get("more_body", False):
+                done.set()
+
+    try:
+        response = asyncio.create_task(app(_scope(), receive, send))
+        await asyncio.sleep(0.05)
+        # The client is not reading: the producer stops at the queue bound.
+        assert service.produced <= 4 + 2
+        writes_allowed.set()
+        await asyncio.wait_for(response, timeout=2)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert service.produced == 100
+    assert len(events) == 100
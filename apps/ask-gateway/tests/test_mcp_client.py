@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from app.config import Settings
+from app.mcp_client import McpClientError, McpHttpClient
+
+
+def _client(handler, **settings) -> McpHttpClient:
+    client = McpHttpClient(
+        Settings(**settings),
+        mcp_url="http://mcp.test/mcp",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    client._session_id = "sid"
+    return client
+
+
+def _chunked(body: bytes, size: int):
+    async def stream():
+        for start in range(0, len(body), size):
+            yield body[start : start + size]
+
+    return stream()
+
+
+@pytest.mark.asyncio
+async def test_sse_reader_skips_other_messages_and_handles_split_chunks() -> None:
+    result = {"content": [{"type": "text", "text": "x" * 500}]}
+    body = (
+        "event: message\r\ndata: "
+        + json.dumps({"jsonrpc": "2.0", "method": "notifications/progress", "params": {}})
+        + "\r\n\r\n: keep-alive comment\n\nevent: message\ndata: "
+        + json.dumps({"jsonrpc": "2.0", "id": 99, "result": {}})
+        + "\n\nevent: message\ndata: "
+        + json.dumps({"jsonrpc": "2.0", "id": 1, "result": result})
+        + "\n\n"
+    ).encode()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=_chunked(body, 7))
+
+    assert await _client(handler).call_tool("search_courses", {}) == result
+
+
+@pytest.mark.asyncio
+async def test_sse_reader_joins_multiline_data_and_unterminated_event() -> None:
+    body = b'data: {"jsonrpc": "2.0",\ndata: "id": 1, "result": {"ok": true}}'
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body)
+
+    assert await _client(handler).call_tool("list_terms", {}) == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_json_responses_are_supported() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": {"ok": True}})
+
+    assert await _client(handler).call_tool("list_terms", {}) == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_oversized_payload_is_rejected() -> None:
+    message = {"jsonrpc": "2.0", "id": 1, "result": {"blob": "x" * 4096}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content=_chunked(f"data: {json.dumps(message)}\n\n".encode(), 512),
+        )
+
+    with pytest.raises(McpClientError, match="exceeded 1024 bytes"):
+        await _client(handler, mcp_max_payload_bytes=1024).call_tool("search_courses", {})
+
+
+@pytest.mark.asyncio
+async def test_sse_reader_stops_at_the_match_and_skips_non_json_events() -> None:
+    message = {"jsonrpc": "2.0", "id": 1, "result": {"ok": True}}
+    served: list[int] = []
+
+    async def stream():
+        yield b"data: not json\n\n"
+        yield f"data: {json.dumps(message)}\n\n".encode()
+        # Trailing output past the match is neither read nor size-checked.
+        for index in range(100):
+            served.append(index)
+            yield b"data: " + b"x" * 512 + b"\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=stream())
+
+    client = _client(handler, mcp_max_payload_bytes=1024)
+    assert await client.call_tool("list_terms", {}) == {"ok": True}
+    assert len(served) < 100
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_response_is_a_client_error() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "application/json"}, content=b"<html>")
+
+    with pytest.raises(McpClientError, match="not valid JSON"):
+        await _client(handler).call_tool("list_terms", {})
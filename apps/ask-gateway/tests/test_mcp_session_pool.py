@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import Settings
+from app.mcp_client import McpHttpClient
+from app.mcp_session_pool import McpSessionPool
+from app.tool_cache import ToolResultCache
+
+
+class FakeMcpServer:
+    def __init__(self) -> None:
+        self.sessions: set[str] = set()
+        self.initializes = 0
+        self.deletes: list[str] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            self.deletes.append(request.headers["mcp-session-id"])
+            return httpx.Response(200)
+        body = json.loads(request.content)
+        if body["method"] == "initialize":
+            self.initializes += 1
+            session_id = f"s{self.initializes}"
+            self.sessions.add(session_id)
+            return httpx.Response(200, headers={"mcp-session-id": session_id}, json={"jsonrpc": "2.0", "id": body["id"], "result": {}})
+        if body["method"] == "notifications/initialized":
+            return httpx.Response(202)
+        if request.headers.get("mcp-session-id") not in self.sessions:
+            return httpx.Response(404, json={"jsonrpc": "2.0", "error": {"code": -32001, "message": "Session not found"}})
+        message = {"jsonrpc": "2.0", "id": body["id"], "result": {"content": [], "tool": body["params"]["name"]}}
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            text=f"event: message\ndata: {json.dumps(message)}\n\n",
+        )
+
+
+def _client(
+    server: FakeMcpServer,
+    pool: McpSessionPool,
+    netid: str | None = "abc",
+    tool_cache: ToolResultCache | None = None,
+) -> McpHttpClient:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    return McpHttpClient(
+        Settings(),
+        netid=netid,
+        mcp_url="http://mcp.test/mcp",
+        http_client=http_client,
+        session_pool=pool,
+        tool_cache=tool_cache,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pooled_session_skips_handshake_on_repeat_request() -> None:
+    server = FakeMcpServer()
+    pool = McpSessionPool(idle_ttl=60, max_size=4)
+
+    first = _client(server, pool)
+    assert await first.initialize() == "s1"
+    await first.call_tool("list_departments", {})
+    await first.close()
+
+    second = _client(server, pool)
+    assert await second.initialize() == "s1"
+    await second.close()
+
+    assert server.initializes == 1
+    assert server.deletes == []
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_keys_sessions_by_netid() -> None:
+    server = FakeMcpServer()
+    pool = McpSessionPool(idle_ttl=60, max_size=4)
+
+    first = _client(server, pool, netid="abc")
+    await first.initialize()
+    await first.close()
+    other = _client(server, pool, netid="xyz")
+    assert await other.initialize() == "s2"
+    await other.close()
+
+    assert server.initializes == 2
+
+
+@pytest.mark.asyncio
+async def test_gone_session_is_reinitialized_transparently() -> None:
+    server = FakeMcpServer()
+    pool = McpSessionPool(idle_ttl=60, max_size=4)
+
+    first = _client(server, pool)
+    await first.initialize()
+    await first.close()
+    server.sessions.clear()
+
+    second = _client(server, pool)
+    await second.initialize()
+    result = await second.call_tool("get_course_details", {"code": "COS 126"})
+    await second.close()
+
+    assert result["tool"] == "get_course_details"
+    assert server.initializes == 2
+    assert pool.stats()["reinitializations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_evicted_sessions_are_deleted_on_server() -> None:
+    server = FakeMcpServer()
+    pool = McpSessionPool(idle_ttl=60, max_size=1)
+
+    first, second = _client(server, pool, netid="abc"), _client(server, pool, netid="xyz")
+    await first.initialize()
+    await second.initialize()
+    await first.close()
+    await second.close()
+
+    assert server.deletes == ["s1"]
+    assert pool.stats()["evictions"] == 1
+    assert pool.stats()["idle"] == 1
+
+
+@pytest.mark.asyncio
+async def test_coalesced_call_runs_on_the_callers_session_until_it_ends() -> None:
+    server = FakeMcpServer()
+    pool = McpSessionPool(idle_ttl=60, max_size=4)
+    cache = ToolResultCache(max_entries=10)
+
+    first = _client(server, pool, tool_cache=cache)
+    await first.initialize()
+    call = asyncio.ensure_future(first.call_tool("list_departments", {}))
+    await asyncio.sleep(0)
+    call.cancel()
+    await first.close()
+
+    # No extra handshake, and the session is released once the call is done.
+    assert server.initializes == 1
+    assert cache.stats()["entries"] == 1
+    assert pool.stats()["idle"] == 1
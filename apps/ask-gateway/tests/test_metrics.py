@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.chat_service import ChatService
+from app.config import Settings
+from app.metrics import GatewayMetrics, Histogram
+from app.models import AskStreamRequest, ChatMessage
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("ask_tool_seconds", "Tool latency.", (0.1, 1.0), ("tool",))
+    histogram.observe(0.05, "search_courses")
+    histogram.observe(0.5, "search_courses")
+    histogram.observe(3.0, 'bad"name')
+
+    assert histogram.render() == [
+        "# HELP ask_tool_seconds Tool latency.",
+        "# TYPE ask_tool_seconds histogram",
+        'ask_tool_seconds_bucket{tool="bad\\"name",le="0.1"} 0',
+        'ask_tool_seconds_bucket{tool="bad\\"name",le="1.0"} 0',
+        'ask_tool_seconds_bucket{tool="bad\\"name",le="+Inf"} 1',
+        'ask_tool_seconds_sum{tool="bad\\"name"} 3.0',
+        'ask_tool_seconds_count{tool="bad\\"name"} 1',
+        'ask_tool_seconds_bucket{tool="search_courses",le="0.1"} 1',
+        'ask_tool_seconds_bucket{tool="search_courses",le="1.0"} 2',
+        'ask_tool_seconds_bucket{tool="search_courses",le="+Inf"} 2',
+        'ask_tool_seconds_sum{tool="search_courses"} 0.55',
+        'ask_tool_seconds_count{tool="search_courses"} 2',
+    ]
+
+
+class _FakeMcpClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._session_id = "sid"
+
+    async def initialize(self) -> str:
+        return self._session_id
+
+    async def list_tools(self) -> list[dict]:
+        return [{"type": "function", "function": {"name": "search_courses", "parameters": {}}}]
+
+    async def call_tool(self, name: str, arguments: dict) -> dict:
+        return {"content": [{"type": "text", "text": "{}"}]}
+
+    async def close(self) -> None:
+        return None
+
+
+class _FakeLlmClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        pass
+
+    async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+        if not any(m.get("role") == "tool" for m in messages):
+            yield {
+                "choices": [
+                    {
+                        "delta": {
+                            "tool_calls": [
+                                {"index": 0, "id": "call_1", "function": {"name": "search_courses", "arguments": "{}"}}
+                            ]
+                        },
+                        "finish_reason": "tool_calls",
+                    }
+                ]
+            }
+            return
+        yield {"choices": [{"delta": {"content": "Done."}, "finish_reason": "stop"}]}
+        yield {"usage": {"prompt_tokens": 20, "completion_tokens": 10}}
+
+    async def close(self) -> None:
+        return None
+
+
+@pytest.mark.asyncio
+async def test_stream_records_phase_timings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", _FakeLlmClient)
+    metrics = GatewayMetrics()
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True, done_timings_enabled=True),
+        metrics=metrics,
+    )
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="easy cs courses")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    done = json.loads(chunks[-1].splitlines()[1].removeprefix("data: "))
+
+    timings = done["timings"]
+    assert timings["iterations"] == 2
+    assert set(timings["phasesMs"]) == {"list_tools", "llm", "tools"}
+    assert [tool["name"] for tool in timings["tools"]] == ["search_courses"]
+    assert timings["ttftMs"] is not None
+    assert metrics.request_seconds.count("done") == 1
+    assert metrics.phase_seconds.count("llm") == 2
+    assert metrics.tool_seconds.count("search_courses") == 1
+    assert metrics.iterations.count() == 1
+    assert 'ask_request_seconds_count{outcome="done"} 1' in metrics.render()
+
+
+@pytest.mark.asyncio
+async def test_done_event_omits_timings_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", _FakeLlmClient)
+    service = ChatService(Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True))
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="easy cs courses")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+
+    assert chunks[-1].startswith("event: done")
+    assert "timings" not in json.loads(chunks[-1].splitlines()[1].removeprefix("data: "))
+
+
+@pytest.mark.asyncio
+async def test_deterministic_stream_records_phase_timings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    metrics = GatewayMetrics()
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=False, done_timings_enabled=True),
+        metrics=metrics,
+    )
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="easy cs courses")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    done = json.loads(chunks[-1].splitlines()[1].removeprefix("data: "))
+
+    timings = done["timings"]
+    assert set(timings["phasesMs"]) == {"mcp_init", "tools", "synthesis"}
+    assert [tool["name"] for tool in timings["tools"]] == ["search_courses"]
+    assert timings["iterations"] == 0
+    assert metrics.request_seconds.count("done") == 1
+    assert metrics.tool_seconds.count("search_courses") == 1
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import supabase_store
+from app.persistence import PersistenceQueue, TurnRecord
+
+
+def _turn(conversation_id: str = "conv-1") -> TurnRecord:
+    return TurnRecord(
+        conversation_id,
+        "abc",
+        "easy cs courses",
+        [
+            {"role": "user", "content": "easy cs courses"},
+            {"role": "tool_call", "content": "{}"},
+            {"role": "assistant", "content": "COS 126", "cost": 0.01, "model": "m"},
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_save_turn_is_one_upsert_and_one_bulk_insert(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(201)
+
+    monkeypatch.setattr(supabase_store, "_SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr(supabase_store, "_SUPABASE_KEY", "service-key")
+    supabase_store.set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        turn = _turn()
+        await supabase_store.save_turn(turn.conversation_id, turn.netid, turn.title, turn.messages)
+    finally:
+        supabase_store.set_http_client(None)
+
+    assert [r.url.path for r in requests] == ["/rest/v1/ask_conversations", "/rest/v1/ask_messages"]
+    rows = json.loads(requests[1].content)
+    assert [row["role"] for row in rows] == ["user", "tool_call", "assistant"]
+    assert len({frozenset(row) for row in rows}) == 1
+    created = [row["created_at"] for row in rows]
+    assert created == sorted(created) and len(set(created)) == 3
+
+
+@pytest.mark.asyncio
+async def test_retried_turn_writes_the_same_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    inserts: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/ask_messages"):
+            inserts.append(request)
+            # The first insert commits but its response is lost.
+            if len(inserts) == 1:
+                return httpx.Response(503)
+        return httpx.Response(201)
+
+    monkeypatch.setattr(supabase_store, "_SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr(supabase_store, "_SUPABASE_KEY", "service-key")
+    supabase_store.set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        turn = _turn()
+        queue = PersistenceQueue(max_size=10, max_retries=1, retry_backoff_seconds=0)
+        await queue.submit(turn)
+    finally:
+        supabase_store.set_http_client(None)
+
+    first, second = (json.loads(request.content) for request in inserts)
+    assert first == second
+    assert [row["id"] for row in first] == turn.message_ids
+    assert first[0]["created_at"] == turn.created_at.isoformat()
+    assert inserts[1].url.params["on_conflict"] == "id"
+    assert "resolution=ignore-duplicates" in inserts[1].headers["prefer"]
+
+
+@pytest.mark.asyncio
+async def test_queue_retries_and_flushes_on_close(monkeypatch: pytest.MonkeyPatch) -> None:
+    attempts: dict[str, int] = {}
+    saved: list[str] = []
+
+    async def flaky_save_turn(conv_id: str, netid: str, title: str, messages: list, **kwargs) -> None:
+        attempts[conv_id] = attempts.get(conv_id, 0) + 1
+        if attempts[conv_id] == 1:
+            raise httpx.ConnectError("supabase unavailable")
+        await asyncio.sleep(0)
+        saved.append(conv_id)
+
+    monkeypatch.setattr(supabase_store, "save_turn", flaky_save_turn)
+    queue = PersistenceQueue(max_size=10, max_retries=2, retry_backoff_seconds=0)
+    queue.start()
+    for conv_id in ("a", "b", "c"):
+        await queue.submit(_turn(conv_id))
+    await queue.close(timeout=1)
+
+    assert saved == ["a", "b", "c"]
+    assert queue.stats()["persisted"] == 3
+    assert queue.stats()["retries"] == 3
+
+
+@pytest.mark.asyncio
+async def test_queue_gives_up_after_max_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def failing_save_turn(*args, **kwargs) -> None:
+        raise httpx.ConnectError("supabase unavailable")
+
+    monkeypatch.setattr(supabase_store, "save_turn", failing_save_turn)
+    queue = PersistenceQueue(max_size=10, max_retries=1, retry_backoff_seconds=0)
+    queue.start()
+    await queue.submit(_turn())
+    await queue.close(timeout=1)
+
+    assert queue.stats()["failed"] == 1
+    assert queue.stats()["retries"] == 1
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.config import Settings
+from app.main import _coalesced
+from app.sse import SseCoalescer, sse_event, thinking_delta, token_delta
+
+
+def test_coalescer_merges_deltas_until_another_event() -> None:
+    coalescer = SseCoalescer(flush_interval=60, max_bytes=4096)
+    coalescer.push(thinking_delta("Let me "))
+    coalescer.push(thinking_delta("check."))
+    coalescer.push(token_delta("COS "))
+    coalescer.push(token_delta("226"))
+
+    # Text of the current kind waits for the interval; the finished kind does not.
+    assert coalescer.drain() == sse_event("thinking", {"content": "Let me check."})
+    coalescer.push(sse_event("status", {"phase": "calling_tool"}))
+    assert coalescer.drain() == sse_event("token", {"text": "COS 226"}) + sse_event(
+        "status", {"phase": "calling_tool"}
+    )
+    assert (coalescer.deltas, coalescer.frames) == (4, 3)
+
+
+def test_coalescer_flushes_at_max_bytes() -> None:
+    coalescer = SseCoalescer(flush_interval=60, max_bytes=8)
+    for text in ("abcd", "efgh", "ij"):
+        coalescer.push(token_delta(text))
+
+    assert coalescer.drain() == sse_event("token", {"text": "abcdefgh"})
+    assert coalescer.close() == sse_event("token", {"text": "ij"})
+
+
+@pytest.mark.asyncio
+async def test_output_stage_preserves_events_and_flushes_on_interval() -> None:
+    settings = Settings(sse_flush_interval_ms=10, sse_flush_max_bytes=4096)
+    chunks: asyncio.Queue = asyncio.Queue()
+    for item in (
+        sse_event("status", {"phase": "starting"}),
+        token_delta("Hello"),
+        token_delta(", world"),
+    ):
+        chunks.put_nowait(item)
+    writes = _coalesced(chunks, settings)
+
+    assert await writes.__anext__() == sse_event("status", {"phase": "starting"})
+    # Nothing else is queued, so the buffered text goes out after the interval.
+    assert await asyncio.wait_for(writes.__anext__(), timeout=1) == sse_event(
+        "token", {"text": "Hello, world"}
+    )
+
+    chunks.put_nowait(token_delta("!"))
+    chunks.put_nowait(sse_event("done", {}))
+    chunks.put_nowait(None)
+    assert [write async for write in writes] == [sse_event("token", {"text": "!"}) + sse_event("done", {})]
@@ -28,10 +28,33 @@ def _collect_token_text(events: list[tuple[str, dict]]) -> str:
     return "".join(data["text"] for name, data in events if name == "token")
 
 
+class _ToolListMcpClient:
+    """Minimal MCP stand-in for the agentic path, which always lists tools first."""
+
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._settings = settings
+        self._session_id = "sid"
+
+    async def list_tools(self) -> list[dict]:
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": "search_courses",
+                    "description": "Search courses",
+                    "parameters": {"type": "object", "properties": {}},
+                },
+            }
+        ]
+
+    async def close(self) -> None:
+        return None
+
+
 @pytest.mark.asyncio
 async def test_stream_emits_done(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -95,7 +118,7 @@ async def test_stream_emits_done(monkeypatch: pytest.MonkeyPatch) -> None:
 @pytest.mark.asyncio
 async def test_stream_emits_timeout_error(monkeypatch: pytest.MonkeyPatch) -> None:
     class SlowMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -127,7 +150,7 @@ async def test_stream_emits_timeout_error(monkeypatch: pytest.MonkeyPatch) -> No
 @pytest.mark.asyncio
 async def test_stream_handles_disconnect(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -155,10 +178,50 @@ async def test_stream_handles_disconnect(monkeypatch: pytest.MonkeyPatch) -> Non
     assert error_events[-1]["code"] == "cancelled"
 
 
+@pytest.mark.asyncio
+async def test_stream_task_cancellation_aborts_upstream(monkeypatch: pytest.MonkeyPatch) -> None:
+    llm_started = asyncio.Event()
+    closed: list[str] = []
+
+    class StalledLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            self._settings = settings
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            llm_started.set()
+            await asyncio.Event().wait()
+            yield {}
+
+        async def close(self) -> None:
+            closed.append("llm")
+
+    class ClosingMcpClient(_ToolListMcpClient):
+        async def close(self) -> None:
+            closed.append("mcp")
+
+    monkeypatch.setattr("app.chat_service.McpHttpClient", ClosingMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", StalledLlmClient)
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, connect_timeout_seconds=1, ask_llm_planner_enabled=True)
+    )
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="hello")])
+
+    async def consume() -> list[str]:
+        return [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+
+    task = asyncio.create_task(consume())
+    await asyncio.wait_for(llm_started.wait(), timeout=1)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert closed == ["mcp", "llm"]
+
+
 @pytest.mark.asyncio
 async def test_stream_handles_empty_course_results(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -192,7 +255,7 @@ async def test_stream_handles_empty_course_results(monkeypatch: pytest.MonkeyPat
 @pytest.mark.asyncio
 async def test_stream_handles_malformed_payload(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -226,7 +289,7 @@ async def test_stream_handles_malformed_payload(monkeypatch: pytest.MonkeyPatch)
 @pytest.mark.asyncio
 async def test_stream_emits_upstream_error(monkeypatch: pytest.MonkeyPatch) -> None:
     class FailingMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -262,7 +325,7 @@ async def test_stream_course_question_uses_details_and_evaluations(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def initialize(self) -> str:
@@ -329,7 +392,7 @@ async def test_stream_course_question_uses_details_and_evaluations(
 @pytest.mark.asyncio
 async def test_stream_llm_direct_answer_no_tool_calls(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeLlmClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
@@ -347,6 +410,7 @@ async def test_stream_llm_direct_answer_no_tool_calls(monkeypatch: pytest.Monkey
         async def close(self) -> None:
             return None
 
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _ToolListMcpClient)
     monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
 
     service = ChatService(
@@ -369,10 +433,7 @@ async def test_stream_llm_direct_answer_no_tool_calls(monkeypatch: pytest.Monkey
 
 @pytest.mark.asyncio
 async def test_stream_llm_tool_call_loop_executes_mcp(monkeypatch: pytest.MonkeyPatch) -> None:
-    class FakeMcpClient:
-        def __init__(self, settings: Settings) -> None:
-            self._settings = settings
-
+    class FakeMcpClient(_ToolListMcpClient):
         async def initialize(self) -> str:
             return "sid"
 
@@ -383,7 +444,7 @@ async def test_stream_llm_tool_call_loop_executes_mcp(monkeypatch: pytest.Monkey
             return None
 
     class FakeLlmClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
@@ -432,6 +493,7 @@ async def test_stream_llm_tool_call_loop_executes_mcp(monkeypatch: pytest.Monkey
         Settings(
             tool_timeout_seconds=1,
             connect_timeout_seconds=1,
+            ask_llm_planner_enabled=True,
             ask_llm_synthesis_enabled=True,
         )
     )
@@ -450,7 +512,7 @@ async def test_stream_llm_tool_call_loop_executes_mcp(monkeypatch: pytest.Monkey
 @pytest.mark.asyncio
 async def test_stream_llm_error_emits_upstream_error(monkeypatch: pytest.MonkeyPatch) -> None:
     class FakeLlmClient:
-        def __init__(self, settings: Settings) -> None:
+        def __init__(self, settings: Settings, **kwargs) -> None:
             self._settings = settings
 
         async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
@@ -460,6 +522,7 @@ async def test_stream_llm_error_emits_upstream_error(monkeypatch: pytest.MonkeyP
         async def close(self) -> None:
             return None
 
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _ToolListMcpClient)
     monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
 
     service = ChatService(
@@ -476,3 +539,285 @@ async def test_stream_llm_error_emits_upstream_error(monkeypatch: pytest.MonkeyP
     error_events = [data for name, data in events if name == "error"]
     assert error_events
     assert error_events[-1]["code"] == "upstream_error"
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_runs_parallel_tool_calls_concurrently(monkeypatch: pytest.MonkeyPatch) -> None:
+    delays = {"get_course_details": 0.05, "get_course_evaluations": 0.01}
+    in_flight = {"now": 0, "max": 0}
+
+    class FakeMcpClient(_ToolListMcpClient):
+        async def call_tool(self, name: str, arguments: dict) -> dict:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(delays[name])
+            in_flight["now"] -= 1
+            return {"content": [{"type": "text", "text": json.dumps({"tool": name})}]}
+
+    seen_tool_messages: list[str] = []
+
+    class FakeLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            self._settings = settings
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            tool_messages = [m for m in messages if m.get("role") == "tool"]
+            if not tool_messages:
+                yield {
+                    "choices": [
+                        {
+                            "delta": {
+                                "tool_calls": [
+                                    {
+                                        "index": 0,
+                                        "id": "call_details",
+                                        "function": {"name": "get_course_details", "arguments": "{\"code\":\"COS 126\"}"},
+                                    },
+                                    {
+                                        "index": 1,
+                                        "id": "call_evals",
+                                        "function": {"name": "get_course_evaluations", "arguments": "{\"code\":\"COS 126\"}"},
+                                    },
+                                ]
+                            },
+                            "finish_reason": "tool_calls",
+                        }
+                    ]
+                }
+                yield {"type": "done"}
+                return
+
+            seen_tool_messages.extend(m["tool_call_id"] for m in tool_messages)
+            yield {"choices": [{"delta": {"content": "Both looked up."}, "finish_reason": "stop"}]}
+            yield {"type": "done"}
+
+        async def close(self) -> None:
+            return None
+
+    monkeypatch.setattr("app.chat_service.McpHttpClient", FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
+
+    service = ChatService(
+        Settings(
+            tool_timeout_seconds=1,
+            connect_timeout_seconds=1,
+            tool_concurrency=4,
+            ask_llm_planner_enabled=True,
+        )
+    )
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="Tell me about COS 126")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    events = _parse_events(chunks)
+
+    assert in_flight["max"] == 2
+    results = [data["call_id"] for name, data in events if name == "tool_result"]
+    assert results == ["call_evals", "call_details"]
+    assert seen_tool_messages == ["call_details", "call_evals"]
+    assert "Both looked up." in _collect_token_text(events)
+
+
+@pytest.mark.asyncio
+async def test_stream_early_done_defers_durable_writes(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.persistence import PersistenceQueue
+    from app.usage_tracker import _build_status
+
+    release_writes = asyncio.Event()
+    recorded: list[float] = []
+
+    async def fake_resolve(netid: str) -> dict:
+        return _build_status(2.9)
+
+    async def slow_record(netid: str, cost: float) -> dict:
+        await release_writes.wait()
+        recorded.append(cost)
+        return _build_status(2.9 + cost)
+
+    class FakeLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            self._settings = settings
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            yield {"choices": [{"delta": {"content": "Done thinking."}, "finish_reason": "stop"}]}
+            yield {"usage": {"prompt_tokens": 10, "completion_tokens": 5, "cost": 0.2}}
+            yield {"type": "done"}
+
+        async def close(self) -> None:
+            return None
+
+    monkeypatch.setattr("app.chat_service.resolve_model_for_user_async", fake_resolve)
+    monkeypatch.setattr("app.chat_service.record_usage_async", slow_record)
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _ToolListMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
+
+    settings = Settings(
+        tool_timeout_seconds=1,
+        connect_timeout_seconds=1,
+        ask_llm_planner_enabled=True,
+        early_done_enabled=True,
+    )
+    persistence = PersistenceQueue(max_size=10, max_retries=0, retry_backoff_seconds=0)
+    service = ChatService(settings, persistence=persistence)
+    payload = AskStreamRequest(netid="abc", messages=[ChatMessage(role="user", content="hi")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    done = next(data for name, data in _parse_events(chunks) if name == "done")
+
+    assert recorded == []
+    assert done["quota"]["tier"] == 2
+    assert done["quota"]["tierChanged"] is True
+    assert persistence.stats()["deferred"] == 1
+
+    release_writes.set()
+    await persistence.close(timeout=1)
+    assert recorded == [0.2]
+    assert persistence.stats()["deferred"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_failed_quota_write_still_emits_done(monkeypatch: pytest.MonkeyPatch) -> None:
+    import httpx
+
+    from app.persistence import PersistenceQueue
+    from app.usage_tracker import _build_status
+
+    async def fake_resolve(netid: str) -> dict:
+        return _build_status(2.9)
+
+    async def failing_record(netid: str, cost: float) -> dict:
+        request = httpx.Request("POST", "http://supabase.test/rest/v1/rpc/increment_ask_quota")
+        raise httpx.HTTPStatusError("boom", request=request, response=httpx.Response(500, request=request))
+
+    class FakeLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            pass
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            yield {"choices": [{"delta": {"content": "Answer."}, "finish_reason": "stop"}]}
+            yield {"usage": {"prompt_tokens": 10, "completion_tokens": 5, "cost": 0.2}}
+
+        async def close(self) -> None:
+            return None
+
+    monkeypatch.setattr("app.chat_service.resolve_model_for_user_async", fake_resolve)
+    monkeypatch.setattr("app.chat_service.record_usage_async", failing_record)
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _ToolListMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
+
+    persistence = PersistenceQueue(max_size=10, max_retries=0, retry_backoff_seconds=0)
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True), persistence=persistence
+    )
+    payload = AskStreamRequest(netid="abc", messages=[ChatMessage(role="user", content="hi")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    done = next(data for name, data in _parse_events(chunks) if name == "done")
+
+    assert done["quota"] == {
+        "percentUsed": _build_status(3.1)["percentUsed"],
+        "tier": 2,
+        "tierChanged": True,
+        "resetSeconds": done["quota"]["resetSeconds"],
+    }
+    assert persistence.stats()["quotaFailed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_malformed_quota_reply_still_emits_done(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.usage_tracker import _build_status
+
+    async def fake_resolve(netid: str) -> dict:
+        return _build_status(1.0)
+
+    async def malformed_record(netid: str, cost: float) -> dict:
+        return _build_status(float({"unexpected": "body"}))
+
+    class FakeLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            pass
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            yield {"choices": [{"delta": {"content": "Answer."}, "finish_reason": "stop"}]}
+            yield {"usage": {"prompt_tokens": 10, "completion_tokens": 5, "cost": 0.2}}
+
+        async def close(self) -> None:
+            return None
+
+    monkeypatch.setattr("app.chat_service.resolve_model_for_user_async", fake_resolve)
+    monkeypatch.setattr("app.chat_service.record_usage_async", malformed_record)
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _ToolListMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
+
+    service = ChatService(Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True))
+    payload = AskStreamRequest(netid="abc", messages=[ChatMessage(role="user", content="hi")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    events = _parse_events(chunks)
+
+    assert [name for name, _ in events][-1] == "done"
+    assert events[-1][1]["quota"]["percentUsed"] == _build_status(1.2)["percentUsed"]
+
+
+@pytest.mark.asyncio
+async def test_stream_joins_fragmented_tool_calls_and_bounds_persisted_results(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from app.usage_tracker import _build_status
+
+    submitted: list = []
+
+    class CapturingQueue:
+        async def submit(self, turn) -> None:
+            submitted.append(turn)
+
+    async def fake_resolve(netid: str) -> dict:
+        return _build_status(0.0)
+
+    async def fake_record(netid: str, cost: float) -> dict:
+        return _build_status(cost)
+
+    class FakeMcpClient(_ToolListMcpClient):
+        async def call_tool(self, name: str, arguments: dict) -> dict:
+            return {"content": [{"type": "text", "text": "x" * 5000}], "echo": arguments}
+
+    class FakeLlmClient:
+        def __init__(self, settings: Settings, **kwargs) -> None:
+            self._settings = settings
+
+        async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+            if not any(m.get("role") == "tool" for m in messages):
+                fragments = [{"id": "call_1", "function": {"name": "search_"}}, {"function": {"name": "courses"}}]
+                fragments += [{"function": {"arguments": part}} for part in ('{"que', 'ry": "co', 's"}')]
+                for fragment in fragments:
+                    yield {"choices": [{"delta": {"tool_calls": [{"index": 0, **fragment}]}}]}
+                return
+            for word in ("Here ", "you ", "go."):
+                yield {"choices": [{"delta": {"content": word}}]}
+
+        async def close(self) -> None:
+            return None
+
+    monkeypatch.setattr("app.chat_service.resolve_model_for_user_async", fake_resolve)
+    monkeypatch.setattr("app.chat_service.record_usage_async", fake_record)
+    monkeypatch.setattr("app.chat_service.McpHttpClient", FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", FakeLlmClient)
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True, persist_tool_result_max_bytes=1000),
+        persistence=CapturingQueue(),
+    )
+    payload = AskStreamRequest(netid="abc", messages=[ChatMessage(role="user", content="cos")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+    events = _parse_events(chunks)
+
+    tool_call = next(data for name, data in events if name == "tool_call")
+    assert (tool_call["name"], tool_call["arguments"]) == ("search_courses", {"query": "cos"})
+    tool_result = next(data for name, data in events if name == "tool_result")
+    assert tool_result["result"]["echo"] == {"query": "cos"}
+
+    roles = [message["role"] for message in submitted[0].messages]
+    assert roles == ["user", "tool_call", "tool_result", "assistant"]
+    persisted_result = json.loads(submitted[0].messages[2]["content"])
+    assert persisted_result["result"]["truncated"] is True
+    assert persisted_result["result"]["originalBytes"] > 5000
+    assert submitted[0].messages[3]["content"] == "Here you go."
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+
+import pytest
+
+from app.tool_cache import ToolCachePolicy, ToolResultCache
+
+URL = "http://mcp.test/mcp"
+
+
+class CountingFetch:
+    def __init__(self, delay: float = 0) -> None:
+        self.calls: list[tuple[str, dict]] = []
+        self._delay = delay
+
+    async def __call__(self, name: str, arguments: dict) -> dict:
+        self.calls.append((name, arguments))
+        await asyncio.sleep(self._delay)
+        return {"content": [], "call": len(self.calls)}
+
+
+@pytest.mark.asyncio
+async def test_canonicalized_arguments_share_an_entry() -> None:
+    cache = ToolResultCache(max_entries=10)
+    fetch = CountingFetch()
+
+    first = await cache.call(URL, None, "get_course_details", {"code": "COS 126", "term": 1272}, fetch)
+    second = await cache.call(URL, "abc", "get_course_details", {"term": 1272, "code": "COS 126"}, fetch)
+
+    assert first is second
+    assert len(fetch.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_uncached_tools_always_fetch() -> None:
+    cache = ToolResultCache(max_entries=10)
+    fetch = CountingFetch()
+
+    await cache.call(URL, None, "search_courses", {"query": "cs"}, fetch)
+    await cache.call(URL, None, "search_courses", {"query": "cs"}, fetch)
+
+    assert len(fetch.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced() -> None:
+    cache = ToolResultCache(max_entries=10)
+    fetch = CountingFetch(delay=0.01)
+
+    results = await asyncio.gather(
+        *(cache.call(URL, None, "list_departments", {}, fetch) for _ in range(5))
+    )
+
+    assert len(fetch.calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_lru_is_bounded() -> None:
+    policies = {"a": ToolCachePolicy(ttl=0), "b": ToolCachePolicy(ttl=60)}
+    cache = ToolResultCache(max_entries=2, policies=policies)
+    fetch = CountingFetch()
+
+    await cache.call(URL, None, "a", {}, fetch)
+    await cache.call(URL, None, "a", {}, fetch)
+    assert len(fetch.calls) == 2
+
+    for code in ("x", "y", "z"):
+        await cache.call(URL, None, "b", {"code": code}, fetch)
+    await cache.call(URL, None, "b", {"code": "x"}, fetch)
+    assert cache.stats()["entries"] == 2
+    assert len(fetch.calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_mutating_tool_invalidates_only_that_users_entries() -> None:
+    cache = ToolResultCache(max_entries=10)
+    fetch = CountingFetch()
+
+    await cache.call(URL, "abc", "get_user_schedule", {}, fetch)
+    await cache.call(URL, "xyz", "get_user_schedule", {}, fetch)
+    await cache.call(URL, "abc", "update_user_schedule", {"semester": "Junior Fall"}, fetch)
+    await cache.call(URL, "abc", "update_user_schedule", {"semester": "Junior Fall"}, fetch)
+    await cache.call(URL, "abc", "get_user_schedule", {}, fetch)
+    await cache.call(URL, "xyz", "get_user_schedule", {}, fetch)
+
+    names = [name for name, _ in fetch.calls]
+    assert names.count("update_user_schedule") == 2
+    assert names.count("get_user_schedule") == 3
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_mutation_keeps_the_users_entries() -> None:
+    cache = ToolResultCache(max_entries=10)
+    fetch = CountingFetch()
+
+    async def failing(name: str, arguments: dict) -> dict:
+        return {"isError": True, "content": []}
+
+    await cache.call(URL, "abc", "get_user_schedule", {}, fetch)
+    await cache.call(URL, "abc", "rename_schedule", {"name": ""}, failing)
+    await cache.call(URL, "abc", "get_user_schedule", {}, fetch)
+
+    assert len(fetch.calls) == 1
+    assert cache.stats()["invalidations"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tool_errors_are_not_cached() -> None:
+    cache = ToolResultCache(max_entries=10)
+    calls = []
+
+    async def failing(name: str, arguments: dict) -> dict:
+        calls.append(name)
+        return {"content": [], "isError": True}
+
+    await cache.call(URL, None, "get_course_details", {"code": "XYZ 999"}, failing)
+    await cache.call(URL, None, "get_course_details", {"code": "XYZ 999"}, failing)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesced_call_survives_the_first_caller() -> None:
+    cache = ToolResultCache(max_entries=10)
+    own, shared = CountingFetch(), CountingFetch(delay=0.01)
+
+    first = asyncio.ensure_future(cache.call(URL, None, "list_departments", {}, own, shared))
+    second = asyncio.ensure_future(cache.call(URL, None, "list_departments", {}, own, shared))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second)["call"] == 1
+    assert first.cancelled()
+    assert own.calls == [] and len(shared.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_call_without_waiters_is_retrieved() -> None:
+    cache = ToolResultCache(max_entries=10)
+    errors: list[dict] = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+    async def failing(name: str, arguments: dict) -> dict:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("MCP unavailable")
+
+    waiter = asyncio.ensure_future(cache.call(URL, None, "list_departments", {}, failing))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0.02)
+    del waiter
+    gc.collect()
+
+    assert errors == []
+    assert cache.stats()["inFlight"] == 0
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.chat_service import ChatService
+from app.config import Settings
+from app.metrics import GatewayMetrics
+from app.models import AskStreamRequest, ChatMessage
+from app.tool_compaction import SHOWN_EARLIER, ToolResultCompactor, estimate_tokens
+
+
+def _mcp_result(payload: object) -> dict:
+    return {"content": [{"type": "text", "text": json.dumps(payload, indent=2)}]}
+
+
+def _courses(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"{index:06d}-1272",
+            "listingId": f"{index:06d}",
+            "term": 1272,
+            "code": f"COS {index:03d}",
+            "title": f"Course {index}",
+            "description": f"Course {index} covers " + "algorithms and data structures. " * 20,
+            "status": "Open",
+            "dists": ["QCR"],
+            "hasFinal": True,
+        }
+        for index in range(count)
+    ]
+
+
+def test_compact_projects_truncates_and_counts() -> None:
+    compactor = ToolResultCompactor(max_tokens=4000, round_max_tokens=12000)
+    result = _mcp_result({"count": 40, "courses": _courses(40)})
+
+    compacted = compactor.compact("search_courses", result, json.dumps(result))
+    payload = json.loads(compacted.content)
+
+    assert payload["count"] == 40
+    assert len(payload["courses"]) == 26
+    assert payload["courses"][-1] == {"omitted": 15}
+    first = payload["courses"][0]
+    assert set(first) == {"id", "code", "title", "description", "status", "dists", "hasFinal"}
+    assert first["description"].endswith("chars)")
+    assert compacted.tokens < compacted.raw_tokens / 2
+    assert compactor.stats() == {"calls": 1, "rawTokens": compacted.raw_tokens, "tokens": compacted.tokens}
+
+
+def test_compact_drops_descriptions_already_shown() -> None:
+    compactor = ToolResultCompactor(max_tokens=4000, round_max_tokens=12000)
+    search = _mcp_result({"count": 2, "courses": _courses(2)})
+    details = _mcp_result({**_courses(1)[0], "gradingBasis": "FUL"})
+
+    compactor.compact("search_courses", search, json.dumps(search))
+    payload = json.loads(compactor.compact("get_course_details", details, json.dumps(details)).content)
+
+    assert payload["description"] == SHOWN_EARLIER
+    assert payload["gradingBasis"] == "FUL"
+
+
+def test_compact_round_shares_the_token_budget() -> None:
+    compactor = ToolResultCompactor(max_tokens=4000, round_max_tokens=3000)
+    result = _mcp_result({"comments": ["Great course, " * 40] * 200})
+
+    compacted = compactor.compact_round([("summarize_course_reviews", result, json.dumps(result))] * 3)
+
+    assert all(item.tokens <= 1000 for item in compacted)
+    assert json.loads(compacted[0].content)["comments"][-1]["omitted"] > 0
+    # Plain-text results are passed through as text.
+    plain = {"content": [{"type": "text", "text": "No reviews found."}]}
+    assert compactor.compact("summarize_course_reviews", plain, json.dumps(plain)).content == "No reviews found."
+
+
+def test_truncated_preview_does_not_mark_descriptions_shown() -> None:
+    compactor = ToolResultCompactor(max_tokens=4000, round_max_tokens=12000)
+    search = _mcp_result({"count": 2, "courses": _courses(2)})
+    details = _mcp_result({**_courses(1)[0], "gradingBasis": "FUL"})
+
+    preview = compactor.compact("search_courses", search, json.dumps(search), max_tokens=20)
+    assert json.loads(preview.content)["truncated"]
+    payload = json.loads(compactor.compact("get_course_details", details, json.dumps(details)).content)
+    assert payload["description"] != SHOWN_EARLIER
+
+
+def test_evaluations_keep_the_newest_terms() -> None:
+    compactor = ToolResultCompactor(max_tokens=4000, round_max_tokens=12000)
+    terms = ["1244", "1264", "1232", "1254", "1234", "1262", "1242", "1252", "1222", "1224"]
+    evaluations = [{"evalTerm": term, "rating": 4.0, "summary": "Fine."} for term in terms]
+    result = _mcp_result({"listingId": "002051", "termCount": 10, "evaluations": evaluations})
+
+    payload = json.loads(compactor.compact("get_course_evaluations", result, json.dumps(result)).content)
+
+    kept = [row["evalTerm"] for row in payload["evaluations"][:-1]]
+    assert kept == sorted(terms, reverse=True)[:8]
+    assert payload["evaluations"][-1] == {"omitted": 2}
+
+
+class _FakeMcpClient:
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        self._session_id = "sid"
+
+    async def list_tools(self) -> list[dict]:
+        return [{"type": "function", "function": {"name": "search_courses", "parameters": {}}}]
+
+    async def call_tool(self, name: str, arguments: dict) -> dict:
+        return _mcp_result({"count": 40, "courses": _courses(40)})
+
+    async def close(self) -> None:
+        return None
+
+
+class _FakeLlmClient:
+    tool_messages: list[dict] = []
+
+    def __init__(self, settings: Settings, **kwargs) -> None:
+        pass
+
+    async def stream_chat(self, *, messages: list[dict], tools: list[dict], model: str | None = None):
+        tool_messages = [m for m in messages if m.get("role") == "tool"]
+        if not tool_messages:
+            yield {
+                "choices": [
+                    {
+                        "delta": {
+                            "tool_calls": [
+                                {"index": 0, "id": "call_1", "function": {"name": "search_courses", "arguments": "{}"}}
+                            ]
+                        },
+                        "finish_reason": "tool_calls",
+                    }
+                ]
+            }
+            return
+        _FakeLlmClient.tool_messages = tool_messages
+        yield {"choices": [{"delta": {"content": "Done."}, "finish_reason": "stop"}]}
+
+    async def close(self) -> None:
+        return None
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_compacted_results_to_the_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.chat_service.McpHttpClient", _FakeMcpClient)
+    monkeypatch.setattr("app.chat_service.OpenAiLlmClient", _FakeLlmClient)
+    metrics = GatewayMetrics()
+    service = ChatService(
+        Settings(tool_timeout_seconds=1, ask_llm_planner_enabled=True, done_timings_enabled=True),
+        metrics=metrics,
+    )
+    payload = AskStreamRequest(messages=[ChatMessage(role="user", content="cs courses")])
+
+    chunks = [chunk async for chunk in service.stream_chat(payload, is_disconnected=lambda: False)]
+
+    tool_result = next(chunk for chunk in chunks if chunk.startswith("event: tool_result"))
+    full = json.loads(tool_result.splitlines()[1].removeprefix("data: "))["result"]
+    assert json.loads(full["content"][0]["text"])["courses"] == _courses(40)
+
+    [message] = _FakeLlmClient.tool_messages
+    assert len(json.loads(message["content"])["courses"]) == 26
+    done = json.loads(chunks[-1].splitlines()[1].removeprefix("data: "))
+    tokens = done["timings"]["toolResultTokens"]
+    assert tokens == {
+        "raw": estimate_tokens(json.dumps(full, separators=(",", ":"))),
+        "sent": estimate_tokens(message["content"]),
+    }
+    assert metrics.tool_result_tokens.count("sent") == 1
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from app import supabase_store, usage_tracker
+from app.quota_cache import QuotaCache
+
+
+@pytest.fixture
+def supabase(monkeypatch: pytest.MonkeyPatch):
+    requests: list[httpx.Request] = []
+    state = {"rpc": True, "spent": 1.0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/rpc/increment_ask_quota"):
+            if not state["rpc"]:
+                return httpx.Response(404, json={"code": "PGRST202"})
+            state["spent"] += json.loads(request.content)["p_amount"]
+            return httpx.Response(200, json=state["spent"])
+        if request.method == "GET":
+            return httpx.Response(200, json=[{"spent": state["spent"]}])
+        state["spent"] = json.loads(request.content)["spent"]
+        return httpx.Response(201)
+
+    monkeypatch.setattr(supabase_store, "_SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setattr(supabase_store, "_SUPABASE_KEY", "service-key")
+    monkeypatch.setattr(supabase_store, "_increment_rpc_available", True)
+    supabase_store.set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    yield requests, state
+    supabase_store.set_http_client(None)
+
+
+@pytest.mark.asyncio
+async def test_record_usage_is_a_single_round_trip(supabase) -> None:
+    requests, _ = supabase
+
+    status = await usage_tracker.record_usage_async("abc", 2.5)
+
+    assert [r.url.path for r in requests] == ["/rest/v1/rpc/increment_ask_quota"]
+    assert status is not None
+    assert status["spent"] == 3.5
+    assert status["tier"] == 2
+
+
+@pytest.mark.asyncio
+async def test_record_usage_falls_back_without_rpc(supabase) -> None:
+    requests, state = supabase
+    state["rpc"] = False
+
+    first = await usage_tracker.record_usage_async("abc", 0.5)
+    second = await usage_tracker.record_usage_async("abc", 0.5)
+
+    assert first["spent"] == 1.5
+    assert second["spent"] == 2.0
+    rpc_calls = [r for r in requests if r.url.path.endswith("/rpc/increment_ask_quota")]
+    assert len(rpc_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_zero_cost_records_nothing(supabase) -> None:
+    requests, _ = supabase
+
+    assert await usage_tracker.record_usage_async("abc", 0) is None
+    assert requests == []
+
+
+@pytest.fixture
+def quota_cache():
+    cache = QuotaCache(max_entries=2, max_age=60)
+    usage_tracker.set_quota_cache(cache)
+    yield cache
+    usage_tracker.set_quota_cache(None)
+
+
+@pytest.mark.asyncio
+async def test_quota_reads_are_cached_and_written_through(supabase, quota_cache) -> None:
+    requests, _ = supabase
+
+    first = await usage_tracker.get_user_usage_async("abc")
+    second = await usage_tracker.get_user_usage_async("abc")
+    await usage_tracker.record_usage_async("abc", 2.5)
+    third = await usage_tracker.resolve_model_for_user_async("abc")
+
+    assert first["spent"] == second["spent"] == 1.0
+    assert third["spent"] == 3.5
+    assert third["tier"] == 2
+    assert [r.method for r in requests] == ["GET", "POST"]
+    assert quota_cache.stats()["hits"] == 2
+
+
+def test_quota_cache_expiry_and_bounds(monkeypatch: pytest.MonkeyPatch) -> None:
+    published: list[tuple[str, str, float]] = []
+    cache = QuotaCache(max_entries=2, max_age=60, on_write=lambda *args: published.append(args))
+    clock = {"now": 100.0}
+    monkeypatch.setattr("app.quota_cache.time.monotonic", lambda: clock["now"])
+
+    cache.put("abc", "w0", 1.0, window_seconds_left=5)
+    cache.write_through("abc", "w0", 0.5, window_seconds_left=5)
+    assert cache.get("abc", "w0") == 1.0
+    assert published == [("abc", "w0", 1.0)]
+
+    clock["now"] += 5
+    assert cache.get("abc", "w0") is None
+
+    cache.put("a", "w1", 1.0, window_seconds_left=600)
+    cache.put("b", "w1", 1.0, window_seconds_left=600)
+    cache.put("c", "w1", 1.0, window_seconds_left=600)
+    assert cache.get("a", "w1") is None
+    cache.invalidate("b")
+    assert cache.get("b", "w1") is None
+    assert cache.get("c", "w1") == 1.0
+
+
+@pytest.mark.asyncio
+async def test_slow_quota_read_does_not_roll_back_a_write_through(
+    supabase, quota_cache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    read_spent = supabase_store.get_quota_spent
+
+    async def slow_read(netid: str, window: str) -> float:
+        spent = await read_spent(netid, window)
+        # A concurrent request records usage while this read is in flight.
+        await usage_tracker.record_usage_async(netid, 2.5)
+        return spent
+
+    monkeypatch.setattr(supabase_store, "get_quota_spent", slow_read)
+
+    assert (await usage_tracker.get_user_usage_async("abc"))["spent"] == 1.0
+    assert (await usage_tracker.get_user_usage_async("abc"))["spent"] == 3.5
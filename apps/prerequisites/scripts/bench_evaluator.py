@@ -0,0 +1,59 @@
+"""Times prerequisite evaluation over the whole library for random 8-semester plans.
+
+Usage: python bench_evaluator.py [--plans N] [--per-semester N] [--seed N]
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+from evaluator import PrerequisiteEvaluator
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+def random_plan(evaluator: PrerequisiteEvaluator, rng: random.Random, per_semester: int):
+    """Builds a plan by picking eligible courses semester by semester."""
+    plan = []
+    taken = 0
+    for _ in range(8):
+        options = evaluator.eligible(taken)
+        semester = rng.sample(options, min(per_semester, len(options)))
+        plan.append(semester)
+        taken |= evaluator.mask(semester)
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--plans', type=int, default=20)
+    parser.add_argument('--per-semester', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    evaluator = PrerequisiteEvaluator.from_library(sorted(glob.glob(os.path.join(LIB_DIR, '*', '*.yaml'))))
+    print(f"built evaluator: {len(evaluator.codes)} courses, {len(evaluator.graph)} nodes "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = random.Random(args.seed)
+    plans = [random_plan(evaluator, rng, args.per_semester) for _ in range(args.plans)]
+
+    timings = {'eligible_after': [], 'check_plan': []}
+    for plan in plans:
+        start = time.perf_counter()
+        eligible = evaluator.eligible_after(plan)
+        timings['eligible_after'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        evaluator.check_plan(plan)
+        timings['check_plan'].append(time.perf_counter() - start)
+
+    print(f"{len(plans)} plans, {args.per_semester} courses per semester, last plan unlocks {len(eligible)} courses")
+    for name, values in timings.items():
+        values.sort()
+        print(f"{name:<15} median {values[len(values) // 2] * 1000:7.3f} ms   max {values[-1] * 1000:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Times "what does this course unlock?" queries against a scan of every tree.
+
+Usage: python bench_unlocks.py [--queries N] [--seed N]
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+from evaluator import course_id
+from unlocks import UnlocksIndex, course_references
+from yaml_interpreter import process_yaml_file
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+def load_catalog(paths):
+    courses = []
+    for path in paths:
+        try:
+            _, compiled = process_yaml_file(path, unlisted=[])
+        except Exception:
+            continue
+        courses.extend((course['code'], course['prerequisite_head']) for course in compiled)
+    return courses
+
+
+def scan(catalog, code):
+    """The direct unlocks of ``code`` found by walking every prerequisite tree."""
+    listing_id = course_id(code) or code
+    return [
+        target for target, head in catalog
+        if any(reference == listing_id for reference, _, _ in course_references(head))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = load_catalog(sorted(glob.glob(os.path.join(LIB_DIR, '*', '*.yaml'))))
+    start = time.perf_counter()
+    index = UnlocksIndex(
+        (code, course_id(code), course_references(head)) for code, head in catalog if head is not None
+    )
+    print(f"built index: {len(index.direct)} referenced courses, "
+          f"{sum(map(len, index.transitive.values()))} transitive links "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = random.Random(args.seed)
+    codes = rng.choices([code for code, _ in catalog], k=args.queries)
+    timings = {'scan': [], 'unlocks': [], 'unlocks_eventually': []}
+    for code in codes:
+        start = time.perf_counter()
+        expected = scan(catalog, code)
+        timings['scan'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        direct = index.unlocks(code)
+        timings['unlocks'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.unlocks_eventually(code)
+        timings['unlocks_eventually'].append(time.perf_counter() - start)
+        assert [unlock.course for unlock in direct] == expected, code
+
+    print(f"{len(codes)} queries over {len(catalog)} courses")
+    for name, values in timings.items():
+        values.sort()
+        print(f"{name:<19} median {values[len(values) // 2] * 1000:8.4f} ms   max {values[-1] * 1000:8.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Build cache for incremental prerequisite compilation.
+
+Each department file's compiled result is stored with:
+
+- a hash of the file's contents,
+- the departments of the cross-listing table its expressions look up
+  (``None`` when a wildcard can match any department), and
+- a hash of that slice of the table.
+
+A cached result is reused while all three still match and the compiler
+(its sources and the built-in macros) is unchanged.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+from crosslisting import CrosslistingIndex, is_plain_prefix
+from yaml_interpreter import KNOWN_MACROS_EXPANSIONS, tokenize_expression
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE = os.path.join(SCRIPTS_DIR, '..', 'cache', 'prerequisites-build.json')
+COMPILER_SOURCES = [
+    'yaml_interpreter.py',
+    'crosslisting.py',
+    'flat_graph.py',
+    'evaluator.py',
+    'unlocks.py',
+    'compile_prerequisites.py',
+    'build_cache.py',
+]
+
+_LEADING_DEPT_RE = re.compile(r'[A-Z]*')
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return _sha256(f.read())
+
+
+def compiler_hash() -> str:
+    """Hash of everything that affects every department's output."""
+    digest = hashlib.sha256()
+    for name in COMPILER_SOURCES:
+        with open(os.path.join(SCRIPTS_DIR, name), 'rb') as f:
+            digest.update(f.read())
+    digest.update(json.dumps(KNOWN_MACROS_EXPANSIONS, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def table_department(code: str) -> str:
+    """The department a cross-listing key is filed under for slicing."""
+    return _LEADING_DEPT_RE.match(code).group()
+
+
+def referenced_departments(department_info: dict, courses: List[dict]) -> Optional[List[str]]:
+    """Departments of the cross-listing table a compiled file depends on.
+
+    Walks every ``reqs`` expression, following macros, and returns the
+    department of each course, wildcard and ``<`` token. Returns ``None``
+    when a wildcard is not a literal prefix and may match any department.
+    """
+    macros = {item['name']: item['equ'] for item in department_info.get('vars') or []}
+    departments = set()
+    seen_macros = set()
+    pending = [course['prerequisite_expression'] for course in courses if course['prerequisite_expression']]
+    for course in courses:
+        departments.add(table_department(course['code']))
+
+    while pending:
+        for token in tokenize_expression(pending.pop()):
+            token = token[1:] if token[0] == '$' else token
+            if token in {'(', ')', '&', '|', ''}:
+                continue
+            if token in KNOWN_MACROS_EXPANSIONS or token in macros:
+                expansion = KNOWN_MACROS_EXPANSIONS.get(token, macros.get(token))
+                if token not in seen_macros and isinstance(expansion, str):
+                    seen_macros.add(token)
+                    pending.append(expansion)
+            elif token[-1] == '*':
+                prefix = token[:3] + ' ' + token[3:].replace('*', '')
+                if not is_plain_prefix(prefix):
+                    return None
+                departments.add(table_department(prefix))
+            elif token[0] == '<':
+                departments.add(token[1:4])
+            else:
+                departments.add(table_department(token))
+    return sorted(departments)
+
+
+class TableSlices:
+    """Per-department hashes of the cross-listing table."""
+
+    def __init__(self, index: CrosslistingIndex):
+        grouped: Dict[str, list] = {}
+        for code in index.codes:
+            grouped.setdefault(table_department(code), []).append([code, index.data[code]])
+        self._hashes = {
+            dept: _sha256(json.dumps(entries, sort_keys=True).encode()) for dept, entries in grouped.items()
+        }
+        self._all = _sha256(json.dumps(sorted(self._hashes.items())).encode())
+
+    def hash(self, departments: Optional[Iterable[str]]) -> str:
+        if departments is None:
+            return self._all
+        return _sha256(json.dumps([[dept, self._hashes.get(dept)] for dept in departments]).encode())
+
+
+class BuildCache:
+    """Compiled results per department file, persisted as one JSON file."""
+
+    def __init__(self, path: str, compiler: str):
+        self.path = path
+        self.compiler = compiler
+        self.entries: Dict[str, dict] = {}
+        self.rebuilt = 0
+        try:
+            with open(path, 'r') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get('compiler') == compiler:
+            self.entries = stored.get('entries', {})
+
+    def lookup(self, name: str, content: str, slices: TableSlices) -> Optional[dict]:
+        entry = self.entries.get(name)
+        if entry is None or entry['content'] != content:
+            return None
+        if entry['slice'] != slices.hash(entry['departments']):
+            return None
+        return entry['result']
+
+    def store(self, name: str, content: str, departments: Optional[List[str]], slices: TableSlices, result: dict):
+        self.entries[name] = {
+            'content': content,
+            'departments': departments,
+            'slice': slices.hash(departments),
+            'result': result,
+        }
+        self.rebuilt += 1
+
+    def prune(self, names: Iterable[str]) -> None:
+        """Drops entries for files that no longer exist."""
+        keep = set(names)
+        self.entries = {name: entry for name, entry in self.entries.items() if name in keep}
+
+    def save(self) -> None:
+        atomic_write_json(self.path, {'compiler': self.compiler, 'entries': self.entries})
+
+
+def atomic_write_json(path: str, data) -> None:
+    """Writes JSON to a temporary file and renames it over ``path``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
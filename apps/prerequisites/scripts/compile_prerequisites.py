@@ -0,0 +1,182 @@
+"""Compiles every department YAML file in lib into one prerequisite graph artifact.
+
+Usage: python compile_prerequisites.py [--out PATH] [--jobs N] [--strict] [--no-cache] [--flat]
+
+Files are compiled in parallel across a process pool; each worker loads the
+cross-listing index once. Parse errors and unlisted courses are reported per
+file in the artifact instead of being printed. The artifact also carries the
+reverse-dependency index under ``unlocks`` (see unlocks.py). Files whose contents and
+cross-listing dependencies are unchanged since the last build are reused
+from the build cache (see build_cache.py).
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+from build_cache import (
+    DEFAULT_CACHE,
+    BuildCache,
+    TableSlices,
+    atomic_write_json,
+    compiler_hash,
+    file_hash,
+    referenced_departments,
+)
+from evaluator import course_id
+from flat_graph import FlatGraph
+from unlocks import UnlocksIndex, course_references
+from yaml_interpreter import CROSSLISTING_INDEX, CourseNode, Node, process_yaml_file
+
+PREREQUISITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LIB_DIR = os.path.join(PREREQUISITES_DIR, 'lib')
+DEFAULT_OUT = os.path.join(PREREQUISITES_DIR, 'out', 'prerequisites.json')
+
+
+def serialize_node(node: Optional[Node]):
+    """Converts a prerequisite tree into plain JSON values.
+
+    Courses become ``{"course", "id"}`` and operators ``{"op", "children"}``
+    with each child as ``[node, is_coreq]``.
+    """
+    if node is None:
+        return None
+    if isinstance(node, CourseNode):
+        return {"course": node.value, "id": node.course_id}
+    return {"op": node.value, "children": [[serialize_node(child), is_coreq] for child, is_coreq in node.children]}
+
+
+def compile_file(path: str, flat: bool = False) -> Dict:
+    """Compiles one department file into a JSON-ready result.
+
+    With ``flat``, the department's trees are stored once as a ``FlatGraph``
+    under ``graph`` and each ``prerequisite_head`` is a node index into it.
+    """
+    name = os.path.relpath(path, LIB_DIR)
+    unlisted = []
+    try:
+        department_info, courses = process_yaml_file(path, unlisted=unlisted)
+    except Exception as e:
+        return {"file": name, "error": f"{type(e).__name__}: {e}", "dependencies": None}
+
+    department = dict(department_info, updated=department_info['updated'].strftime('%Y-%m-%d'))
+    if flat:
+        graph = FlatGraph()
+        department['courses'] = [dict(course, prerequisite_head=graph.add(course['prerequisite_head'])) for course in courses]
+        department['graph'] = graph.to_json()
+    else:
+        department['courses'] = [
+            dict(course, prerequisite_head=serialize_node(course['prerequisite_head']))
+            for course in courses
+        ]
+    return {
+        "file": name,
+        "department": department,
+        "unlisted": [{"course": course, "token": token} for course, token in unlisted],
+        "references": [
+            [course['code'], course_id(course['code']), course_references(course['prerequisite_head'])]
+            for course in courses
+            if course['prerequisite_head'] is not None
+        ],
+        "dependencies": referenced_departments(department_info, courses),
+    }
+
+
+def compile_library(
+    paths: List[str], jobs: Optional[int] = None, cache: Optional[BuildCache] = None, flat: bool = False
+) -> Dict:
+    """Compiles ``paths`` and merges the results into a single artifact.
+
+    With a ``cache``, only files that changed (or whose cross-listing slice
+    changed) are compiled, and the cache is updated with their results.
+    """
+    names = [os.path.relpath(path, LIB_DIR) for path in paths]
+    results: Dict[str, dict] = {}
+    stale = list(paths)
+    if cache is not None:
+        slices = TableSlices(CROSSLISTING_INDEX)
+        contents = {name: file_hash(path) for name, path in zip(names, paths)}
+        stale = []
+        for name, path in zip(names, paths):
+            cached = cache.lookup(name, contents[name], slices)
+            if cached is None:
+                stale.append(path)
+            else:
+                results[name] = cached
+
+    if jobs == 1 or len(stale) <= 1:
+        compiled = [compile_file(path, flat) for path in stale]
+    else:
+        # Workers build the cross-listing index once, when they import
+        # yaml_interpreter, and reuse it for every file they are handed.
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            compiled = list(pool.map(partial(compile_file, flat=flat), stale, chunksize=4))
+
+    for result in compiled:
+        dependencies = result.pop("dependencies")
+        results[result["file"]] = result
+        if cache is not None:
+            cache.store(result["file"], contents[result["file"]], dependencies, slices, result)
+    if cache is not None:
+        cache.prune(names)
+
+    artifact = {"departments": {}, "errors": {}, "unlisted": {}}
+    references = []
+    for name in names:
+        result = results[name]
+        if "error" in result:
+            artifact["errors"][name] = result["error"]
+            continue
+        # Keyed by file: a few headers share or omit their department code.
+        artifact["departments"][name] = result["department"]
+        if result["unlisted"]:
+            artifact["unlisted"][name] = result["unlisted"]
+        references.extend(result["references"])
+    artifact["unlocks"] = UnlocksIndex(references).to_json()
+    return artifact
+
+
+def write_artifact(artifact: Dict, out_path: str) -> None:
+    atomic_write_json(out_path, artifact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=DEFAULT_OUT, help='artifact path (default: out/prerequisites.json)')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--strict', action='store_true', help='exit with status 1 if any file fails to compile')
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help='build cache path (default: cache/prerequisites-build.json)')
+    parser.add_argument('--no-cache', action='store_true', help='recompile every file and leave the cache untouched')
+    parser.add_argument('--flat', action='store_true', help='store trees as flat node arrays (see flat_graph.py)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = sorted(glob.glob(os.path.join(LIB_DIR, '*', '*.yaml')))
+    # The output format is part of the cache key, as results differ per format.
+    compiler = compiler_hash() + (':flat' if args.flat else '')
+    cache = None if args.no_cache else BuildCache(args.cache, compiler)
+    artifact = compile_library(paths, args.jobs, cache, args.flat)
+    write_artifact(artifact, args.out)
+    rebuilt = len(paths)
+    if cache is not None:
+        cache.save()
+        rebuilt = cache.rebuilt
+
+    for name, error in sorted(artifact["errors"].items()):
+        print(f"ERROR: {name}: {error}", file=sys.stderr)
+    unlisted = sum(len(entries) for entries in artifact["unlisted"].values())
+    print(
+        f"Compiled {len(artifact['departments'])}/{len(paths)} departments, {rebuilt} rebuilt "
+        f"({unlisted} unlisted courses) in {time.perf_counter() - start:.2f}s -> {args.out}",
+        file=sys.stderr,
+    )
+    if args.strict and artifact["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import bisect
+import json
+import os
+import re
+import sqlite3
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PREREQUISITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CROSS_TABLE_PATH = os.path.join(PREREQUISITES_DIR, 'coursedata', 'resolve', 'cross_table.json')
+STORE_PATH = os.path.join(PREREQUISITES_DIR, 'cache', 'crosslisting.sqlite3')
+
+COURSE_CODE_RE = re.compile(r'([A-Z]+)\s*(\d+[A-Z]*)')
+# Wildcard prefixes made of these characters match literally, so they can use
+# the sorted key index instead of a regex scan.
+_PLAIN_PREFIX_RE = re.compile(r'[A-Za-z0-9 ]*')
+
+
+def is_plain_prefix(prefix: str) -> bool:
+    return _PLAIN_PREFIX_RE.fullmatch(prefix) is not None
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def range_minimum(dept: str, num: str, first_number: str, invalid_number: Optional[str]) -> int:
+    """The lowest course number matched by ``<`` on ``dept`` and ``num``.
+
+    The original table scan converted the department's course numbers as it
+    went, so any lettered number (``invalid_number``) makes the token an
+    error. The checks run in the scan's order, so the same tokens fail.
+    """
+    _course_number(dept, first_number)
+    minimum = _course_number(dept, num)
+    if invalid_number is not None:
+        _course_number(dept, invalid_number)
+    return minimum
+
+
+def _course_number(dept: str, number: str) -> int:
+    try:
+        return int(number)
+    except ValueError as exc:
+        raise ValueError(
+            f"Cannot resolve '<{dept}': course number {number!r} in {dept} is not an integer"
+        ) from exc
+
+
+@dataclass
+class DepartmentIndex:
+    """Courses of one department, sorted by course number."""
+    numbers: List[int] = field(default_factory=list)
+    positions: List[int] = field(default_factory=list)
+    # Number of the first course listed for the department, and the first
+    # one that is not a plain integer (e.g. "206A"), in table order.
+    first_number: Optional[str] = None
+    invalid_number: Optional[str] = None
+
+
+class CrosslistingIndex:
+    """Lookup structures built once over the cross-listing table.
+
+    Every lookup returns course codes in table order, which is the order the
+    original linear scans produced them in.
+    """
+
+    def __init__(self, data: Dict[str, dict]):
+        self.data = data
+        self.codes: List[str] = list(data)
+        self._sorted_codes = sorted(range(len(self.codes)), key=lambda i: self.codes[i])
+        self._sorted_keys = [self.codes[i] for i in self._sorted_codes]
+        self.departments: Dict[str, DepartmentIndex] = {}
+
+        numbered: Dict[str, List[Tuple[int, int]]] = {}
+        for position, code in enumerate(self.codes):
+            match = COURSE_CODE_RE.match(code)
+            if not match:
+                continue
+            dept, num = match.groups()
+            index = self.departments.setdefault(dept, DepartmentIndex())
+            if index.first_number is None:
+                index.first_number = num
+            if num.isdigit():
+                numbered.setdefault(dept, []).append((int(num), position))
+            elif index.invalid_number is None:
+                index.invalid_number = num
+
+        for dept, entries in numbered.items():
+            entries.sort()
+            self.departments[dept].numbers = [number for number, _ in entries]
+            self.departments[dept].positions = [position for _, position in entries]
+
+    def course_id(self, code: str) -> Optional[str]:
+        entry = self.data.get(code)
+        return entry["id"] if entry is not None else None
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Codes matching ``^<prefix>.*$``, i.e. a wildcard such as ``COS2*``."""
+        if not is_plain_prefix(prefix):
+            pattern = compile_pattern("^" + prefix + ".*$")
+            return [code for code in self.codes if pattern.match(code)]
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        positions = []
+        for i in range(start, len(self._sorted_keys)):
+            if not self._sorted_keys[i].startswith(prefix):
+                break
+            positions.append(self._sorted_codes[i])
+        return [self.codes[position] for position in sorted(positions)]
+
+    def at_least(self, dept: str, num: str) -> List[str]:
+        """Codes in ``dept`` numbered ``num`` or higher (the ``<`` operator)."""
+        index = self.departments.get(dept)
+        if index is None:
+            return []
+        minimum = range_minimum(dept, num, index.first_number, index.invalid_number)
+        start = bisect.bisect_left(index.numbers, minimum)
+        return [self.codes[position] for position in sorted(index.positions[start:])]
+
+
+def load_index(path: str = CROSS_TABLE_PATH) -> CrosslistingIndex:
+    with open(path, 'r') as file:
+        return CrosslistingIndex(json.load(file))
+
+
+class CrosslistingStore:
+    """SQLite-backed cross-listing lookups, opened on first use.
+
+    The JSON table is converted once into an indexed database next to the
+    other build caches, and rebuilt whenever the JSON file changes. Nothing
+    is read until the first lookup, and only rows that are looked up are
+    loaded. Offers the same lookups as ``CrosslistingIndex``.
+    """
+
+    def __init__(self, path: str = STORE_PATH, source: str = CROSS_TABLE_PATH):
+        self.path = path
+        self.source = source
+        self.data = _StoreMapping(self)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._fallback: Optional[CrosslistingIndex] = None
+        self._codes: Optional[List[str]] = None
+
+    @property
+    def codes(self) -> List[str]:
+        if self._codes is None and not self._use_fallback():
+            self._codes = [code for code, in self._query('SELECT code FROM courses ORDER BY position')]
+        return self._codes
+
+    def course_id(self, code: str) -> Optional[str]:
+        entry = self.data.get(code)
+        return entry["id"] if entry is not None else None
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Codes matching ``^<prefix>.*$``, i.e. a wildcard such as ``COS2*``."""
+        if self._use_fallback():
+            return self._fallback.with_prefix(prefix)
+        if not is_plain_prefix(prefix):
+            pattern = compile_pattern("^" + prefix + ".*$")
+            return [code for code in self.codes if pattern.match(code)]
+        rows = self._query(
+            'SELECT code FROM courses WHERE code >= ? AND code < ? ORDER BY position', (prefix, prefix + '\U0010ffff')
+        )
+        return [code for code, in rows]
+
+    def at_least(self, dept: str, num: str) -> List[str]:
+        """Codes in ``dept`` numbered ``num`` or higher (the ``<`` operator)."""
+        if self._use_fallback():
+            return self._fallback.at_least(dept, num)
+        rows = self._query('SELECT first_number, invalid_number FROM departments WHERE dept = ?', (dept,))
+        if not rows:
+            return []
+        first_number, invalid_number = rows[0]
+        minimum = range_minimum(dept, num, first_number, invalid_number)
+        rows = self._query(
+            'SELECT code FROM courses WHERE dept = ? AND number >= ? ORDER BY position', (dept, minimum)
+        )
+        return [code for code, in rows]
+
+    def _use_fallback(self) -> bool:
+        if self._fallback is None and self._connect() is None:
+            # No usable database (e.g. a read-only checkout): load the JSON.
+            self._fallback = load_index(self.source)
+            self._codes = self._fallback.codes
+        return self._fallback is not None
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        return self._connection.execute(sql, params).fetchall()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # Connections must not cross a fork, so each process opens its own.
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        try:
+            stat = os.stat(self.source)
+            version = f'{stat.st_size}:{stat.st_mtime_ns}'
+            connection = _open_store(self.path, version)
+            if connection is None:
+                _build_store(self.path, self.source, version)
+                connection = _open_store(self.path, version)
+        except (OSError, sqlite3.Error):
+            connection = None
+        self._connection = connection
+        self._pid = os.getpid()
+        return connection
+
+
+class _StoreMapping(Mapping):
+    """Read-only ``code -> entry`` view over a store, caching rows it loads."""
+
+    def __init__(self, store: CrosslistingStore):
+        self._store = store
+        self._rows: Dict[str, Optional[dict]] = {}
+
+    def __getitem__(self, code: str) -> dict:
+        entry = self._rows.get(code, ...)
+        if entry is ... and self._store._use_fallback():
+            return self._store._fallback.data[code]
+        if entry is ...:
+            rows = self._store._query('SELECT data FROM courses WHERE code = ?', (code,))
+            entry = self._rows[code] = json.loads(rows[0][0]) if rows else None
+        if entry is None:
+            raise KeyError(code)
+        return entry
+
+    def __contains__(self, code) -> bool:
+        try:
+            self[code]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.codes)
+
+    def __len__(self) -> int:
+        return len(self._store.codes)
+
+
+def _open_store(path: str, version: str) -> Optional[sqlite3.Connection]:
+    """Opens the store read-only if it exists and was built from ``version``."""
+    if not os.path.exists(path):
+        return None
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    try:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'source_version'").fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None or row[0] != version:
+        connection.close()
+        return None
+    return connection
+
+
+def _build_store(path: str, source: str, version: str) -> None:
+    """Converts the JSON table into a fresh database and moves it into place."""
+    index = load_index(source)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE courses (
+                code TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                dept TEXT,
+                number INTEGER,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX courses_dept_number ON courses (dept, number);
+            CREATE TABLE departments (dept TEXT PRIMARY KEY, first_number TEXT, invalid_number TEXT);
+            """
+        )
+        rows = []
+        for position, code in enumerate(index.codes):
+            match = COURSE_CODE_RE.match(code)
+            dept, num = match.groups() if match else (None, None)
+            number = int(num) if num is not None and num.isdigit() else None
+            rows.append((code, position, dept, number, json.dumps(index.data[code])))
+        connection.executemany('INSERT INTO courses VALUES (?, ?, ?, ?, ?)', rows)
+        connection.executemany(
+            'INSERT INTO departments VALUES (?, ?, ?)',
+            [(dept, d.first_number, d.invalid_number) for dept, d in index.departments.items()],
+        )
+        connection.execute("INSERT INTO meta VALUES ('source_version', ?)", (version,))
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+
+def open_store(path: str = STORE_PATH, source: str = CROSS_TABLE_PATH) -> CrosslistingStore:
+    return CrosslistingStore(path, source)
@@ -0,0 +1,164 @@
+"""Evaluates compiled prerequisite graphs against a student's courses.
+
+Courses are identified by their cross-listing id, so every listing of a
+cross-listed course counts. Sets of courses are Python ints used as bitsets,
+one bit per course id.
+
+Each operator node is precompiled into two masks over its course children,
+one for plain children and one for corequisite (``$``) children, plus a list
+of operator children. A wide wildcard such as ``PHI*`` then costs a single
+``&`` on two ints, and ``&``/``|`` short-circuit on the masks before
+visiting nested operators.
+
+A course child counts as satisfied if it was completed in an earlier
+semester, or in the same semester when it is a corequisite. Empty wildcard
+expansions are ignored, and a course with no (or only unlisted)
+prerequisites is always satisfied.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flat_graph import AND, COURSE, FlatGraph
+from yaml_interpreter import CROSSLISTING_DATA, parse_course_code, process_yaml_file
+
+
+class PrerequisiteEvaluator:
+    def __init__(self, courses: Iterable[Tuple[str, Optional[str], object]]):
+        """``courses`` yields ``(code, course_id, prerequisite_head)`` per catalog course."""
+        self.graph = FlatGraph()
+        self.bits: Dict[str, int] = {}
+        self.codes: List[str] = []
+        self.ids: List[str] = []
+        self.roots: List[int] = []
+        for code, listing_id, head in courses:
+            self.codes.append(code)
+            self.ids.append(listing_id or code)
+            self.roots.append(self.graph.add(head))
+        self._catalog_index = {course: i for i, course in enumerate(self.ids)}
+        self._compile()
+
+    @classmethod
+    def from_library(cls, paths: Iterable[str]) -> 'PrerequisiteEvaluator':
+        """Compiles the given department files in-process; files that fail are skipped."""
+        courses = []
+        for path in paths:
+            try:
+                _, compiled = process_yaml_file(path, unlisted=[])
+            except Exception:
+                continue
+            for course in compiled:
+                courses.append((course['code'], course_id(course['code']), course['prerequisite_head']))
+        return cls(courses)
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """Bitset of the given course codes; unknown codes are ignored."""
+        result = 0
+        for code in codes:
+            bit = self.bits.get(course_id(code) or code)
+            if bit is not None:
+                result |= bit
+        return result
+
+    def is_satisfied(self, root: int, taken: int, concurrent: int = 0) -> bool:
+        if root < 0:
+            return True
+        return self._satisfied(root, taken, taken | concurrent, {})
+
+    def eligible(self, taken: int, concurrent: int = 0) -> List[str]:
+        """Codes of every catalog course not yet taken whose prerequisites are met."""
+        available = taken | concurrent
+        memo: Dict[Tuple[int, int], bool] = {}
+        result = []
+        for code, course, root in zip(self.codes, self.ids, self.roots):
+            if taken & self.bits[course]:
+                continue
+            if root < 0 or self._satisfied(root, taken, available, memo):
+                result.append(code)
+        return result
+
+    def check_plan(self, semesters: List[List[str]]) -> List[List[str]]:
+        """Courses in each semester whose prerequisites the earlier semesters don't meet."""
+        taken = 0
+        problems = []
+        for semester in semesters:
+            concurrent = self.mask(semester)
+            available = taken | concurrent
+            memo: Dict[Tuple[int, int], bool] = {}
+            missing = []
+            for code in semester:
+                i = self._catalog_index.get(course_id(code) or code)
+                if i is not None and self.roots[i] >= 0 and not self._satisfied(self.roots[i], taken, available, memo):
+                    missing.append(code)
+            problems.append(missing)
+            taken |= concurrent
+        return problems
+
+    def eligible_after(self, semesters: List[List[str]]) -> List[str]:
+        """Courses open to a student once every semester of the plan is complete."""
+        return self.eligible(self.mask(code for semester in semesters for code in semester))
+
+    def _bit(self, course: str) -> int:
+        bit = self.bits.get(course)
+        if bit is None:
+            bit = self.bits[course] = 1 << len(self.bits)
+        return bit
+
+    def _compile(self) -> None:
+        graph = self.graph
+        for course in self.ids:
+            self._bit(course)
+        self._course_bits = [self._bit(listing_id) for listing_id in graph.course_ids]
+        # Per node: (is_and, plain_mask, coreq_mask, [(child, is_coreq), ...])
+        self._nodes: List[Optional[tuple]] = []
+        for i in range(len(graph)):
+            if graph.ops[i] == COURSE:
+                self._nodes.append(None)
+                continue
+            plain = coreq = 0
+            operators = []
+            start = graph.refs[i]
+            for j in range(start, start + graph.counts[i]):
+                child = graph.child_nodes[j]
+                if child < 0:
+                    continue
+                if graph.ops[child] == COURSE:
+                    if graph.child_coreq[j]:
+                        coreq |= self._course_bits[graph.refs[child]]
+                    else:
+                        plain |= self._course_bits[graph.refs[child]]
+                else:
+                    operators.append((child, bool(graph.child_coreq[j])))
+            self._nodes.append((graph.ops[i] == AND, plain, coreq, operators))
+
+    def _satisfied(self, node: int, taken: int, available: int, memo: dict) -> bool:
+        compiled = self._nodes[node]
+        if compiled is None:
+            # A bare course at the root of an expression
+            return bool(taken & self._course_bits[self.graph.refs[node]])
+        key = (node, taken)
+        result = memo.get(key)
+        if result is not None:
+            return result
+
+        is_and, plain, coreq, operators = compiled
+        if is_and:
+            result = (taken & plain) == plain and (available & coreq) == coreq and all(
+                self._satisfied(child, available if is_coreq else taken, available, memo)
+                for child, is_coreq in operators
+            )
+        elif not (plain or coreq or operators):
+            result = True  # every alternative was an empty expansion
+        else:
+            result = bool(taken & plain) or bool(available & coreq) or any(
+                self._satisfied(child, available if is_coreq else taken, available, memo)
+                for child, is_coreq in operators
+            )
+        memo[key] = result
+        return result
+
+
+def course_id(code: str) -> Optional[str]:
+    """Cross-listing id for a course code such as ``COS 226`` or ``COS226``."""
+    _, _, listing_id = parse_course_code(code)
+    if listing_id is None and code in CROSSLISTING_DATA:
+        listing_id = CROSSLISTING_DATA[code]["id"]
+    return listing_id
@@ -0,0 +1,125 @@
+"""Flat, array-backed encoding of prerequisite trees.
+
+Nodes are stored in parallel arrays in post-order, so every child comes
+before its parent and a single forward pass can evaluate the whole graph.
+Shared subtrees (macros, wildcard expansions, interned courses) are encoded
+once and referenced by index.
+
+For node ``i``:
+
+- ``ops[i]`` is ``COURSE``, ``AND`` or ``OR``.
+- For courses, ``refs[i]`` indexes ``course_ids``/``values``.
+- For operators, children are ``child_nodes[refs[i]:refs[i] + counts[i]]``
+  with corequisite flags in ``child_coreq`` at the same offsets.
+  A child of ``-1`` stands for an empty expansion (``None`` in the tree).
+"""
+from array import array
+from typing import Dict, List, Optional
+
+from yaml_interpreter import CourseNode, Node, OperatorNode
+
+COURSE = 0
+AND = 1
+OR = 2
+
+_OPCODES = {'&': AND, '|': OR}
+_OPERATORS = {AND: '&', OR: '|'}
+
+
+class FlatGraph:
+    def __init__(self):
+        self.ops = array('b')
+        self.refs = array('i')
+        self.counts = array('i')
+        self.child_nodes = array('i')
+        self.child_coreq = array('b')
+        self.course_ids: List[str] = []
+        self.values: List[str] = []
+        self._courses: Dict[tuple, int] = {}
+        # id(node) -> (index, node); the node is kept so its id stays unique
+        self._encoded: Dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def add(self, root: Optional[Node]) -> int:
+        """Encodes a tree and returns the index of its root (-1 for None)."""
+        if root is None:
+            return -1
+        seen = self._encoded.get(id(root))
+        if seen is not None:
+            return seen[0]
+
+        # Iterative post-order walk; trees from wide expansions are shallow
+        # but macros can nest deeply.
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self._encoded:
+                continue
+            if isinstance(node, CourseNode):
+                self._append_course(node)
+            elif not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child, _ in reversed(node.children) if child is not None)
+            else:
+                offset = len(self.child_nodes)
+                for child, is_coreq in node.children:
+                    self.child_nodes.append(-1 if child is None else self._encoded[id(child)][0])
+                    self.child_coreq.append(is_coreq)
+                self._append(node, _OPCODES[node.value], offset, len(node.children))
+        return self._encoded[id(root)][0]
+
+    def node(self, index: int) -> Optional[Node]:
+        """Decodes the tree rooted at ``index`` back into nodes."""
+        if index < 0:
+            return None
+        op = self.ops[index]
+        ref = self.refs[index]
+        if op == COURSE:
+            return CourseNode(value=self.values[ref], course_id=self.course_ids[ref])
+        return OperatorNode(
+            value=_OPERATORS[op],
+            children=[
+                (self.node(self.child_nodes[i]), bool(self.child_coreq[i]))
+                for i in range(ref, ref + self.counts[index])
+            ],
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "ops": self.ops.tolist(),
+            "refs": self.refs.tolist(),
+            "counts": self.counts.tolist(),
+            "childNodes": self.child_nodes.tolist(),
+            "childCoreq": self.child_coreq.tolist(),
+            "courseIds": self.course_ids,
+            "values": self.values,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'FlatGraph':
+        graph = cls()
+        graph.ops.fromlist(data["ops"])
+        graph.refs.fromlist(data["refs"])
+        graph.counts.fromlist(data["counts"])
+        graph.child_nodes.fromlist(data["childNodes"])
+        graph.child_coreq.fromlist(data["childCoreq"])
+        graph.course_ids = list(data["courseIds"])
+        graph.values = list(data["values"])
+        return graph
+
+    def _append_course(self, node: CourseNode) -> None:
+        key = (node.course_id, node.value)
+        ref = self._courses.get(key)
+        if ref is None:
+            ref = self._courses[key] = len(self.course_ids)
+            self.course_ids.append(node.course_id)
+            self.values.append(node.value)
+        self._append(node, COURSE, ref, 0)
+
+    def _append(self, node: Node, op: int, ref: int, count: int) -> None:
+        self._encoded[id(node)] = (len(self.ops), node)
+        self.ops.append(op)
+        self.refs.append(ref)
+        self.counts.append(count)
@@ -0,0 +1,123 @@
+"""Reverse-dependency index: which courses a course unlocks.
+
+For each course id referenced by a prerequisite expression, the index keeps
+the catalog courses whose expressions mention it (``direct``), and every
+course reachable by following those links (``transitive``). Both are built
+once, so a query costs a dictionary lookup plus the size of its result.
+
+Each direct entry records its context:
+
+- ``required``: every path to the course goes through ``&`` (or through
+  ``|`` with a single non-empty alternative), so the prerequisite cannot be
+  met without it. Otherwise it is one of several alternatives.
+- ``coreq``: every mention is a corequisite (``$``), so it may be taken in
+  the same semester.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from evaluator import course_id
+from yaml_interpreter import CourseNode, Node, process_yaml_file
+
+# (referenced course id, required, coreq)
+Reference = Tuple[str, bool, bool]
+
+
+@dataclass(frozen=True, slots=True)
+class Unlock:
+    course: str
+    required: bool
+    coreq: bool
+
+
+def course_references(head: Optional[Node]) -> List[Reference]:
+    """Course ids a prerequisite tree refers to, with their context, in first-seen order."""
+    found: Dict[str, Tuple[bool, bool]] = {}
+    seen = set()
+    # Coreq flags on an operator apply to every course beneath it.
+    stack = [(head, True, False)]
+    while stack:
+        node, required, coreq = stack.pop()
+        if node is None or (id(node), required, coreq) in seen:
+            continue
+        seen.add((id(node), required, coreq))
+        if isinstance(node, CourseNode):
+            previous = found.get(node.course_id)
+            if previous is not None:
+                required, coreq = previous[0] or required, previous[1] and coreq
+            found[node.course_id] = (required, coreq)
+            continue
+        alternatives = node.value == '|' and sum(child is not None for child, _ in node.children) > 1
+        for child, is_coreq in reversed(node.children):
+            stack.append((child, required and not alternatives, coreq or is_coreq))
+    return [(listing_id, required, coreq) for listing_id, (required, coreq) in found.items()]
+
+
+class UnlocksIndex:
+    def __init__(self, courses: Iterable[Tuple[str, Optional[str], Iterable[Reference]]]):
+        """``courses`` yields ``(code, course_id, references)`` per catalog course."""
+        self.direct: Dict[str, List[Unlock]] = {}
+        targets: Dict[str, List[Tuple[str, str]]] = {}
+        order: Dict[str, int] = {}
+        for code, listing_id, references in courses:
+            order.setdefault(code, len(order))
+            for reference, required, coreq in references:
+                self.direct.setdefault(reference, []).append(Unlock(code, required, coreq))
+                targets.setdefault(reference, []).append((code, listing_id or code))
+        self.transitive = {reference: self._reachable(reference, targets, order) for reference in targets}
+
+    @classmethod
+    def from_library(cls, paths: Iterable[str]) -> 'UnlocksIndex':
+        """Compiles the given department files in-process; files that fail are skipped."""
+        courses = []
+        for path in paths:
+            try:
+                _, compiled = process_yaml_file(path, unlisted=[])
+            except Exception:
+                continue
+            for course in compiled:
+                code = course['code']
+                courses.append((code, course_id(code), course_references(course['prerequisite_head'])))
+        return cls(courses)
+
+    def unlocks(self, code: str) -> List[Unlock]:
+        """Courses whose prerequisites mention ``code`` (or a cross-listing of it)."""
+        return self.direct.get(course_id(code) or code, [])
+
+    def unlocks_eventually(self, code: str) -> List[str]:
+        """Codes of every course ``code`` leads to through a chain of prerequisites."""
+        return self.transitive.get(course_id(code) or code, [])
+
+    def to_json(self) -> dict:
+        return {
+            "direct": {
+                listing_id: [[unlock.course, unlock.required, unlock.coreq] for unlock in unlocks]
+                for listing_id, unlocks in self.direct.items()
+            },
+            "transitive": self.transitive,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'UnlocksIndex':
+        index = cls.__new__(cls)
+        index.direct = {
+            listing_id: [Unlock(course, required, coreq) for course, required, coreq in unlocks]
+            for listing_id, unlocks in data["direct"].items()
+        }
+        index.transitive = data["transitive"]
+        return index
+
+    @staticmethod
+    def _reachable(start: str, targets: Dict[str, List[Tuple[str, str]]], order: Dict[str, int]) -> List[str]:
+        visited = {start}
+        reached = set()
+        pending = [start]
+        while pending:
+            for code, listing_id in targets.get(pending.pop(), ()):
+                if listing_id == start:
+                    continue  # a cycle back to the course itself
+                reached.add(code)
+                if listing_id not in visited:
+                    visited.add(listing_id)
+                    pending.append(listing_id)
+        return sorted(reached, key=order.__getitem__)
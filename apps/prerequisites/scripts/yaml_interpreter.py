@@ -1,12 +1,14 @@
 import yaml
 import re
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 import json
 from dataclasses import dataclass, field
 from typing import List, Union
 
+from crosslisting import COURSE_CODE_RE, open_store
+
 
 KNOWN_MACROS_EXPANSIONS = {
     "ISCA": "ISC231 & ISC232 & ISC233 & ISC234",
@@ -25,8 +27,31 @@ KNOWN_MACROS_EXPANSIONS = {
     "INTROMOL": "MOL214 | ISCA"
 }
 
-with open('../coursedata/resolve/cross_table.json', 'r') as file:
-    CROSSLISTING_DATA = json.load(file)
+# libyaml's loader is several times faster when PyYAML was built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Operators and parentheses are single-character tokens; everything between
+# them (courses, macros, wildcards) is one token once stripped.
+TOKEN_RE = re.compile(r'[()&|]|[^()&|]+')
+
+# Opened lazily: the first lookup builds or opens the on-disk index
+CROSSLISTING_INDEX = open_store()
+CROSSLISTING_DATA = CROSSLISTING_INDEX.data
+
+# Compiled macro subtrees keyed by (macro name, department macros), along with
+# the unlisted courses reported while compiling them.
+MACRO_CACHE: Dict[Tuple[str, tuple], Tuple[Optional["Node"], List[str]]] = {}
+
+
+# Shared wildcard and `<` expansions keyed by token kind and lookup arguments
+EXPANSION_CACHE: Dict[tuple, Optional["Node"]] = {}
+
+# Interned course nodes keyed by (course_id, value)
+COURSE_NODES: Dict[Tuple[str, str], "CourseNode"] = {}
+
+
+class MacroCycleError(ValueError):
+    """Raised when a macro's expansion refers back to the macro itself."""
 
 
 @dataclass
@@ -41,7 +66,7 @@ class PrerequisiteGroup:
     rules: List[PrerequisiteRule]
     operator: str  # 'AND' or 'OR'
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     """Base class for all nodes."""
     value: str  # Represents the value of the node (e.g., operator or course code)
@@ -51,31 +76,46 @@ class Node:
             raise ValueError("Node value cannot be empty")
 
 
-@dataclass
+# Slotted dataclasses are recreated by the decorator, which breaks zero-argument
+# super(), so the subclasses call Node.__post_init__ explicitly.
+@dataclass(slots=True)
 class OperatorNode(Node):
     """Represents an operator node ('&' or '|') in the prerequisite graph."""
     children: List[Union['OperatorNode', 'CourseNode']] = field(default_factory=list)
 
     def __post_init__(self):
-        super().__post_init__()
+        Node.__post_init__(self)
         if self.value not in {'&', '|'}:
             raise ValueError(f"Invalid operator: {self.value}. Must be '&' or '|'.")
 
 
-@dataclass
+@dataclass(slots=True)
 class CourseNode(Node):
-    """Represents a course or macro node."""
+    """Represents a course or macro node.
+
+    Course nodes are never modified after parsing, so ``course_node`` hands out
+    one shared instance per course id and spelling.
+    """
     course_id: str  # Additional identifier for the course
 
     def __post_init__(self):
-        super().__post_init__()
+        Node.__post_init__(self)
         if not self.course_id:
             self.course_id = self.value  # Default to the course code if not provided
 
 
+def course_node(value: str, course_id: str) -> CourseNode:
+    """Returns the interned node for a course."""
+    key = (course_id, value)
+    node = COURSE_NODES.get(key)
+    if node is None:
+        node = COURSE_NODES[key] = CourseNode(value=value, course_id=course_id)
+    return node
+
+
 def parse_course_code(course_code: str) -> Tuple[str, int]:
     """Extract department and course number from course code."""
-    match = re.match(r'([A-Z]+)\s*(\d+[A-Z]*)', course_code)
+    match = COURSE_CODE_RE.match(course_code)
     if match:
         dept, num = match.groups()
         key = dept + " " + num
@@ -85,14 +125,91 @@ def parse_course_code(course_code: str) -> Tuple[str, int]:
         return dept, num, course_id
     return None, None, None
 
-def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict) -> Node:
-    """Parses a prerequisite expression and returns the head node of the graph."""
-    def parse(tokens):
-        """Recursively parse tokens into a graph."""
+def expand_courses(codes: List[str]) -> Node:
+    """Builds the union of the given cross-listed course codes.
+
+    Matches what parsing ``" | ".join(codes)`` would produce: nothing for no
+    codes, a single course node, or an OR node over all of them.
+    """
+    if not codes:
+        return None
+    nodes = [course_node(code, CROSSLISTING_DATA[code]["id"]) for code in codes]
+    if len(nodes) == 1:
+        return nodes[0]
+    return OperatorNode(value='|', children=[(node, False) for node in nodes])
+
+def expand_shared(key: tuple, lookup) -> Node:
+    """Expands a wildcard or ``<`` token into a subtree shared by every use.
+
+    ``key`` is the token kind followed by the arguments for ``lookup``.
+    """
+    if key not in EXPANSION_CACHE:
+        EXPANSION_CACHE[key] = expand_courses(lookup(*key[1:]))
+    return EXPANSION_CACHE[key]
+
+def copy_root(node: Node) -> Node:
+    """Copies an operator node's child list so appending to it is safe."""
+    if isinstance(node, OperatorNode):
+        return OperatorNode(value=node.value, children=list(node.children))
+    return node
+
+def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict, unlisted: Optional[List[str]] = None) -> Node:
+    """Parses a prerequisite expression and returns the head node of the graph.
+
+    Macro, wildcard and ``<`` subtrees are shared between every expression that uses them and
+    must not be modified. Courses missing from the cross-listing table are
+    skipped and printed, or appended to ``unlisted`` when it is given.
+    """
+    scope = tuple(sorted(DEPARMENT_MACROS.items()))
+    expanding = []  # macros currently being compiled, outermost first
+    recording = []  # unlisted-course logs of the macros being compiled
+
+    def report_unlisted(token):
+        if unlisted is None:
+            print(f"ERROR: Course {token} is not listed.")
+        else:
+            unlisted.append(token)
+        for log in recording:
+            log.append(token)
+
+    def expand_macro(name):
+        """Returns the compiled subtree for a macro, compiling it on first use."""
+        key = (name, scope)
+        if key in MACRO_CACHE:
+            node, unlisted = MACRO_CACHE[key]
+            # Report the same errors an uncached expansion would have
+            for token in unlisted:
+                report_unlisted(token)
+            return node
+        if name in expanding:
+            cycle = expanding[expanding.index(name):] + [name]
+            raise MacroCycleError(f"Macro {name} expands to itself: {' -> '.join(cycle)}")
+
+        if name in KNOWN_MACROS_EXPANSIONS:
+            expanded_expr = KNOWN_MACROS_EXPANSIONS[name]
+        else:
+            expanded_expr = DEPARMENT_MACROS[name]
+        unlisted = []
+        expanding.append(name)
+        recording.append(unlisted)
+        try:
+            node, _ = parse(tokenize_expression(expanded_expr))
+        finally:
+            expanding.pop()
+            recording.pop()
+        MACRO_CACHE[key] = (node, unlisted)
+        return node
+
+    def parse(tokens, pos=0):
+        """Recursively parse tokens from ``pos`` into a graph.
+
+        Returns the head node and the position just past the last token consumed.
+        """
         current_node = None
 
-        while tokens:
-            token = tokens.pop(0)
+        while pos < len(tokens):
+            token = tokens[pos]
+            pos += 1
             is_coreq = False
             if token[0] == "$":
                 # is a corequisite
@@ -101,7 +218,7 @@ def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict) -> Node:
 
             if token == '(':
                 # Start a new subexpression
-                node = parse(tokens)
+                node, pos = parse(tokens, pos)
                 if isinstance(current_node, OperatorNode):
                     current_node.children.append((node, is_coreq))
                 else:
@@ -124,67 +241,35 @@ def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict) -> Node:
                     current_node = new_node
 
             elif token in KNOWN_MACROS_EXPANSIONS or token in DEPARMENT_MACROS:
-                # Expand macros and parse the expanded expression
-                if token in KNOWN_MACROS_EXPANSIONS:
-                    expanded_expr = KNOWN_MACROS_EXPANSIONS[token]
-                else:
-                    expanded_expr = DEPARMENT_MACROS[token]
-                expanded_tokens = tokenize_expression(expanded_expr)
-                node = parse(expanded_tokens)
+                # Expand macros into their shared, precompiled subtree
+                node = expand_macro(token)
                 if isinstance(current_node, OperatorNode):
                     current_node.children.append((node, is_coreq))
                 else:
-                    current_node = node
+                    # Later operands may be appended to the current node, so
+                    # never let that be the shared subtree itself.
+                    current_node = copy_root(node)
 
             elif token[-1] == "*":
                 # Is a wildcard
                 dept, num = token[:3], token[3:]
                 num = num.replace("*", "")
-                if num is None:
-                    regex_pattern = "^" + dept + " " + '.*' + "$"
-                else:
-                    regex_pattern = "^" + dept + " " + num + '.*' + "$"
-               
-                # TODO: this is a very inefficient way to do it, do we have ready-made data?
-                matching_courses = []
-                
-                # Iterate through the course data and check for matches
-                for course, details in CROSSLISTING_DATA.items():
-                    if re.match(regex_pattern, course):
-                        matching_courses.append(course)
-
-                # or union of all that match department and level
-                expanded_expr = " | ".join(matching_courses)
-                expanded_tokens = tokenize_expression(expanded_expr)
-                node = parse(expanded_tokens)
+                node = expand_shared(('*', dept + " " + num), CROSSLISTING_INDEX.with_prefix)
                 if isinstance(current_node, OperatorNode):
                     current_node.children.append((node, is_coreq))
                 else:
-                    current_node = node
+                    current_node = copy_root(node)
 
             elif token[0] == "<":
                 # Is a greater than or equal to 
                 # Note: Placing a `<` before a coures code means that any course in the department with a
                 # course code greater than or equal to it satisfies the prerequisite.
                 dept, num = token[1:4], token[4:]
-                
-                # TODO: this is a very inefficient way to do it, do we have ready-made data?
-                matching_courses = []
-                
-                # Iterate through the course data and check for matches
-                for course, details in CROSSLISTING_DATA.items():
-                    curr_dept, curr_num, curr_course_id = parse_course_code(course)
-                    if curr_dept == dept and int(curr_num) >= int(num):
-                        matching_courses.append(course)
-
-                # or union of all that match department and level
-                expanded_expr = " | ".join(matching_courses)
-                expanded_tokens = tokenize_expression(expanded_expr)
-                node = parse(expanded_tokens)
+                node = expand_shared(('<', dept, num), CROSSLISTING_INDEX.at_least)
                 if isinstance(current_node, OperatorNode):
                     current_node.children.append((node, is_coreq))
                 else:
-                    current_node = node
+                    current_node = copy_root(node)
 
             elif token:
                 # Handle a regular course
@@ -197,46 +282,43 @@ def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict) -> Node:
                     if course_id is None:
                         # TODO: uncomment later, continuing for testing
                         # raise Exception(f"Course {token} is not listed.")
-                        print(f"ERROR: Course {token} is not listed.")
+                        report_unlisted(token)
                         continue
 
-                node = CourseNode(value=token, course_id=course_id)
+                node = course_node(token, course_id)
                 if isinstance(current_node, OperatorNode):
                     current_node.children.append((node, is_coreq))
                 else:
                     current_node = node
 
-        return current_node
+        return current_node, pos
 
     # Tokenize the expression (split into operators, parentheses, and courses/macros)
     tokens = tokenize_expression(expr)
 
     # Parse the tokens into a graph
-    return parse(tokens)
+    return parse(tokens)[0]
 
 
 def tokenize_expression(expr: str) -> List[str]:
     """Tokenizes the prerequisite expression into a list of tokens."""
     tokens = []
-    buffer = ''
-    for char in expr:
-        if char in {'(', ')', '&', '|'}:
-            if buffer.strip():
-                tokens.append(buffer.strip())
-                buffer = ''
-            tokens.append(char)
-        else:
-            buffer += char
-    if buffer.strip():
-        tokens.append(buffer.strip())
+    for match in TOKEN_RE.finditer(expr):
+        token = match.group().strip()
+        if token:
+            tokens.append(token)
     return tokens
 
 
-def process_yaml_file(file_path: str):
-    """Process YAML file and prepare data for database insertion."""
+def process_yaml_file(file_path: str, unlisted: Optional[List[Tuple[str, str]]] = None):
+    """Process YAML file and prepare data for database insertion.
+
+    Progress is printed unless ``unlisted`` is given, in which case it collects
+    ``(course, token)`` for every prerequisite that is not a listed course.
+    """
     with open(file_path, 'r') as f:
         # Load all documents from the YAML file
-        documents = list(yaml.safe_load_all(f))
+        documents = list(yaml.load_all(f, Loader=YAML_LOADER))
         
     if len(documents) < 2:
         raise ValueError("Expected at least 2 YAML documents (header and courses)")
@@ -282,7 +364,11 @@ def process_yaml_file(file_path: str):
         }
 
         # Parse prerequisites if they exist
-        if 'reqs' in course:
+        if 'reqs' in course and unlisted is not None:
+            missing = []
+            course_data["prerequisite_head"] = parse_prerequisite_expression(course['reqs'], DEPTARTMENT_MACROS, missing)
+            unlisted.extend((course_data["code"], token) for token in missing)
+        elif 'reqs' in course:
             print(course_data["code"])
             print("Requirements: ", course_data["prerequisite_expression"])
             course_data["prerequisite_head"] = parse_prerequisite_expression(course['reqs'], DEPTARTMENT_MACROS)
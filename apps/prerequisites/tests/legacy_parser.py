@@ -0,0 +1,113 @@
+"""The original list-popping parser, kept as the oracle for differential tests.
+
+It scans the whole cross-listing table for every wildcard and ``<`` token and
+re-parses the joined expansion, exactly as ``yaml_interpreter`` used to.
+"""
+import re
+from typing import List
+
+from yaml_interpreter import (
+    CROSSLISTING_DATA,
+    KNOWN_MACROS_EXPANSIONS,
+    CourseNode,
+    Node,
+    OperatorNode,
+)
+
+
+def parse_course_code(course_code: str):
+    match = re.match(r'([A-Z]+)\s*(\d+[A-Z]*)', course_code)
+    if match:
+        dept, num = match.groups()
+        key = dept + " " + num
+        if key not in CROSSLISTING_DATA:
+            return dept, num, None
+        return dept, num, CROSSLISTING_DATA[key]["id"]
+    return None, None, None
+
+
+def tokenize_expression(expr: str) -> List[str]:
+    tokens = []
+    buffer = ''
+    for char in expr:
+        if char in {'(', ')', '&', '|'}:
+            if buffer.strip():
+                tokens.append(buffer.strip())
+                buffer = ''
+            tokens.append(char)
+        else:
+            buffer += char
+    if buffer.strip():
+        tokens.append(buffer.strip())
+    return tokens
+
+
+def parse_prerequisite_expression(expr: str, DEPARMENT_MACROS: dict) -> Node:
+    def attach(current_node, node, is_coreq):
+        if isinstance(current_node, OperatorNode):
+            current_node.children.append((node, is_coreq))
+            return current_node
+        return node
+
+    def parse(tokens):
+        current_node = None
+
+        while tokens:
+            token = tokens.pop(0)
+            is_coreq = False
+            if token[0] == "$":
+                is_coreq = True
+                token = token[1:]
+
+            if token == '(':
+                current_node = attach(current_node, parse(tokens), is_coreq)
+
+            elif token == ')':
+                break
+
+            elif token in {'&', '|'}:
+                if not (isinstance(current_node, OperatorNode) and current_node.value == token):
+                    new_node = OperatorNode(value=token)
+                    if current_node:
+                        new_node.children.append((current_node, is_coreq))
+                    current_node = new_node
+
+            elif token in KNOWN_MACROS_EXPANSIONS or token in DEPARMENT_MACROS:
+                if token in KNOWN_MACROS_EXPANSIONS:
+                    expanded_expr = KNOWN_MACROS_EXPANSIONS[token]
+                else:
+                    expanded_expr = DEPARMENT_MACROS[token]
+                node = parse(tokenize_expression(expanded_expr))
+                current_node = attach(current_node, node, is_coreq)
+
+            elif token[-1] == "*":
+                dept, num = token[:3], token[3:]
+                num = num.replace("*", "")
+                regex_pattern = "^" + dept + " " + num + '.*' + "$"
+                matching_courses = [c for c in CROSSLISTING_DATA if re.match(regex_pattern, c)]
+                node = parse(tokenize_expression(" | ".join(matching_courses)))
+                current_node = attach(current_node, node, is_coreq)
+
+            elif token[0] == "<":
+                dept, num = token[1:4], token[4:]
+                matching_courses = []
+                for course in CROSSLISTING_DATA:
+                    curr_dept, curr_num, _ = parse_course_code(course)
+                    if curr_dept == dept and int(curr_num) >= int(num):
+                        matching_courses.append(course)
+                node = parse(tokenize_expression(" | ".join(matching_courses)))
+                current_node = attach(current_node, node, is_coreq)
+
+            elif token:
+                dept, num, course_id = parse_course_code(token)
+                if course_id is None:
+                    dept, num, course_id = parse_course_code(token[:-1])
+                    if course_id is None:
+                        print(f"ERROR: Course {token} is not listed.")
+                        continue
+                node = CourseNode(value=token, course_id=course_id)
+                current_node = attach(current_node, node, is_coreq)
+
+        return current_node
+
+    return parse(tokenize_expression(expr))
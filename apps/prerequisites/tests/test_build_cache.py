@@ -0,0 +1,57 @@
+import os
+import shutil
+
+from build_cache import BuildCache, TableSlices, referenced_departments
+from compile_prerequisites import LIB_DIR, compile_library
+from crosslisting import CrosslistingIndex
+from yaml_interpreter import CROSSLISTING_DATA, CROSSLISTING_INDEX
+
+
+def _course(code, reqs=''):
+    return {'code': code, 'prerequisite_expression': reqs}
+
+
+def test_referenced_departments_follow_macros_and_expansions():
+    info = {'vars': [{'name': 'LOCAL', 'equ': 'GEO202 | $<SPA207'}]}
+    courses = [_course('ABC 101', 'BSEMATH & (LOCAL | FRE2*)'), _course('ABC 102')]
+
+    assert referenced_departments(info, courses) == ['ABC', 'ECO', 'EGR', 'FRE', 'GEO', 'MAT', 'SPA']
+    assert referenced_departments({}, [_course('ABC 101', 'CO.*')]) is None
+
+
+def test_table_slice_changes_only_for_touched_departments():
+    before = TableSlices(CROSSLISTING_INDEX)
+    data = dict(CROSSLISTING_DATA)
+    data['COS 999'] = {'code': 'COS 999', 'id': '999999'}
+    after = TableSlices(CrosslistingIndex(data))
+
+    assert before.hash(['MAT', 'SPA']) == after.hash(['MAT', 'SPA'])
+    assert before.hash(['COS', 'MAT']) != after.hash(['COS', 'MAT'])
+    assert before.hash(None) != after.hash(None)
+
+
+def test_compile_library_reuses_unchanged_files(tmp_path):
+    lib = tmp_path / 'lib'
+    paths = []
+    for name in ('bse/COS.yaml', 'stem/GEO.yaml'):
+        target = lib / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(LIB_DIR, name), target)
+        paths.append(str(target))
+    cache_path = str(tmp_path / 'cache.json')
+
+    def build(compiler):
+        cache = BuildCache(cache_path, compiler)
+        artifact = compile_library(paths, jobs=1, cache=cache)
+        cache.save()
+        return artifact, cache.rebuilt
+
+    first = build('v1')
+    second = build('v1')
+    with open(paths[1], 'a') as f:
+        f.write('\n')
+    third = build('v1')
+    recompiler = build('v2')
+
+    assert [first[1], second[1], third[1], recompiler[1]] == [2, 0, 1, 2]
+    assert first[0] == second[0] == third[0] == recompiler[0]
@@ -0,0 +1,38 @@
+import glob
+import json
+import os
+
+from compile_prerequisites import LIB_DIR, compile_library, serialize_node, write_artifact
+from yaml_interpreter import CROSSLISTING_DATA, parse_prerequisite_expression
+
+
+def test_serialize_node():
+    unlisted = []
+    tree = parse_prerequisite_expression('(COS217 | COS999) & $COS226', {}, unlisted)
+    ids = {code: CROSSLISTING_DATA[code]["id"] for code in ('COS 217', 'COS 226')}
+
+    assert unlisted == ['COS999']
+    assert serialize_node(tree) == {
+        "op": "&",
+        "children": [
+            [{"op": "|", "children": [[{"course": "COS217", "id": ids['COS 217']}, False]]}, False],
+            [{"course": "COS226", "id": ids['COS 226']}, True],
+        ],
+    }
+
+
+def test_compile_library_reports_per_file(tmp_path):
+    paths = [os.path.join(LIB_DIR, 'bse', 'COS.yaml'), os.path.join(LIB_DIR, 'stem', 'MAT.yaml')]
+
+    serial = compile_library(paths, jobs=1)
+    parallel = compile_library(paths, jobs=2)
+
+    assert serial == parallel
+    assert list(serial["departments"]) == ['bse/COS.yaml']
+    assert serial["errors"] == {'stem/MAT.yaml': "KeyError: 'id'"}
+    courses = serial["departments"]['bse/COS.yaml']["courses"]
+    assert any(course["prerequisite_head"] for course in courses)
+
+    out = tmp_path / 'out' / 'prerequisites.json'
+    write_artifact(serial, str(out))
+    assert json.loads(out.read_text()) == serial
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from crosslisting import CROSS_TABLE_PATH, CrosslistingStore, load_index
+
+INDEX = load_index()
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    return CrosslistingStore(str(tmp_path_factory.mktemp('store') / 'crosslisting.sqlite3'), CROSS_TABLE_PATH)
+
+
+@pytest.mark.parametrize('prefix', ['COS 2', 'PHI ', 'CHI  3', 'CO.', 'ZZZ '])
+def test_prefix_lookups_match_index(store, prefix):
+    assert store.with_prefix(prefix) == INDEX.with_prefix(prefix)
+
+
+@pytest.mark.parametrize('dept,num', [('SPA', '207'), ('COS', '300'), ('ANT', '206'), ('COS', '30A'), ('XYZ', '100')])
+def test_range_lookups_match_index(store, dept, num):
+    def run(index):
+        try:
+            return index.at_least(dept, num)
+        except ValueError as e:
+            return str(e)
+
+    assert run(store) == run(INDEX)
+
+
+def test_store_is_lazy_and_rebuilds_when_source_changes(tmp_path):
+    source = tmp_path / 'cross_table.json'
+    source.write_text(json.dumps({'COS 126': {'code': 'COS 126', 'id': '1'}}))
+    path = tmp_path / 'store.sqlite3'
+
+    store = CrosslistingStore(str(path), str(source))
+    assert not path.exists()
+    assert store.course_id('COS 126') == '1'
+    assert path.exists()
+
+    source.write_text(json.dumps({'COS 126': {'code': 'COS 126', 'id': '2'}, 'COS 217': {'code': 'COS 217', 'id': '3'}}))
+    os.utime(source, ns=(1, 1))
+    reopened = CrosslistingStore(str(path), str(source))
+    assert reopened.course_id('COS 126') == '2'
+    assert list(reopened.data) == ['COS 126', 'COS 217']
+
+
+def test_store_falls_back_to_json_when_unwritable(tmp_path):
+    blocker = tmp_path / 'not-a-directory'
+    blocker.write_text('')
+    store = CrosslistingStore(str(blocker / 'store.sqlite3'), CROSS_TABLE_PATH)
+
+    assert store.data['COS 226'] == INDEX.data['COS 226']
+    assert 'COS 999' not in store.data
+    assert store.with_prefix('COS 2') == INDEX.with_prefix('COS 2')
+
+
+def test_lettered_course_numbers_raise_a_descriptive_error(store):
+    with pytest.raises(ValueError, match=r"course number '206A' in ANT is not an integer") as info:
+        store.at_least('ANT', '206')
+    assert isinstance(info.value.__cause__, ValueError)
@@ -0,0 +1,58 @@
+import glob
+import os
+
+from evaluator import PrerequisiteEvaluator, course_id
+from yaml_interpreter import parse_prerequisite_expression
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+def _catalog(reqs):
+    return PrerequisiteEvaluator(
+        (code, course_id(code), parse_prerequisite_expression(expr, {}, []) if expr else None)
+        for code, expr in reqs.items()
+    )
+
+
+CATALOG = {
+    'COS 126': '',
+    'COS 217': 'COS126',
+    'COS 226': 'COS126',
+    'COS 375': 'COS217 & $COS226',
+    'COS 398': '(COS217 | ECE206) & COS3*',
+    'COS 999': 'CHI 3*',
+}
+
+
+def test_eligible_follows_prerequisites():
+    evaluator = _catalog(CATALOG)
+
+    assert evaluator.eligible(0) == ['COS 126', 'COS 999']
+    # EGR 126 is a cross-listing of COS 126
+    assert evaluator.eligible(evaluator.mask(['EGR 126'])) == ['COS 217', 'COS 226', 'COS 999']
+
+
+def test_corequisites_may_be_taken_in_the_same_semester():
+    evaluator = _catalog(CATALOG)
+    plan = [['COS 126'], ['COS 217'], ['COS 226', 'COS 375']]
+
+    assert evaluator.check_plan(plan) == [[], [], []]
+    assert evaluator.check_plan([['COS 126'], ['COS 226', 'COS 217', 'COS 375']]) == [[], ['COS 375']]
+    assert evaluator.check_plan([['COS 375'], ['COS 126']]) == [['COS 375'], []]
+
+
+def test_eligible_after_plan():
+    evaluator = _catalog(CATALOG)
+    plan = [['COS 126'], ['COS 217', 'COS 226'], ['COS 375']]
+
+    assert evaluator.eligible_after(plan) == ['COS 398', 'COS 999']
+
+
+def test_full_library_evaluates():
+    evaluator = PrerequisiteEvaluator.from_library(sorted(glob.glob(os.path.join(LIB_DIR, '*', '*.yaml'))))
+    taken = 0
+    for _ in range(4):
+        eligible = evaluator.eligible(taken)
+        assert eligible
+        taken |= evaluator.mask(eligible)
+    assert not any(taken & evaluator.mask([code]) for code in evaluator.eligible(taken))
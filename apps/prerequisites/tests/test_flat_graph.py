@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import legacy_parser
+from flat_graph import AND, COURSE, FlatGraph
+from yaml_interpreter import parse_prerequisite_expression, process_yaml_file
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+def test_nodes_use_slots_and_courses_are_interned():
+    first = parse_prerequisite_expression('COS226 & COS2*', {}, [])
+    second = parse_prerequisite_expression('COS226 | MAT202', {}, [])
+
+    assert not hasattr(first, '__dict__')
+    assert first.children[0][0] is second.children[0][0]
+
+
+def test_appending_to_shared_expansion_leaves_cache_intact():
+    for expr in ('COS2* | PHI201', '<SPA207 | FRE2*', 'COS2*'):
+        assert parse_prerequisite_expression(expr, {}, []) == legacy_parser.parse_prerequisite_expression(expr, {})
+
+
+def test_shared_subtrees_are_encoded_once():
+    graph = FlatGraph()
+    first = graph.add(parse_prerequisite_expression('COS217 & BSEMATH', {}, []))
+    size = len(graph)
+    second = graph.add(parse_prerequisite_expression('BSEMATH & COS217', {}, []))
+
+    assert graph.ops[first] == graph.ops[second] == AND
+    # Only the new root is added; both operands are already encoded.
+    assert len(graph) == size + 1
+    assert graph.ops[:size].count(COURSE) == len(set(zip(graph.course_ids, graph.values)))
+
+
+@pytest.mark.parametrize('name', ['bse/COS.yaml', 'lang/SPA.yaml', 'stem/CHM.yaml'])
+def test_flat_graph_round_trips(name):
+    _, courses = process_yaml_file(os.path.join(LIB_DIR, name), unlisted=[])
+    graph = FlatGraph()
+    roots = [graph.add(course['prerequisite_head']) for course in courses]
+    decoded = FlatGraph.from_json(graph.to_json())
+
+    assert [decoded.node(root) for root in roots] == [course['prerequisite_head'] for course in courses]
+    assert all(root == -1 for root, course in zip(roots, courses) if course['prerequisite_head'] is None)
@@ -0,0 +1,35 @@
+import pytest
+
+import legacy_parser
+from yaml_interpreter import MacroCycleError, parse_prerequisite_expression
+
+
+def test_macro_subtrees_are_shared():
+    first = parse_prerequisite_expression('COS217 & BSEMATH', {})
+    second = parse_prerequisite_expression('COS226 & BSEMATH', {})
+
+    assert first.children[1][0] is second.children[1][0]
+
+
+def test_appending_to_macro_root_leaves_cache_intact():
+    macros = {'ANYPHY': 'MECH | PHY208'}
+    extended = parse_prerequisite_expression('MECH | COS126', macros)
+    expanded = parse_prerequisite_expression('ANYPHY', macros)
+    plain = parse_prerequisite_expression('MECH', macros)
+
+    assert extended == legacy_parser.parse_prerequisite_expression('MECH | COS126', macros)
+    assert expanded == legacy_parser.parse_prerequisite_expression('ANYPHY', macros)
+    assert plain == legacy_parser.parse_prerequisite_expression('MECH', macros)
+
+
+def test_cached_macro_reports_unlisted_courses_again(capsys):
+    macros = {'OLD': 'COS999 | COS126'}
+    parse_prerequisite_expression('OLD', macros)
+    parse_prerequisite_expression('OLD & COS217', macros)
+
+    assert capsys.readouterr().out.count('ERROR: Course COS999 is not listed.') == 2
+
+
+def test_macro_cycle_is_reported():
+    with pytest.raises(MacroCycleError, match='LOOPA -> LOOPB -> LOOPA'):
+        parse_prerequisite_expression('COS126 & LOOPA', {'LOOPA': 'LOOPB | COS126', 'LOOPB': 'LOOPA'})
@@ -0,0 +1,60 @@
+import contextlib
+import glob
+import io
+import os
+
+import pytest
+import yaml
+
+import legacy_parser
+import yaml_interpreter
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+YAML_FILES = sorted(glob.glob(os.path.join(LIB_DIR, '*', '*.yaml')))
+
+
+def _parse(parser, expr, macros):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            result = parser(expr, macros)
+        except Exception as exc:
+            # '<' lookups reword int()'s ValueError and chain it as the cause.
+            if isinstance(exc, ValueError) and isinstance(exc.__cause__, ValueError):
+                exc = exc.__cause__
+            result = (type(exc), str(exc))
+    return result, out.getvalue()
+
+
+def _requirements(path):
+    with open(path, 'r') as f:
+        header, courses = list(yaml.safe_load_all(f))[:2]
+    macros = {item['name']: item['equ'] for item in header.get('vars') or []}
+    return macros, [course for course in courses if isinstance(course, dict) and 'reqs' in course]
+
+
+@pytest.mark.parametrize('path', YAML_FILES, ids=lambda p: os.path.relpath(p, LIB_DIR))
+def test_parser_matches_legacy(path):
+    macros, courses = _requirements(path)
+    for course in courses:
+        expected = _parse(legacy_parser.parse_prerequisite_expression, course['reqs'], macros)
+        actual = _parse(yaml_interpreter.parse_prerequisite_expression, course['reqs'], macros)
+        assert actual == expected, course['course']
+
+
+@pytest.mark.parametrize('expr', [
+    '(COS217 | COS226) & $MAT202',
+    'COS2* & CHI 3*',
+    '<ANT206',
+    '<COS30A | PHI*',
+    'PHYS & BSEMATH',
+    'COS 999 | ( & )',
+])
+def test_edge_cases_match_legacy(expr):
+    expected = _parse(legacy_parser.parse_prerequisite_expression, expr, {})
+    actual = _parse(yaml_interpreter.parse_prerequisite_expression, expr, {})
+    assert actual == expected
+
+
+def test_tokenizer_matches_legacy():
+    for expr in ['', '  ', 'A', ' (A&  B)|C ', '$COS 2* | <SPA207', '((x))']:
+        assert yaml_interpreter.tokenize_expression(expr) == legacy_parser.tokenize_expression(expr)
@@ -0,0 +1,50 @@
+import os
+
+from compile_prerequisites import LIB_DIR, compile_library
+from evaluator import course_id
+from unlocks import Unlock, UnlocksIndex, course_references
+from yaml_interpreter import parse_prerequisite_expression
+
+CATALOG = {
+    'COS 126': '',
+    'COS 217': 'COS126',
+    'COS 226': 'COS126 | ECE115',
+    'COS 375': 'COS217 & $COS226',
+    'COS 398': '(COS217 | ECE206) & COS3*',
+}
+
+
+def _index(reqs):
+    return UnlocksIndex(
+        (code, course_id(code), course_references(parse_prerequisite_expression(expr, {}, []) if expr else None))
+        for code, expr in reqs.items()
+    )
+
+
+def test_unlocks_record_and_or_context():
+    index = _index(CATALOG)
+
+    assert index.unlocks('COS 126') == [Unlock('COS 217', True, False), Unlock('COS 226', False, False)]
+    assert index.unlocks('COS 217') == [Unlock('COS 375', True, False), Unlock('COS 398', False, False)]
+    assert index.unlocks('COS 226') == [Unlock('COS 375', True, True)]
+    # Cross-listings share an id, and courses nothing refers to unlock nothing
+    assert index.unlocks('EGR 126') == index.unlocks('COS 126')
+    assert index.unlocks('COS 999') == []
+
+
+def test_unlocks_eventually_follows_chains():
+    index = _index(CATALOG)
+
+    assert index.unlocks_eventually('COS 126') == ['COS 217', 'COS 226', 'COS 375', 'COS 398']
+    # COS 375 is itself in COS3*, which COS 398 accepts
+    assert index.unlocks_eventually('COS 375') == ['COS 398']
+    assert UnlocksIndex.from_json(index.to_json()).unlocks('COS 226') == index.unlocks('COS 226')
+
+
+def test_compiled_artifact_carries_the_library_index():
+    paths = [os.path.join(LIB_DIR, 'bse', 'COS.yaml'), os.path.join(LIB_DIR, 'bse', 'ECE.yaml')]
+
+    artifact = compile_library(paths, jobs=1)
+
+    assert artifact["unlocks"] == UnlocksIndex.from_library(paths).to_json()
+    assert 'COS 375' in UnlocksIndex.from_json(artifact["unlocks"]).unlocks_eventually('COS 126')
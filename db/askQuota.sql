@@ -0,0 +1,21 @@
+-- Atomic quota accounting for the Ask gateway.
+-- Called through PostgREST as POST /rest/v1/rpc/increment_ask_quota: adds
+-- p_amount to the (netid, time_window) row, creating it if needed, and
+-- returns the new total in the same round trip.
+
+CREATE OR REPLACE FUNCTION public.increment_ask_quota(
+    p_netid TEXT,
+    p_time_window TEXT,
+    p_amount NUMERIC
+) RETURNS NUMERIC
+LANGUAGE sql
+AS $$
+    INSERT INTO public.ask_quotas (netid, time_window, spent)
+    VALUES (p_netid, p_time_window, ROUND(p_amount, 6))
+    ON CONFLICT (netid, time_window)
+    DO UPDATE SET spent = public.ask_quotas.spent + EXCLUDED.spent
+    RETURNING spent::NUMERIC;
+$$;
+
+REVOKE ALL ON FUNCTION public.increment_ask_quota(TEXT, TEXT, NUMERIC) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.increment_ask_quota(TEXT, TEXT, NUMERIC) TO service_role;